@@ -32,6 +32,9 @@ rds_secret = f"rds/{database_name}"
 
 app = cdk.App()
 
+# ongoing replication is opt in, enabling logical replication reboots the database
+cdc = str(app.node.try_get_context('cdc')).lower() == 'true'
+
 #create VPC and subnets
 vpc_ec2_stack = VpcStack(
     scope=app,
@@ -46,6 +49,7 @@ postgres = RDSPostgresStack(
     vpc=vpc_ec2_stack.vpc,
     db_secret=rds_secret,
     db_name=database_name,
+    logical_replication=cdc,
     env=env
 )
 
@@ -80,6 +84,8 @@ dms  = DMSStack(
     rds_database_name=database_name,
     neptune_endpoint=neptune_endpoint,
     neptune_endpoint_role=neptune.neptune_access_role,
+    migration_type='full-load-and-cdc' if cdc else 'full-load',
+    performance_profile=app.node.try_get_context('dms_profile') or 'small',
     env=env
 )
 
@@ -14,11 +14,19 @@
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
+import codecs
+import io
+import threading
 import json
 import boto3
 import os
 import logging
+import re
+import time
 import psycopg2
+from psycopg2 import errors
+from concurrent.futures import ThreadPoolExecutor
+from psycopg2.pool import ThreadedConnectionPool
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -26,52 +34,421 @@ logger.setLevel(logging.INFO)
 secret_arn = os.environ.get('RDS_SECRET')
 db_name = os.environ.get('RDS_DBNAME')
 bucket_name = os.environ.get('BUCKET_NAME')
+# connect to this Postgres instead of the one in the RDS secret
+pg_dsn = os.environ.get('PG_DSN')
 
+# 'copy' streams rows into COPY FROM STDIN, 'execute' runs each script as is
+load_mode = os.environ.get('LOAD_MODE', 'copy')
+copy_chunk_rows = int(os.environ.get('COPY_CHUNK_ROWS', '50000'))
+read_chunk_bytes = int(os.environ.get('READ_CHUNK_BYTES', str(1024 * 1024)))
+load_concurrency = int(os.environ.get('LOAD_CONCURRENCY', '4'))
+# create primary keys after the bulk load instead of maintaining them row by row
+defer_constraints = os.environ.get('DEFER_CONSTRAINTS', 'true') == 'true'
+
+secret_value = None
 try:
-    secret_client = boto3.client('secretsmanager')
-    secret_value = secret_client.get_secret_value(SecretId=secret_arn)
+    if pg_dsn is None:
+        secret_client = boto3.client('secretsmanager')
+        secret_value = secret_client.get_secret_value(SecretId=secret_arn)
 except Exception as e:
     logger.error("Error: Could not get secret")
     logger.error(str(e))
 
 
+STATEMENT_BOUNDARY = re.compile(r"[';]")
+QUOTE = re.compile(r"'")
+INSERT_STATEMENT = re.compile(r'^\s*INSERT\s+INTO\s+([\w."]+)\s*\(([^)]*)\)\s*VALUES\s*(.*)$', re.IGNORECASE | re.DOTALL)
+VALUE_TOKEN = re.compile(r"'((?:[^']|'')*)'|(\()|(\))|(NULL)\b|([^\s,()']+)", re.IGNORECASE)
+TIMESTAMP_SUFFIX = re.compile(r'_+\d+$')
+CREATE_TABLE = re.compile(r'^\s*CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?([\w."]+)\s*\((.*)\)\s*$', re.IGNORECASE | re.DOTALL)
+PRIMARY_KEY = re.compile(r'PRIMARY\s+KEY\s*\(([^)]*)\)', re.IGNORECASE)
+
+
+def read_text_chunks(body):
+    # decode incrementally so a multi-byte character split across chunks stays intact
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    for chunk in body.iter_chunks(read_chunk_bytes):
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
+
+def iter_statements(chunks):
+    # split on semicolons outside of string literals without holding more than one chunk
+    # and the statement it ends in. Each chunk is scanned from an offset and trimmed once
+    buffer = ''
+    scan_pos = 0
+    in_string = False
+    for chunk in chunks:
+        buffer += chunk
+        start = 0
+        while True:
+            match = (QUOTE if in_string else STATEMENT_BOUNDARY).search(buffer, scan_pos)
+            if match is None:
+                break
+            scan_pos = match.end()
+            if match.group() == "'":
+                in_string = not in_string
+            else:
+                statement = buffer[start:match.start()]
+                start = scan_pos
+                if statement.strip():
+                    yield statement
+        buffer = buffer[start:]
+        scan_pos = len(buffer)
+    if buffer.strip():
+        yield buffer
+
+def parse_insert(statement):
+    match = INSERT_STATEMENT.match(statement)
+    if match is None:
+        return None
+    (table, columns, values) = match.groups()
+    columns = tuple(column.strip() for column in columns.split(','))
+
+    rows = []
+    row = None
+    for token in VALUE_TOKEN.finditer(values):
+        (string, open_paren, close_paren, null, literal) = token.groups()
+        if open_paren:
+            row = []
+        elif close_paren:
+            rows.append(row)
+            row = None
+        elif string is not None:
+            row.append(('s', string.replace("''", "'")))
+        elif null:
+            row.append(None)
+        else:
+            row.append(('n', literal))
+    return (table, columns, rows)
+
+def csv_field(value):
+    # unquoted empty fields are NULL in COPY csv format, quoted ones are empty strings
+    if value is None:
+        return ''
+    (kind, text) = value
+    if kind == 'n':
+        return text
+    return '"' + text.replace('"', '""') + '"'
+
+def table_name(name):
+    return name.replace('"', '').lower()
+
+def split_definitions(definitions):
+    # split on commas that are not inside a type such as numeric(10,2)
+    parts = []
+    depth = 0
+    start = 0
+    for pos, char in enumerate(definitions):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            parts.append(definitions[start:pos].strip())
+            start = pos + 1
+    parts.append(definitions[start:].strip())
+    return [part for part in parts if part]
+
+
+class TableDefinition:
+    """
+    A CREATE TABLE statement split into its columns and its constraints
+    """
+    def __init__(self, statement):
+        (name, definitions) = CREATE_TABLE.match(statement).groups()
+        self.name = table_name(name)
+        self.qualified_name = name
+        self.columns = []
+        self.column_definitions = []
+        self.constraints = []
+        self.primary_key = ()
+        for definition in split_definitions(definitions):
+            if definition.upper().startswith('CONSTRAINT'):
+                self.constraints.append(definition)
+                primary_key = PRIMARY_KEY.search(definition)
+                if primary_key:
+                    self.primary_key = tuple(column.strip().strip('"') for column in primary_key.group(1).split(','))
+            else:
+                self.column_definitions.append(definition)
+                self.columns.append(definition.split()[0].strip('"'))
+
+    def create_statement(self, with_constraints):
+        definitions = self.column_definitions + (self.constraints if with_constraints else [])
+        return f'CREATE TABLE IF NOT EXISTS {self.qualified_name} ({", ".join(definitions)})'
+
+    def constraint_statements(self):
+        return [f'ALTER TABLE {self.qualified_name} ADD {constraint}' for constraint in self.constraints]
+
+
+def load_levels(tables):
+    # a table referencing another table's primary key column (a link table such as
+    # loan_security, or loan_activity) is loaded after the tables it references
+    owners = {table.primary_key[0]: table.name for table in tables.values() if len(table.primary_key) == 1}
+    dependencies = {}
+    for table in tables.values():
+        dependencies[table.name] = {owners[column] for column in table.columns if column in owners and owners[column] != table.name}
+
+    levels = []
+    loaded = set()
+    while len(loaded) < len(dependencies):
+        level = sorted(name for name, depends_on in dependencies.items() if name not in loaded and depends_on <= loaded)
+        if not level:
+            # cyclic references, load whatever is left together
+            level = sorted(name for name in dependencies if name not in loaded)
+        levels.append(level)
+        loaded.update(level)
+    return levels
+
+def table_from_key(key):
+    name = os.path.splitext(os.path.basename(key))[0]
+    return 'mbs.' + TIMESTAMP_SUFFIX.sub('', name).strip('_')
+
+
+class TableStats:
+    """
+    Rows loaded and time spent per table
+    """
+    def __init__(self):
+        self.rows = {}
+        self.seconds = {}
+        self.lock = threading.Lock()
+
+    def add(self, table, rows, seconds):
+        table = table_name(table)
+        with self.lock:
+            self.rows[table] = self.rows.get(table, 0) + rows
+            self.seconds[table] = self.seconds.get(table, 0.0) + seconds
+
+    def report(self):
+        lines = []
+        for table in self.rows:
+            seconds = self.seconds[table]
+            rows_per_sec = self.rows[table] / seconds if seconds > 0 else 0.0
+            lines.append(f'{table}: {self.rows[table]} rows in {seconds:.2f}s ({rows_per_sec:.0f} rows/sec)')
+        return lines
+
+
+class CopyBuffer:
+    """
+    Accumulates parsed INSERT rows as CSV and flushes them with COPY FROM STDIN in chunks
+    """
+    def __init__(self, cur, stats):
+        self.cur = cur
+        self.stats = stats
+        self.target = None
+        self.buffer = io.StringIO()
+        self.rows = 0
+
+    def add(self, table, columns, rows):
+        if self.target != (table, columns):
+            self.flush()
+            self.target = (table, columns)
+        for row in rows:
+            self.buffer.write(','.join(csv_field(value) for value in row))
+            self.buffer.write('\n')
+        self.rows += len(rows)
+        if self.rows >= copy_chunk_rows:
+            self.flush()
+
+    def flush(self):
+        if self.rows == 0:
+            return
+        (table, columns) = self.target
+        start = time.time()
+        self.buffer.seek(0)
+        self.cur.copy_expert(f'COPY {table} ({",".join(columns)}) FROM STDIN WITH (FORMAT csv)', self.buffer)
+        self.stats.add(table, self.rows, time.time() - start)
+        self.buffer = io.StringIO()
+        self.rows = 0
+
+
+def copy_sql_script(cur, body, stats):
+    copy_buffer = CopyBuffer(cur, stats)
+    for statement in iter_statements(read_text_chunks(body)):
+        insert = parse_insert(statement)
+        if insert is None:
+            copy_buffer.flush()
+            cur.execute(statement)
+        else:
+            copy_buffer.add(*insert)
+    copy_buffer.flush()
+
+def copy_delimited_file(cur, key, body, stats):
+    table = table_from_key(key)
+    delimiter = '\t' if key.endswith('.tsv') else ','
+    start = time.time()
+    # the S3 body is read by COPY in small pieces, it is never buffered whole
+    cur.copy_expert(f"COPY {table} FROM STDIN WITH (FORMAT csv, HEADER true, DELIMITER E'{delimiter}')", body)
+    stats.add(table, cur.rowcount, time.time() - start)
+
+def load_object(cur, obj, key, stats):
+    body = obj.get_object(Bucket=bucket_name, Key=key)['Body']
+    logger.info(f'loading {key}')
+    if load_mode != 'copy':
+        for statement in iter_statements(read_text_chunks(body)):
+            cur.execute(statement)
+    elif key.endswith('.csv') or key.endswith('.tsv'):
+        copy_delimited_file(cur, key, body, stats)
+    else:
+        copy_sql_script(cur, body, stats)
+
+
+def script_store():
+    return boto3.client('s3')
+
+def list_keys(obj, prefix):
+    # list_objects_v2 returns at most 1000 keys per call, follow the continuation pages
+    paginator = obj.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+        for item in page.get('Contents', []):
+            yield item['Key']
+
+def connection_params():
+    if pg_dsn is not None:
+        return {'dsn': pg_dsn}
+    secret_dict = json.loads(secret_value['SecretString'])
+    return {
+        'database': secret_dict['engine'],
+        'user': secret_dict['username'],
+        'password': secret_dict['password'],
+        'host': secret_dict['host'],
+        'port': secret_dict['port'],
+    }
+
+def run_ddl(cur, obj, key, tables):
+    body = obj.get_object(Bucket=bucket_name, Key=key)['Body']
+    for statement in iter_statements(read_text_chunks(body)):
+        if CREATE_TABLE.match(statement):
+            table = TableDefinition(statement)
+            tables[table.name] = table
+            statement = table.create_statement(with_constraints=not defer_constraints)
+        logger.info(statement)
+        cur.execute(statement)
+
+def load_table(pool, obj, table, keys, stats, loaded):
+    conn = pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            for key in keys:
+                load_object(cur, obj, key, stats)
+        conn.commit()
+        loaded.append(table)
+        logger.info(f'loaded {table}')
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn)
+
+def truncate_tables(pool, names):
+    # every table commits on its own, a failed load empties the ones already committed
+    conn = pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            statement = f'TRUNCATE {", ".join(names)}'
+            logger.info(statement)
+            cur.execute(statement)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn)
+
+def add_constraints(pool, table):
+    conn = pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            for statement in table.constraint_statements():
+                logger.info(statement)
+                cur.execute(statement)
+        conn.commit()
+    except (errors.DuplicateObject, errors.DuplicateTable, errors.InvalidTableDefinition):
+        # tables created by an earlier run already have their constraints
+        conn.rollback()
+        logger.info(f'constraints already exist on {table.name}')
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn)
+
+def run_concurrently(executor, calls):
+    # wait for every call and re-raise the first failure
+    futures = [executor.submit(*call) for call in calls]
+    for future in futures:
+        future.result()
+
+
 def handler(event, context):
+    """
+    Creates the tables and loads them level by level, one transaction per table. The
+    load is not atomic: when it fails, the tables it already committed are truncated and
+    the response is a 500 with the error.
+    """
     logger.info(f'request: {json.dumps(event)}')
     
-    obj = boto3.client('s3')
-    ddl_queries = obj.list_objects_v2(Bucket=bucket_name, Prefix='ddl')
-    dml_queries = obj.list_objects_v2(Bucket=bucket_name, Prefix='dml')
+    obj = script_store()
+    stats = TableStats()
+    pool = None
+    loaded = []
+    error = None
 
     try:
-        secret_dict = json.loads(secret_value['SecretString'])
-        username = secret_dict['username']
-        password = secret_dict['password']
-        host = secret_dict['host']
-        port = secret_dict['port']
-        dbname = secret_dict['engine']
-        conn = psycopg2.connect(database=dbname, user=username, password=password, host=host, port=port)
+        pool = ThreadedConnectionPool(1, load_concurrency, **connection_params())
         logger.info('Connected to Database successfully')
-        cur = conn.cursor()
-        for query in ddl_queries['Contents']:
-            sql = obj.get_object(Bucket=bucket_name, Key=query['Key'])['Body'].read().decode()
-            logger.info(sql)
-            cur.execute(sql)
         
-        for query in dml_queries['Contents']:
-            sql = obj.get_object(Bucket=bucket_name, Key=query['Key'])['Body'].read().decode()
-            logger.info(sql)
-            cur.execute(sql)
-        conn.commit()
+        tables = {}
+        conn = pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                for key in list_keys(obj, 'ddl'):
+                    run_ddl(cur, obj, key, tables)
+            conn.commit()
+        finally:
+            pool.putconn(conn)
+        
+        keys_by_table = {}
+        for key in list_keys(obj, 'dml'):
+            keys_by_table.setdefault(table_name(table_from_key(key)), []).append(key)
+        
+        levels = load_levels({name: table for name, table in tables.items() if name in keys_by_table})
+        unknown = sorted(set(keys_by_table) - set(tables))
+        if unknown:
+            levels.append(unknown)
+        
+        with ThreadPoolExecutor(max_workers=load_concurrency) as executor:
+            for level in levels:
+                logger.info(f'loading tables {level}')
+                run_concurrently(executor, [(load_table, pool, obj, table, keys_by_table[table], stats, loaded) for table in level])
+            
+            if defer_constraints:
+                run_concurrently(executor, [(add_constraints, pool, table) for table in tables.values()])
     except Exception as e:
-        logger.error(f'Failed loading the sample source dataset: {str(e)}')
+        error = f'Failed loading the sample source dataset: {str(e)}'
+        logger.error(error)
+        if loaded:
+            try:
+                truncate_tables(pool, loaded)
+            except Exception as truncate_error:
+                error += f'\nFailed emptying the loaded tables {", ".join(loaded)}: {str(truncate_error)}'
+                logger.error(error)
     finally:
-        logger.info("cleanup of cursor and db connection")
-        cur.close()
-        conn.close()
+        logger.info("cleanup of db connections")
+        if pool is not None:
+            pool.closeall()
+
+    report = stats.report()
+    for line in report:
+        logger.info(line)
     return {
-        'statusCode': 200,
+        'statusCode': 500 if error else 200,
         'headers': {
             'Content-Type': 'text/plain'
         },
-        'body': 'Sample source dataset loaded successfully \n'
+        'body': (error + '\n' if error else 'Sample source dataset loaded successfully \n') + ''.join(line + '\n' for line in report)
     }
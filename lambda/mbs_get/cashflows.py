@@ -0,0 +1,96 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from gremlin_python.process.graph_traversal import __
+from gremlin_python.process.traversal import P
+
+from exposure import SECURITY_LOAN_EDGE
+
+
+# loan -> loan_activity, the edge carries payment_date so the range is applied before
+# the activity vertices are read
+SNAPSHOT_EDGE = 'has snapshot'
+
+# series name -> loan_activity property, edge labels and properties from target_mappings.json
+activity_values = {
+    'principal': 'principal_pymnt',
+    'interest': 'int_pymnt',
+    'upb': 'rem_unpaid_principal_balance',
+}
+
+
+def activity(loans, start_date, end_date):
+    edges = loans.outE(SNAPSHOT_EDGE)
+    if start_date is not None:
+        edges = edges.has('payment_date', P.gte(start_date))
+    if end_date is not None:
+        edges = edges.has('payment_date', P.lte(end_date))
+    return edges.inV()
+
+def total(name):
+    # sum() of a group without the property yields nothing, which project() rejects
+    return __.coalesce(__.unfold().values(name).sum(), __.constant(0))
+
+def security_cashflows(start, start_date, end_date):
+    """
+    Principal, interest and UPB of every loan in the security summed per payment date by
+    the server, so a pool of thousands of loans returns one row per date
+    """
+    names = list(activity_values)
+    per_date = __.fold().project(*names, 'loans')
+    for name in names:
+        per_date = per_date.by(total(activity_values[name]))
+    per_date = per_date.by(__.unfold().count())
+    return activity(start.out(SECURITY_LOAN_EDGE), start_date, end_date).group().by('payment_date').by(per_date)
+
+def loan_cashflows(start, start_date, end_date):
+    return activity(start, start_date, end_date).valueMap('payment_date', *activity_values.values()).by(__.unfold())
+
+
+def monthly(dates, columns):
+    """
+    dates: 'YYYY-MM-DD' strings, columns: series name -> values per date. Sums the
+    values into calendar months, with every month between the first and the last
+    present, as a dict of equally long lists. loan_activity holds one payment per loan
+    and month, so the UPB of a month is the sum of its loans' balances.
+    """
+    # NumPy is only needed by the cash flow queries, it stays out of the cold start
+    import numpy as np
+    series = {'month': []}
+    series.update({name: [] for name in columns})
+    if len(dates) == 0:
+        return series
+    months = np.array(dates, dtype='datetime64[D]').astype('datetime64[M]')
+    axis = np.arange(months.min(), months.max() + 1)
+    index = (months - axis[0]).astype(np.int64)
+    series['month'] = axis.astype(str).tolist()
+    for (name, values) in columns.items():
+        # a float array holds None as nan
+        values = np.array(values, dtype=np.float64)
+        series[name] = np.bincount(index, weights=np.nan_to_num(values), minlength=len(axis)).round(2).tolist()
+    return series
+
+def shape_security_cashflows(groups, decode_date):
+    dates = [decode_date(date) for date in groups]
+    buckets = list(groups.values())
+    series = monthly(dates, {name: [bucket[name] for bucket in buckets] for name in list(activity_values) + ['loans']})
+    series['loans'] = [int(count) for count in series['loans']]
+    return series
+
+def shape_loan_cashflows(rows):
+    # rows went through transform(), so payment_date is already a 'YYYY-MM-DD' string
+    rows = [row for row in rows if row.get('payment_date') is not None]
+    dates = [row['payment_date'] for row in rows]
+    return monthly(dates, {name: [row.get(value) for row in rows] for (name, value) in activity_values.items()})
@@ -0,0 +1,176 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+Response formats and compression of the MBS get API, picked from the format parameter
+or the Accept and Accept-Encoding headers.
+
+    json       rows as objects, the default
+    columnar   JSON with every list of rows turned into {"columns": {name: [values]}, "count": n}
+    msgpack    the json layout as MessagePack, needs the msgpack package
+    arrow      a list of rows as an Arrow IPC stream, needs pyarrow
+"""
+from importlib.util import find_spec
+import gzip
+import io
+import json
+import zlib
+
+
+content_types = {
+    'json': 'application/json',
+    'columnar': 'application/vnd.mbs.columnar+json',
+    'msgpack': 'application/x-msgpack',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+
+# formats backed by an optional package, looked up without importing it
+format_packages = {
+    'msgpack': 'msgpack',
+    'arrow': 'pyarrow',
+}
+
+binary_formats = {'msgpack', 'arrow'}
+
+# preferred first when the client accepts both with the same quality
+content_codings = ['gzip', 'deflate']
+
+
+def available(format):
+    package = format_packages.get(format)
+    return package is None or find_spec(package) is not None
+
+def header(headers, name):
+    # API Gateway passes headers as sent, HTTP header names are case insensitive
+    for (key, value) in (headers or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+def qualities(value):
+    """
+    name -> quality of an Accept style header, in the order sent
+    """
+    result = {}
+    for part in (value or '').split(','):
+        (name, *parameters) = [item.strip() for item in part.split(';')]
+        quality = 1.0
+        for parameter in parameters:
+            if parameter.startswith('q='):
+                try:
+                    quality = float(parameter[2:])
+                except ValueError:
+                    quality = 0.0
+        if name:
+            result[name.lower()] = quality
+    return result
+
+def accepted(value):
+    """
+    Media types or codings of an Accept style header, best first, without the refused ones
+    """
+    choices = qualities(value)
+    # sorted() is stable, equal qualities keep the order the client sent them in
+    return sorted((name for name in choices if choices[name] > 0), key=lambda name: -choices[name])
+
+def tabular(value):
+    return isinstance(value, list) and all(isinstance(row, dict) for row in value)
+
+def encodable(format, value):
+    return available(format) and (format != 'arrow' or tabular(value))
+
+def negotiate_format(requested, accept, value, formats=content_types):
+    """
+    An explicit format parameter has to be met, the Accept header falls back to json
+    """
+    if requested is not None:
+        if requested not in formats:
+            raise ValueError('format must be one of {}'.format(', '.join(formats)))
+        if not available(requested):
+            raise ValueError('format {} is not available'.format(requested))
+        if not encodable(requested, value):
+            raise ValueError('format {} is only available for lists of rows'.format(requested))
+        return requested
+    by_type = {content_types[format]: format for format in formats}
+    for media_type in accepted(accept):
+        format = by_type.get(media_type)
+        if format is not None and encodable(format, value):
+            return format
+    return 'json'
+
+def negotiate_compression(accept_encoding):
+    choices = qualities(accept_encoding)
+    for coding in accepted(accept_encoding):
+        if coding in content_codings:
+            return coding
+        if coding == '*':
+            # any coding not named in the header, gzip;q=0 still refuses gzip
+            for default in content_codings:
+                if default not in choices:
+                    return default
+    return None
+
+def columnar(value):
+    """
+    Lists of rows, at any depth, with their keys written once
+    """
+    if isinstance(value, list) and value and tabular(value):
+        names = list(dict.fromkeys(name for row in value for name in row))
+        return {
+            'columns': {name: [columnar(row.get(name)) for row in value] for name in names},
+            'count': len(value),
+        }
+    if isinstance(value, dict):
+        return {key: columnar(item) for (key, item) in value.items()}
+    return value
+
+def encode_arrow(rows):
+    import pyarrow as pa
+    table = pa.Table.from_pylist(rows)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def encode_msgpack(value):
+    import msgpack
+    return msgpack.packb(value, use_bin_type=True, default=str)
+
+encoders = {
+    'json': json.dumps,
+    'columnar': lambda value: json.dumps(columnar(value)),
+    'msgpack': encode_msgpack,
+    'arrow': encode_arrow,
+}
+
+def encode(value, format):
+    """
+    str for the JSON formats, bytes for the binary ones
+    """
+    return encoders[format](value)
+
+def compress(data, coding, level):
+    if isinstance(data, str):
+        data = data.encode()
+    if coding == 'gzip':
+        # mtime=0 keeps the output the same for the same body
+        buffer = io.BytesIO()
+        with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=level, mtime=0) as file:
+            file.write(data)
+        return buffer.getvalue()
+    if coding == 'deflate':
+        # HTTP deflate is the zlib format, not a raw deflate stream
+        return zlib.compress(data, level)
+    raise ValueError('unknown content coding {}'.format(coding))
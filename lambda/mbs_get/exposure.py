@@ -0,0 +1,115 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from gremlin_python.process.graph_traversal import __
+from gremlin_python.process.traversal import T
+
+
+SECURITY_LOAN_EDGE = 'has securitized loan'
+
+# related collection -> step from a loan to its neighbours of that kind, edge labels from target_mappings.json
+loan_neighbours = {
+    'borrowers': lambda: __.out('has borrower'),
+    'properties': lambda: __.out('is collateralized by'),
+    'servicers': lambda: __.in_('services loan'),
+    'sellers': lambda: __.in_('originates loan'),
+}
+
+# loans reached from a seller or servicer vertex
+entity_loan_edges = {
+    'seller': 'originates loan',
+    'servicer': 'services loan',
+}
+
+
+def vertex_values():
+    return __.project('id', 'values').by(T.id).by(__.valueMap().by(__.unfold()))
+
+def security_exposure(start, max_loans, max_fanout, depth):
+    """
+    security -> loan -> {borrower, property, servicer, seller} in one traversal. Loans
+    carry the ids of their neighbours, the neighbour vertices are returned once each.
+    """
+    if depth >= 2:
+        names = list(loan_neighbours)
+        loan = __.project('id', 'values', *names).by(T.id).by(__.valueMap().by(__.unfold()))
+        for name in names:
+            loan = loan.by(loan_neighbours[name]().limit(max_fanout).id().fold())
+    else:
+        names = []
+        loan = vertex_values()
+
+    request = start.project('security', 'loan_count', 'loans', *names) \
+        .by(vertex_values()) \
+        .by(__.out(SECURITY_LOAN_EDGE).limit(max_loans + 1).count()) \
+        .by(__.out(SECURITY_LOAN_EDGE).limit(max_loans).map(loan).fold())
+    for name in names:
+        # flatMap keeps the fan-out limit per loan, dedup collapses shared servicers and sellers
+        request = request.by(__.out(SECURITY_LOAN_EDGE).limit(max_loans)
+            .flatMap(loan_neighbours[name]().limit(max_fanout)).dedup().map(vertex_values()).fold())
+    return request
+
+def entity_exposure(start, label, max_loans, max_fanout, depth):
+    """
+    seller or servicer -> loan -> security, with the number of the entity's loans in each
+    security. Depth 1 stops at the entity's loans.
+    """
+    loans = lambda: __.out(entity_loan_edges[label]).limit(max_loans)
+    request = start.project('entity', 'loan_count', *(['exposed_loans', 'securities'] if depth >= 2 else ['loans'])) \
+        .by(vertex_values()) \
+        .by(__.out(entity_loan_edges[label]).limit(max_loans + 1).count())
+    if depth < 2:
+        return request.by(loans().map(vertex_values()).fold())
+    return request \
+        .by(loans().flatMap(__.in_(SECURITY_LOAN_EDGE).limit(max_fanout)).groupCount().by(T.id)) \
+        .by(loans().flatMap(__.in_(SECURITY_LOAN_EDGE).limit(max_fanout)).dedup().map(vertex_values()).fold())
+
+
+def decoded(vertex, decode):
+    return dict(decode([vertex['values']])[0], id=vertex['id'])
+
+def shape_security_exposure(result, max_loans, decode):
+    response = {
+        'security': decoded(result['security'], decode),
+        'loans': [],
+        'truncated': result['loan_count'] > max_loans,
+    }
+    for loan in result['loans']:
+        shaped = decoded(loan, decode)
+        for name in loan_neighbours:
+            if name in loan:
+                shaped[name] = loan[name]
+        response['loans'].append(shaped)
+    for name in loan_neighbours:
+        if name in result:
+            response[name] = {vertex['id']: decoded(vertex, decode) for vertex in result[name]}
+    return response
+
+def shape_entity_exposure(result, max_loans, decode):
+    response = {
+        'entity': decoded(result['entity'], decode),
+        'truncated': result['loan_count'] > max_loans,
+    }
+    if 'loans' in result:
+        response['loans'] = [decoded(loan, decode) for loan in result['loans']]
+        return response
+    securities = []
+    for vertex in result['securities']:
+        security = decoded(vertex, decode)
+        security['exposed_loans'] = result['exposed_loans'].get(vertex['id'], 0)
+        securities.append(security)
+    securities.sort(key=lambda security: security['exposed_loans'], reverse=True)
+    response['securities'] = securities
+    return response
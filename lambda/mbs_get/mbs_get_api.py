@@ -15,21 +15,24 @@
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 import os, sys
 import backoff
-from gremlin_python import statics
-from gremlin_python.driver.driver_remote_connection import DriverRemoteConnection
-from gremlin_python.driver.protocol import GremlinServerError
-from gremlin_python.driver import serializer
-from gremlin_python.process.anonymous_traversal import traversal
+from concurrent.futures import ThreadPoolExecutor
 from gremlin_python.process.graph_traversal import __
-from gremlin_python.process.strategies import *
-from gremlin_python.process.traversal import T
-from aiohttp.client_exceptions import ClientConnectorError
-from botocore.auth import SigV4Auth
-from botocore.awsrequest import AWSRequest
-from botocore.credentials import ReadOnlyCredentials
-from types import SimpleNamespace
+from gremlin_python.process.traversal import T, P
+from collections import namedtuple
+from datetime import datetime
+from result_cache import ResultCache, shared_tiers
+from metrics import EmbeddedMetrics, summarize
+import cashflows
+import encoding
+import exposure
+import base64
+import functools
+import io
 import json
 import logging
+import re
+import threading
+import time
 
 logger = logging.getLogger()
 logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO'))
@@ -46,37 +49,78 @@ reconnectable_err_msgs = [
 
 retriable_err_msgs = ['ConcurrentModificationException'] + reconnectable_err_msgs
 
-network_errors = [OSError, ClientConnectorError]
+# aiohttp's ClientConnectorError is an OSError, and Exception covers GremlinServerError,
+# so neither module has to be imported for these checks
+network_errors = [OSError]
 
-retriable_errors = [GremlinServerError, RuntimeError, Exception] + network_errors
+retriable_errors = [RuntimeError, Exception] + network_errors
 
 CLUSTER_ENDPOINT = os.environ['CLUSTER_ENDPOINT']
 CLUSTER_PORT = os.environ['CLUSTER_PORT']
+# Neptune only accepts TLS, ws is for a local Gremlin Server
+CLUSTER_PROTOCOL = os.environ.get('CLUSTER_PROTOCOL', 'wss')
 HTTP_SUCCESS = 200
 HTTP_INTERNAL_ERROR = 500
 
+# SigV4 signed handshakes are only accepted for 5 minutes, and the pool reuses the
+# signed headers whenever it reopens a socket
+SIGNATURE_MAX_AGE = int(os.environ.get('SIGNATURE_MAX_AGE', '240'))
+CREDENTIAL_REFRESH_MARGIN = int(os.environ.get('CREDENTIAL_REFRESH_MARGIN', '60'))
+# gremlinpython 3.5.1 decodes GraphBinary several times slower than GraphSON v2, whose
+# messages are bigger, see tools.serializer_benchmark
+MESSAGE_SERIALIZER = os.environ.get('MESSAGE_SERIALIZER', 'graphsonv2')
+POOL_SIZE = int(os.environ.get('POOL_SIZE', '4'))
+MAX_BATCH_IDS = int(os.environ.get('MAX_BATCH_IDS', '1000'))
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', '256'))
+CACHE_TTL_SECONDS = int(os.environ.get('CACHE_TTL_SECONDS', '60'))
+CACHE_SHARED_TIER = os.environ.get('CACHE_SHARED_TIER', '')
+DEFAULT_PAGE_SIZE = int(os.environ.get('DEFAULT_PAGE_SIZE', '1000'))
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', '5000'))
+EXPOSURE_MAX_LOANS = int(os.environ.get('EXPOSURE_MAX_LOANS', '5000'))
+EXPOSURE_MAX_FANOUT = int(os.environ.get('EXPOSURE_MAX_FANOUT', '10'))
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'MBS/GetApi')
+# share of invocations writing a metrics record, failed invocations always do
+METRICS_SAMPLE_RATE = float(os.environ.get('METRICS_SAMPLE_RATE', '1.0'))
+LOG_BODY_MAX_CHARS = int(os.environ.get('LOG_BODY_MAX_CHARS', '512'))
+# smaller bodies are sent as they are even when the client accepts gzip or deflate
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', '1024'))
+COMPRESSION_LEVEL = int(os.environ.get('COMPRESSION_LEVEL', '5'))
+
 
 if CLUSTER_ENDPOINT is None or CLUSTER_PORT is None:
     raise ValueError('init_environment_variables, environment variables were not loaded')
 
+# class names in gremlin_python.driver.serializer, imported with the driver on first connect
+message_serializers = {
+    'graphbinary': 'GraphBinarySerializersV1',
+    'graphsonv2': 'GraphSONSerializersV2d0',
+    'graphsonv3': 'GraphSONSerializersV3d0',
+}
 
-def prepare_iamdb_request(database_url):
-        
-    service = 'neptune-db'
-    method = 'GET'
+if MESSAGE_SERIALIZER not in message_serializers:
+    raise ValueError('MESSAGE_SERIALIZER must be one of {}'.format(', '.join(message_serializers)))
 
-    access_key = os.environ['AWS_ACCESS_KEY_ID']
-    secret_key = os.environ['AWS_SECRET_ACCESS_KEY']
-    region = os.environ['AWS_REGION']
-    session_token = os.environ['AWS_SESSION_TOKEN']
-    
-    creds = SimpleNamespace(
-        access_key=access_key, secret_key=secret_key, token=session_token, region=region,
-    )
 
-    request = AWSRequest(method=method, url=database_url, data=None)
-    SigV4Auth(creds, service, region).add_auth(request)
-    return (database_url, request.headers.items())
+# opened in the background on import, see start_connection()
+CONNECT_ON_INIT = os.environ.get('CONNECT_ON_INIT', 'true') == 'true'
+
+connection_state = {
+    'created_at': None,
+    'expires_at': None,
+    'retries': 0,
+    'reconnects': 0,
+    'proactive_reconnects': 0,
+}
+
+
+def prepare_iamdb_request(database_url):
+    # signing lives in the neptune_iam layer shared with the security summary job, and
+    # is only imported for signed connections
+    import neptune_iam
+    (database_url, headers, credentials_expire_at) = neptune_iam.prepare_iamdb_request(database_url)
+    # re-sign before either the signature or the credentials it was made with expire
+    expires_at = min(time.time() + SIGNATURE_MAX_AGE, credentials_expire_at - CREDENTIAL_REFRESH_MARGIN)
+    return (database_url, headers, expires_at)
         
 def is_retriable_error(e):
 
@@ -109,13 +153,38 @@ def reset_connection_if_connection_issue(params):
         is_reconnectable = any(reconnectable_err_msg in err_msg for reconnectable_err_msg in reconnectable_err_msgs)
         
     logger.info('is_reconnectable: {}'.format(is_reconnectable))
+    connection_state['retries'] += 1
         
     if is_reconnectable:
-        global conn
-        global g
+        reconnect()
+        connection_state['reconnects'] += 1
+        
+def reconnect():
+    global conn
+    global g
+    if conn is not None:
         conn.close()
-        conn = create_remote_connection()
-        g = create_graph_traversal_source(conn)
+    conn = create_remote_connection()
+    g = create_graph_traversal_source(conn)
+    
+def refresh_connection_before_expiry():
+    expires_at = connection_state['expires_at']
+    if expires_at is not None and time.time() >= expires_at:
+        logger.info('Signature or credentials about to expire, reconnecting')
+        reconnect()
+        connection_state['proactive_reconnects'] += 1
+        
+def connection_age():
+    created_at = connection_state['created_at']
+    return None if created_at is None else round(time.time() - created_at, 3)
+
+def connection_metrics():
+    return {
+        'connection_age_seconds': connection_age(),
+        'retries': connection_state['retries'],
+        'reconnects': connection_state['reconnects'],
+        'proactive_reconnects': connection_state['proactive_reconnects'],
+    }
      
 @backoff.on_exception(backoff.constant,
     tuple(retriable_errors),
@@ -126,107 +195,747 @@ def reset_connection_if_connection_issue(params):
     interval=1)
     
 def create_graph_traversal_source(conn):
+    from gremlin_python.process.anonymous_traversal import traversal
     return traversal().withRemote(conn)
     
 def create_remote_connection():
+    # the driver pulls in aiohttp, it is imported by the connecting thread
+    from gremlin_python.driver import serializer
+    from gremlin_python.driver.driver_remote_connection import DriverRemoteConnection
     logger.info('Creating remote connection')
     
-    (database_url, headers) = connection_info()
+    (database_url, headers, expires_at) = connection_info()
+    connection_state['created_at'] = time.time()
+    connection_state['expires_at'] = expires_at
 
     return DriverRemoteConnection(
         database_url,
         'g',
-        pool_size=1,
-        message_serializer=serializer.GraphSONSerializersV2d0(),
+        pool_size=POOL_SIZE,
+        message_serializer=getattr(serializer, message_serializers[MESSAGE_SERIALIZER])(),
         headers=headers
         )
     
 def connection_info():
     
-    database_url = 'wss://{}:{}/gremlin'.format(CLUSTER_ENDPOINT, CLUSTER_PORT)
+    database_url = '{}://{}:{}/gremlin'.format(CLUSTER_PROTOCOL, CLUSTER_ENDPOINT, CLUSTER_PORT)
     
     if 'USE_IAM' in os.environ and os.environ['USE_IAM'] == 'true':
         return prepare_iamdb_request(database_url)
     else:
-        return (database_url, {})
+        return (database_url, {}, None)
     
-conn = create_remote_connection()
-g = create_graph_traversal_source(conn)
+conn = None
+g = None
+connection_executor = ThreadPoolExecutor(max_workers=1)
+connection_future = None
 
-    
-def whole(v):
+def connect():
+    global conn
+    global g
+    conn = create_remote_connection()
+    g = create_graph_traversal_source(conn)
+
+def start_connection():
+    # the driver import, SigV4 signing and WebSocket handshake run on a background thread
+    # while the rest of the module loads and the first request is parsed
+    global connection_future
+    if connection_future is None:
+        connection_future = connection_executor.submit(connect)
+
+def ensure_connection():
+    global connection_future
+    start_connection()
     try:
-        return float(v)
-    except ValueError:
-        return v
-        
+        connection_future.result()
+    except Exception:
+        # the next call starts over instead of failing on the same future forever
+        connection_future = None
+        raise
+
+if CONNECT_ON_INIT:
+    start_connection()
+
+
+# Vertex ID conventions from resources/config/dms_json_mappings/target_mappings.json.
+# DMS uses the rendered vertex_id_template as the vertex ID, so a source key can be
+# resolved with g.V(id) instead of scanning every vertex with the label.
+vertex_id_templates = {
+    'loan': '{loan_id}',
+    'security': '{cusip}',
+    'seller': '{seller_id}',
+    'servicer': '{servicer_id}',
+}
+
+# Non string property types from target_mappings.json, derived from sqlscripts/ddl/create_tables.sql
+property_value_types = {
+    'original_interest_rate': 'Double',
+    'original_principal_balance': 'Double',
+    'unpaid_principal_balance': 'Double',
+    'loan_term': 'Int',
+    'issuance_date': 'Date',
+    'principal_pymnt': 'Double',
+    'int_pymnt': 'Double',
+    'rem_mnths_to_maturity': 'Int',
+    'rem_unpaid_principal_balance': 'Double',
+    'payment_date': 'Date',
+    'security_value': 'Double',
+    'percentage': 'Long',
+    # precomputed by the security_summary job
+    'pool_upb': 'Double',
+    'pool_original_upb': 'Double',
+    'pool_factor': 'Double',
+    'wac': 'Double',
+    'wam': 'Double',
+    'loan_count': 'Int',
+}
+
+# Properties holding the source key, only used when the ID scheme of a label is unknown
+vertex_key_properties = {
+    'loan': 'loan_id',
+    'seller': 'id',
+    'servicer': 'id',
+}
+
+TEMPLATE_FIELD = re.compile(r'{(\w+)}')
+
+
+def load_target_mappings(mappings_file):
+    
+    templates = {}
+    types = {}
+    with open(mappings_file, mode='r') as jsonfile:
+        mappings = json.load(jsonfile)
         
+    for rule in mappings['rules']:
+        for vertex in rule.get('vertex_definitions', []):
+            templates[vertex['vertex_label']] = vertex['vertex_id_template']
+            for prop in vertex.get('vertex_properties', []):
+                types[prop['property_name']] = prop['property_value_type']
+        for edge in rule.get('edge_definitions', []):
+            for prop in edge.get('edge_properties', []):
+                types[prop['property_name']] = prop['property_value_type']
+    
+    return (templates, {name: value_type for name, value_type in types.items() if value_type != 'String'})
+    
+def compile_vertex_id_templates(templates):
+    
+    compiled = {}
+    for label, template in templates.items():
+        fields = TEMPLATE_FIELD.findall(template)
+        # a single key can only be rendered into templates with exactly one column
+        if len(fields) == 1:
+            (prefix, suffix) = template.split('{' + fields[0] + '}')
+            compiled[label] = (prefix, suffix)
+        else:
+            logger.warning('vertex_id_template {} for label {} is not resolvable from a single key'.format(template, label))
+    
+    return compiled
+
+if 'TARGET_MAPPINGS_FILE' in os.environ:
+    (vertex_id_templates, property_value_types) = load_target_mappings(os.environ['TARGET_MAPPINGS_FILE'])
+    
+vertex_id_resolvers = compile_vertex_id_templates(vertex_id_templates)
+
+
+def resolve_vertex_id(label, key):
+    resolver = vertex_id_resolvers.get(label)
+    if resolver is None:
+        return None
+    (prefix, suffix) = resolver
+    return '{}{}{}'.format(prefix, key, suffix)
+    
+def lookup_vertex(label, key):
+    vertex_id = resolve_vertex_id(label, key)
+    if vertex_id is not None:
+        return g.V(vertex_id).hasLabel(label)
+    
+    key_property = vertex_key_properties.get(label)
+    if key_property is None:
+        raise ValueError('no vertex ID template or key property for label {}'.format(label))
+    
+    logger.warning('falling back to property scan for label {}'.format(label))
+    return g.V().hasLabel(label).has(key_property, key)
+    
+def lookup_vertices(label, keys):
+    # returns the traversal and, for each key, the value the matched vertex is grouped under
+    vertex_ids = [resolve_vertex_id(label, key) for key in keys]
+    if None not in vertex_ids:
+        return (g.V(*vertex_ids).hasLabel(label), T.id, dict(zip(keys, vertex_ids)))
+    
+    key_property = vertex_key_properties.get(label)
+    if key_property is None:
+        raise ValueError('no vertex ID template or key property for label {}'.format(label))
+    
+    logger.warning('falling back to property scan for label {}'.format(label))
+    return (g.V().hasLabel(label).has(key_property, P.within(*keys)), key_property, {key: key for key in keys})
+
+    
+@functools.lru_cache(maxsize=4096)
+def decode_date(v):
+    # GraphBinary and GraphSON return Date properties as datetime, which json.dumps can't encode.
+    # Result sets repeat a few payment and issuance months, so the strings are cached
+    if hasattr(v, 'isoformat'):
+        return v.isoformat()[:10]
+    return v
+    
+value_decoders = {
+    'Double': float,
+    'Float': float,
+    'Int': int,
+    'Long': int,
+    'Date': decode_date,
+}
+
+# the type each decoder returns, values already of that type are left alone
+decoded_types = {
+    float: float,
+    int: int,
+    decode_date: str,
+}
+
+# property name -> decoder, only for properties that are not strings
+property_decoders = {name: value_decoders[value_type] for name, value_type in property_value_types.items() if value_type in value_decoders}
+
+
+# seconds spent in the traversal, in transform() and in encoding the response by the
+# invocation running on this thread
+invocation_timings = threading.local()
+
+def reset_timings():
+    invocation_timings.phases = {'traversal': 0.0, 'transform': 0.0, 'serialization': 0.0}
+    invocation_timings.query = None
+    invocation_timings.results = 0
+    invocation_timings.depth = 0
+    # the connection counters are per container, the difference is this invocation's share
+    invocation_timings.connection_before = dict(connection_state)
+    invocation_timings.cache_before = result_cache.stats()
+
+def add_timing(phase, seconds):
+    phases = getattr(invocation_timings, 'phases', None)
+    if phases is not None:
+        phases[phase] += seconds
+
+def timings():
+    return dict(getattr(invocation_timings, 'phases', {}))
+
+def result_count(result):
+    if result is None:
+        return 0
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, dict):
+        if 'results' in result:
+            return sum(len(loans) for loans in result['results'].values() if loans is not None)
+        for collection in ('month', 'loans', 'securities'):
+            if collection in result:
+                return len(result[collection])
+    return 1
+
+def instrumented(function):
+    """
+    Times a query function as traversal, less what transform() and serialization took
+    inside it, and counts its results. Nested instrumented calls count once.
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if getattr(invocation_timings, 'phases', None) is None:
+            return function(*args, **kwargs)
+        invocation_timings.depth += 1
+        before = timings()
+        start = time.perf_counter()
+        try:
+            result = function(*args, **kwargs)
+        finally:
+            invocation_timings.depth -= 1
+        if invocation_timings.depth == 0:
+            after = timings()
+            inner = sum(after[phase] - before[phase] for phase in ('transform', 'serialization'))
+            add_timing('traversal', time.perf_counter() - start - inner)
+            # get_all_vertices counts its vertices while streaming them
+            if not isinstance(result, str):
+                invocation_timings.results += result_count(result)
+        return result
+    return wrapper
+
+
 def transform(items):
+    # typed serializers return numbers as float or int and dates as datetime: only values
+    # not already of their decoded type are decoded, and only those rows are copied
+    start = time.perf_counter()
     resp = []
     for item in items:
-        loan = {}
+        loan = item
         for k,v in item.items():
-            loan[k] = whole(v)
+            decoder = property_decoders.get(k)
+            if decoder is None or v is None or type(v) is decoded_types[decoder]:
+                continue
+            try:
+                value = decoder(v)
+            except ValueError:
+                logger.warning('could not decode property {} value {}'.format(k, v))
+                continue
+            if loan is item:
+                loan = dict(item)
+            loan[k] = value
         resp.append(loan)
-    return resp            
-    
-def invalid_request_response():
+    add_timing('transform', time.perf_counter() - start)
+    return resp
+
+def invalid_request_response(message='Invalid request type'):
     return{
         'statusCode': HTTP_SUCCESS,
         'headers': {
             'Content-Type': 'application/json'
         },
-        'body': 'Invalid request type'
+        'body': message
     }
         
+
+# hot CUSIP, seller and servicer results, reused across warm invocations
+result_cache = ResultCache(
+    CACHE_MAX_ENTRIES,
+    CACHE_TTL_SECONDS,
+    shared_tier=shared_tiers[CACHE_SHARED_TIER]() if CACHE_SHARED_TIER else None
+)
+
+
+def run_concurrently(traversals):
+    # submit every traversal before waiting on any, so the slowest one bounds the latency
+    futures = {name: traversal.promise(lambda t: t.toList()) for name, traversal in traversals.items()}
+    return {name: future.result() for name, future in futures.items()}
     
-def get_all_loans_by_cusip(id):
-   request=g.V(id).outE().inV().valueMap().by(__.unfold()).toList()
-   return transform(request)
     
-def get_all_loans_by_seller(id):
-    request=g.V().hasLabel('seller').has('id',id).outE().inV().valueMap().by(__.unfold()).toList()
-    return transform(request)      
+# Field selection and server side predicates for the neighbour queries, hashable so
+# it can be part of the cache key
+ResultFilters = namedtuple('ResultFilters', ['fields', 'edge_label', 'predicates'])
+
+DEFAULT_FILTERS = ResultFilters((), None, ())
+
+# request parameter -> (property, predicate, value parser)
+filter_parameters = {
+    'loan_status': ('loan_status', 'eq', str),
+    'min_upb': ('unpaid_principal_balance', 'gte', float),
+    'max_upb': ('unpaid_principal_balance', 'lte', float),
+    'issued_after': ('issuance_date', 'gte', lambda v: datetime.strptime(v, '%Y-%m-%d')),
+    'issued_before': ('issuance_date', 'lte', lambda v: datetime.strptime(v, '%Y-%m-%d')),
+}
+
+
+def parse_result_filters(params):
+    fields = tuple(field for field in (params.get('fields') or '').split(',') if field)
+    predicates = []
+    for (parameter, (name, predicate, parse)) in filter_parameters.items():
+        if params.get(parameter) is not None:
+            try:
+                predicates.append((name, predicate, parse(params[parameter])))
+            except ValueError:
+                raise ValueError('Invalid value for {}'.format(parameter))
+    return ResultFilters(fields, params.get('edge_label'), tuple(predicates))
+
+def filtered_neighbours(request, filters):
+    # works on a traversal or on __ for an anonymous one
+    request = request.outE(filters.edge_label) if filters.edge_label else request.outE()
+    request = request.inV()
+    for (name, predicate, value) in filters.predicates:
+        request = request.has(name, getattr(P, predicate)(value))
+    return request.valueMap(*filters.fields).by(__.unfold())
+
+def get_all_loans_by_label(label, id, filters):
+    request=filtered_neighbours(lookup_vertex(label, id), filters).toList()
+    return transform(request)
+
+@instrumented
+def get_all_loans_by_cusip(id, filters=DEFAULT_FILTERS):
+   return result_cache.get_or_load(('loansbycusip', str(id), filters), lambda: get_all_loans_by_label('security', id, filters))
+    
+@instrumented
+def get_all_loans_by_seller(id, filters=DEFAULT_FILTERS):
+    return result_cache.get_or_load(('loansbyseller', str(id), filters), lambda: get_all_loans_by_label('seller', id, filters))
+        
+@instrumented
+def get_all_loans_by_servicer(id, filters=DEFAULT_FILTERS):
+   return result_cache.get_or_load(('loansbyservicer', str(id), filters), lambda: get_all_loans_by_label('servicer', id, filters))
         
-def get_all_loans_by_servicer(id):
-   request=g.V().hasLabel('servicer').has('id',id).outE().inV().valueMap().by(__.unfold()).toList()
-   return transform(request)    
+def get_all_loans_by_ids(query, label, ids, filters):
+    ids = [str(id) for id in dict.fromkeys(ids)]
+    if len(ids) == 0 or len(ids) > MAX_BATCH_IDS:
+        raise ValueError('between 1 and {} ids are allowed per request'.format(MAX_BATCH_IDS))
+    
+    # ids cached by earlier single or batched requests are not queried again
+    results = {id: result_cache.get((query, id, filters)) for id in ids}
+    uncached = [id for id in ids if results[id] is None]
+    
+    missing = []
+    if uncached:
+        (request, group_key, grouped_under) = lookup_vertices(label, uncached)
+        # one traversal for all ids, neighbours grouped by the vertex they were reached from
+        groups = request.group().by(group_key).by(filtered_neighbours(__, filters).fold()).next()
+        
+        for id in uncached:
+            neighbours = groups.get(grouped_under[id])
+            if neighbours is None:
+                missing.append(id)
+            else:
+                results[id] = transform(neighbours)
+                result_cache.put((query, id, filters), results[id])
+    
+    return {'results': results, 'missing': missing}
+    
+@instrumented
+def get_all_loans_by_cusips(ids, filters=DEFAULT_FILTERS):
+    return get_all_loans_by_ids('loansbycusip', 'security', ids, filters)
+    
+@instrumented
+def get_all_loans_by_sellers(ids, filters=DEFAULT_FILTERS):
+    return get_all_loans_by_ids('loansbyseller', 'seller', ids, filters)
+    
+@instrumented
+def get_all_loans_by_servicers(ids, filters=DEFAULT_FILTERS):
+    return get_all_loans_by_ids('loansbyservicer', 'servicer', ids, filters)
+        
+@instrumented
+def get_loan_detail(id):
+    results = run_concurrently({
+        'loan': lookup_vertex('loan', id).valueMap().by(__.unfold()),
+        'borrowers': lookup_vertex('loan', id).out('has borrower').valueMap().by(__.unfold()),
+        'properties': lookup_vertex('loan', id).out('is collateralized by').valueMap().by(__.unfold()),
+        'activity': lookup_vertex('loan', id).out('has snapshot').valueMap().by(__.unfold()),
+    })
+    
+    loan = transform(results['loan'])
+    return {
+        'loan': loan[0] if loan else None,
+        'borrowers': transform(results['borrowers']),
+        'properties': transform(results['properties']),
+        'activity': transform(results['activity']),
+    }
+        
+@instrumented
+def get_security_summary(id):
+    # one vertex lookup, the metrics are maintained on the security by the summary job
+    def load():
+        request = lookup_vertex('security', id).valueMap().by(__.unfold()).toList()
+        summary = transform(request)
+        return summary[0] if summary else None
+    return result_cache.get_or_load(('securitysummary', str(id)), load)
+        
+
+def parse_limit(params, name, default, maximum):
+    value = params.get(name)
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValueError('{} must be a number'.format(name))
+    if value < 1 or value > maximum:
+        raise ValueError('{} must be between 1 and {}'.format(name, maximum))
+    return value
+
+def parse_exposure_limits(params):
+    # depth 1 stops at the loans, depth 2 expands every loan to its neighbours
+    return (
+        parse_limit(params, 'depth', 2, 2),
+        parse_limit(params, 'max_loans', EXPOSURE_MAX_LOANS, EXPOSURE_MAX_LOANS),
+        parse_limit(params, 'max_fanout', EXPOSURE_MAX_FANOUT, EXPOSURE_MAX_FANOUT),
+    )
+
+@instrumented
+def get_security_exposure(id, limits):
+    (depth, max_loans, max_fanout) = limits
+    def load():
+        request = exposure.security_exposure(lookup_vertex('security', id), max_loans, max_fanout, depth).toList()
+        return exposure.shape_security_exposure(request[0], max_loans, transform) if request else None
+    return result_cache.get_or_load(('securityexposure', str(id), limits), load)
+
+@instrumented
+def get_entity_exposure(label, id, limits):
+    (depth, max_loans, max_fanout) = limits
+    def load():
+        request = exposure.entity_exposure(lookup_vertex(label, id), label, max_loans, max_fanout, depth).toList()
+        return exposure.shape_entity_exposure(request[0], max_loans, transform) if request else None
+    return result_cache.get_or_load((label + 'exposure', str(id), limits), load)
+
+
+def parse_date_range(params):
+    dates = []
+    for name in ('start_date', 'end_date'):
+        value = params.get(name)
+        try:
+            dates.append(None if value is None else datetime.strptime(value, '%Y-%m-%d'))
+        except ValueError:
+            raise ValueError('{} must be a YYYY-MM-DD date'.format(name))
+    if None not in dates and dates[0] > dates[1]:
+        raise ValueError('start_date must not be after end_date')
+    return tuple(dates)
+
+@instrumented
+def get_security_cashflows(id, date_range):
+    # monthly principal, interest and UPB of the pool, summed per payment date in the traversal
+    def load():
+        groups = cashflows.security_cashflows(lookup_vertex('security', id), *date_range).next()
+        return dict(cashflows.shape_security_cashflows(groups, decode_date), cusip=str(id))
+    return result_cache.get_or_load(('securitycashflows', str(id), date_range), load)
+
+@instrumented
+def get_loan_cashflows(id, date_range):
+    def load():
+        rows = transform(cashflows.loan_cashflows(lookup_vertex('loan', id), *date_range).toList())
+        return dict(cashflows.shape_loan_cashflows(rows), loan_id=str(id))
+    return result_cache.get_or_load(('loancashflows', str(id), date_range), load)
+        
+
+def encode_cursor(last_id, label):
+    cursor = json.dumps({'after': last_id, 'label': label})
+    return base64.urlsafe_b64encode(cursor.encode()).decode()
+    
+def decode_cursor(cursor, label):
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except ValueError:
+        raise ValueError('Invalid cursor')
+    # a cursor is only valid for the label filter it was issued for
+    if decoded.get('label') != label or 'after' not in decoded:
+        raise ValueError('Invalid cursor')
+    return decoded['after']
+    
+def parse_page_size(page_size):
+    if page_size is None:
+        return DEFAULT_PAGE_SIZE
+    try:
+        page_size = int(page_size)
+    except (TypeError, ValueError):
+        raise ValueError('page_size must be an integer')
+    if page_size < 1 or page_size > MAX_PAGE_SIZE:
+        raise ValueError('page_size must be between 1 and {}'.format(MAX_PAGE_SIZE))
+    return page_size
+
+@instrumented
+def get_all_vertices(page_size=None, cursor=None, label=None):
+    """
+    A page of vertices in id order and the cursor of the next page. Pages seek past the
+    last id with has(T.id, P.gt(...)) and order().by(T.id), which relies on Neptune
+    keeping vertex ids as strings in an id ordered index: the range and the order are
+    read from the index, and compare ids the same way, so no page is skipped or repeated.
+    Servers without such an index, like the Gremlin Server of the integration tests,
+    return the same pages but sort every matching vertex for each one.
+    """
+    page_size = parse_page_size(page_size)
+    
+    request = g.V()
+    if label is not None:
+        request = request.hasLabel(label)
+    if cursor is not None:
+        # seek past the last vertex of the previous page instead of skipping with an offset
+        request = request.has(T.id, P.gt(decode_cursor(cursor, label)))
         
+    # one extra vertex tells whether there is a next page
+    request = request.order().by(T.id).limit(page_size + 1) \
+        .project('id', 'label', 'properties') \
+        .by(T.id).by(T.label).by(__.valueMap().by(__.unfold()))
+    
+    # encode vertex by vertex as results arrive rather than materializing the page twice
+    body = io.StringIO()
+    body.write('{"vertices": [')
+    last_id = None
+    count = 0
+    has_more = False
+    for vertex in request:
+        if count == page_size:
+            has_more = True
+            break
+        if count > 0:
+            body.write(', ')
+        vertex['properties'] = transform([vertex['properties']])[0]
+        start = time.perf_counter()
+        body.write(json.dumps(vertex))
+        add_timing('serialization', time.perf_counter() - start)
+        last_id = vertex['id']
+        count += 1
+    
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor(last_id, label)
+    body.write('], "count": {}, "next_cursor": {}}}'.format(count, json.dumps(next_cursor)))
+    if getattr(invocation_timings, 'phases', None) is not None:
+        invocation_timings.results += count
 
-def get_all_vertices():
-    request=g.V().__.fold()
-    return transform(request)   
+    return body.getvalue()
+    
     
+batch_queries = {
+    'loansbycusip': get_all_loans_by_cusips,
+    'loansbyseller': get_all_loans_by_sellers,
+    'loansbyservicer': get_all_loans_by_servicers,
+}
+
+entity_exposure_queries = {
+    'sellerexposure': 'seller',
+    'servicerexposure': 'servicer',
+}
+
+
+# one record per sampled invocation, dimensioned by query type
+invocation_metrics = EmbeddedMetrics(METRICS_NAMESPACE, ['Query'], METRICS_SAMPLE_RATE)
+
+def record_invocation(response, seconds, context):
+    phases = timings()
+    before = invocation_timings.connection_before
+    cache = result_cache.stats()
+    cache_delta = lambda *counters: sum(cache[counter] - invocation_timings.cache_before[counter] for counter in counters)
+    failed = response is None
+    metrics = {
+        'Latency': (seconds * 1000, 'Milliseconds'),
+        'TraversalTime': (phases['traversal'] * 1000, 'Milliseconds'),
+        'TransformTime': (phases['transform'] * 1000, 'Milliseconds'),
+        'SerializationTime': (phases['serialization'] * 1000, 'Milliseconds'),
+        'ResultCount': (invocation_timings.results, 'Count'),
+        'ResponseSize': (0 if failed else len(response['body']), 'Bytes'),
+        'Retries': (connection_state['retries'] - before['retries'], 'Count'),
+        'Reconnects': (connection_state['reconnects'] - before['reconnects'], 'Count'),
+        'ProactiveReconnects': (connection_state['proactive_reconnects'] - before['proactive_reconnects'], 'Count'),
+        'CacheHits': (cache_delta('cache_hits', 'cache_shared_hits'), 'Count'),
+        'CacheMisses': (cache_delta('cache_misses'), 'Count'),
+        'Errors': (1 if failed else 0, 'Count'),
+    }
+    # a gauge of how long the pool has been open, absent before the first connection
+    age = connection_age()
+    if age is not None:
+        metrics['ConnectionAgeSeconds'] = (age, 'Seconds')
+    invocation_metrics.emit(
+        {'Query': invocation_timings.query or 'invalid'},
+        metrics,
+        {'RequestId': getattr(context, 'aws_request_id', None), 'CacheEntries': cache['cache_entries']},
+        force=failed
+    )
+
+def encoded_response(body, format, coding):
+    # body is a str for the JSON formats and bytes for the binary ones
+    start = time.perf_counter()
+    headers = {
+        'Content-Type': encoding.content_types[format],
+        'Vary': 'Accept, Accept-Encoding'
+    }
+    if coding is not None and len(body) >= COMPRESSION_MIN_BYTES:
+        body = encoding.compress(body, coding, COMPRESSION_LEVEL)
+        headers['Content-Encoding'] = coding
+    
+    response = {
+        'statusCode': 200,
+        'headers': headers,
+        'body': body
+    }
+    if isinstance(body, bytes):
+        # API Gateway turns it back into binary, binary_media_types is */* on the API
+        response['body'] = base64.b64encode(body).decode()
+        response['isBase64Encoded'] = True
+        logger.info('response: %s, %d bytes', headers, len(body))
+    else:
+        logger.info('response: %s', summarize(body, LOG_BODY_MAX_CHARS))
+    add_timing('serialization', time.perf_counter() - start)
+    return response
 
 def lambda_handler(event, context):
+    reset_timings()
+    start = time.perf_counter()
+    response = None
+    try:
+        response = handle_request(event)
+        return response
+    finally:
+        record_invocation(response, time.perf_counter() - start, context)
+
+def handle_request(event):
     request = event.get('body', None)
-    logger.info(f'request: {json.dumps(request)}')
    
     if request is None:
-        invalid_request_response()
+        return invalid_request_response()
+    if event.get('isBase64Encoded'):
+        request = base64.b64decode(request).decode()
+    logger.info('request: %s', summarize(request, LOG_BODY_MAX_CHARS))
       
+    start_connection()
     body = json.loads(request)
+    
+    ensure_connection()
+    refresh_connection_before_expiry()
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('connection: %s', connection_metrics())
 
-    param = body['queryStringParameters']['param']
-    id = body['queryStringParameters']['id']
+    params = body['queryStringParameters']
+    param = params['param']
+    invocation_timings.query = str(param)
+    id = params.get('id')
+    
+    # a list of ids, or a comma separated ids parameter, runs the query for all of them at once
+    ids = params.get('ids')
+    if isinstance(id, list):
+        ids = id
+    elif isinstance(ids, str):
+        ids = ids.split(',')
     
-    if(str(param) == "loansbycusip"):
-        response = get_all_loans_by_cusip(id)
+    try:
+        filters = parse_result_filters(params)
+    except ValueError as e:
+        return invalid_request_response(str(e))
+    
+    headers = event.get('headers')
+    accept = encoding.header(headers, 'accept')
+    coding = encoding.negotiate_compression(encoding.header(headers, 'accept-encoding'))
+    
+    if ids is not None and str(param) in batch_queries:
+        try:
+            response = batch_queries[str(param)](ids, filters)
+        except ValueError as e:
+            return invalid_request_response(str(e))
+    elif(str(param) == "loansbycusip"):
+        response = get_all_loans_by_cusip(id, filters)
     elif(str(param) == "loansbyseller"):
-        response = get_all_loans_by_seller(id)
+        response = get_all_loans_by_seller(id, filters)
     elif(str(param) == "loansbyservicer"):
-        response = get_all_loans_by_servicer(id)
+        response = get_all_loans_by_servicer(id, filters)
+    elif(str(param) == "securitysummary"):
+        response = get_security_summary(id)
+    elif(str(param) == "loandetail"):
+        response = get_loan_detail(id)
+    elif(str(param) == "securityexposure" or str(param) in entity_exposure_queries):
+        try:
+            limits = parse_exposure_limits(params)
+        except ValueError as e:
+            return invalid_request_response(str(e))
+        if str(param) == "securityexposure":
+            response = get_security_exposure(id, limits)
+        else:
+            response = get_entity_exposure(entity_exposure_queries[str(param)], id, limits)
+    elif(str(param) == "securitycashflows" or str(param) == "loancashflows"):
+        try:
+            date_range = parse_date_range(params)
+        except ValueError as e:
+            return invalid_request_response(str(e))
+        if str(param) == "securitycashflows":
+            response = get_security_cashflows(id, date_range)
+        else:
+            response = get_loan_cashflows(id, date_range)
     elif(str(param) == "getallvertices"):
-        response = get_all_vertices()
+        try:
+            # the page is encoded while it streams in, so it is only available as json
+            encoding.negotiate_format(params.get('format'), None, None, formats=['json'])
+            response_body = get_all_vertices(params.get('page_size'), params.get('cursor'), params.get('label'))
+        except ValueError as e:
+            return invalid_request_response(str(e))
+        return encoded_response(response_body, 'json', coding)
     else:
-        invalid_request_response()
+        # unknown query types share one metrics dimension value
+        invocation_timings.query = None
+        return invalid_request_response()
     
-    logger.info(f'response: {response}')
-   
-    return{
-        'statusCode': 200,
-        'headers': {
-            'Content-Type': 'application/json'
-        },
-        'body': json.dumps(response)
-    }
+    try:
+        format = encoding.negotiate_format(params.get('format'), accept, response)
+    except ValueError as e:
+        return invalid_request_response(str(e))
+    
+    start = time.perf_counter()
+    response_body = encoding.encode(response, format)
+    add_timing('serialization', time.perf_counter() - start)
+    return encoded_response(response_body, format, coding)
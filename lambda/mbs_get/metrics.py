@@ -0,0 +1,78 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import json
+import random
+import sys
+import time
+
+
+class EmbeddedMetrics:
+    """
+    Writes CloudWatch Embedded Metric Format records to stdout, where Lambda picks them
+    up with the logs and CloudWatch extracts the metrics without any API call
+    """
+    def __init__(self, namespace, dimensions, sample_rate=1.0, stream=None, sample=random.random):
+        self.namespace = namespace
+        self.dimensions = list(dimensions)
+        self.sample_rate = sample_rate
+        self.stream = stream
+        self.sample = sample
+        self.emitted = 0
+        self.skipped = 0
+
+    def sampled(self):
+        return self.sample_rate >= 1.0 or (self.sample_rate > 0.0 and self.sample() < self.sample_rate)
+
+    def record(self, dimensions, metrics, properties=None):
+        """
+        dimensions: name -> value, metrics: name -> (value, unit), properties are
+        searchable in the log record but not turned into metrics
+        """
+        document = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': self.namespace,
+                    'Dimensions': [self.dimensions],
+                    'Metrics': [{'Name': name, 'Unit': unit} for (name, (_, unit)) in metrics.items()],
+                }],
+            },
+        }
+        document.update(properties or {})
+        document.update({name: value for (name, (value, _)) in metrics.items()})
+        document.update({name: str(dimensions.get(name)) for name in self.dimensions})
+        return document
+
+    def emit(self, dimensions, metrics, properties=None, force=False):
+        if not force and not self.sampled():
+            self.skipped += 1
+            return False
+        stream = self.stream or sys.stdout
+        stream.write(json.dumps(self.record(dimensions, metrics, properties), default=str) + '\n')
+        stream.flush()
+        self.emitted += 1
+        return True
+
+
+def summarize(body, max_chars):
+    """
+    A response body for the logs, cut at max_chars with the full size noted
+    """
+    if max_chars <= 0:
+        return '{} chars'.format(len(body))
+    if len(body) <= max_chars:
+        return body
+    return '{}... ({} chars, truncated)'.format(body[:max_chars], len(body))
@@ -0,0 +1,121 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from collections import OrderedDict
+import threading
+import time
+
+
+class ResultCache:
+    """
+    Size bounded LRU cache with a TTL, kept at module level so warm invocations
+    reuse it, with an optional shared tier consulted on local misses
+    """
+    def __init__(self, max_entries, ttl_seconds, shared_tier=None, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.shared_tier = shared_tier
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                (expires_at, value) = entry
+                if expires_at > self.clock():
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.entries[key]
+
+        if self.shared_tier is not None:
+            value = self.shared_tier.get(key)
+            if value is not None:
+                self.put_local(key, value)
+                with self.lock:
+                    self.shared_hits += 1
+                return value
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        self.put_local(key, value)
+        if self.shared_tier is not None:
+            self.shared_tier.set(key, value, self.ttl_seconds)
+
+    def put_local(self, key, value):
+        with self.lock:
+            self.entries[key] = (self.clock() + self.ttl_seconds, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key, load):
+        value = self.get(key)
+        if value is None:
+            value = load()
+            if value is not None:
+                self.put(key, value)
+        return value
+
+    def stats(self):
+        return {
+            'cache_entries': len(self.entries),
+            'cache_hits': self.hits,
+            'cache_shared_hits': self.shared_hits,
+            'cache_misses': self.misses,
+            'cache_evictions': self.evictions,
+        }
+
+
+class InMemorySharedTier:
+    """
+    Process local stand-in for a shared cache tier such as ElastiCache, for tests
+    and local runs. A shared tier only needs get(key) and set(key, value, ttl_seconds).
+    """
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.values = {}
+
+    def get(self, key):
+        entry = self.values.get(key)
+        if entry is None or entry[0] <= self.clock():
+            return None
+        return entry[1]
+
+    def set(self, key, value, ttl_seconds):
+        self.values[key] = (self.clock() + ttl_seconds, value)
+
+
+shared_tiers = {
+    'memory': InMemorySharedTier,
+}
@@ -0,0 +1,159 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import os
+from gremlin_python.driver.driver_remote_connection import DriverRemoteConnection
+from gremlin_python.driver import serializer
+from gremlin_python.process.anonymous_traversal import traversal
+from gremlin_python.process.graph_traversal import __
+from gremlin_python.process.traversal import Cardinality, Order, P, T
+import json
+import logging
+import neptune_iam
+
+logger = logging.getLogger()
+logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO'))
+
+CLUSTER_ENDPOINT = os.environ['CLUSTER_ENDPOINT']
+CLUSTER_PORT = os.environ['CLUSTER_PORT']
+# configured like the query Lambda, see mbs_get_api
+CLUSTER_PROTOCOL = os.environ.get('CLUSTER_PROTOCOL', 'wss')
+MESSAGE_SERIALIZER = os.environ.get('MESSAGE_SERIALIZER', 'graphsonv2')
+SECURITIES_PER_PAGE = int(os.environ.get('SECURITIES_PER_PAGE', '500'))
+
+# properties written on each security vertex, read back by the securitysummary query
+SUMMARY_PROPERTIES = ['pool_upb', 'pool_original_upb', 'pool_factor', 'wac', 'wam', 'loan_count', 'summary_as_of']
+
+message_serializers = {
+    'graphbinary': serializer.GraphBinarySerializersV1,
+    'graphsonv2': serializer.GraphSONSerializersV2d0,
+    'graphsonv3': serializer.GraphSONSerializersV3d0,
+}
+
+if MESSAGE_SERIALIZER not in message_serializers:
+    raise ValueError('MESSAGE_SERIALIZER must be one of {}'.format(', '.join(message_serializers)))
+
+
+def create_remote_connection():
+    logger.info('Creating remote connection')
+    
+    database_url = '{}://{}:{}/gremlin'.format(CLUSTER_PROTOCOL, CLUSTER_ENDPOINT, CLUSTER_PORT)
+    headers = {}
+    if os.environ.get('USE_IAM') == 'true':
+        # the signature is only checked on the handshake of the run's one connection
+        (database_url, headers, _) = neptune_iam.prepare_iamdb_request(database_url)
+
+    return DriverRemoteConnection(
+        database_url,
+        'g',
+        pool_size=1,
+        message_serializer=message_serializers[MESSAGE_SERIALIZER](),
+        headers=headers
+        )
+
+
+def number(value, default=0.0):
+    # the original mapping stored every property as a string
+    return default if value is None else float(value)
+
+def security_loans(g, cusip):
+    return g.V(cusip).hasLabel('security').outE('has securitized loan').project('percentage', 'loan', 'latest') \
+        .by(__.coalesce(__.values('percentage'), __.constant(100))) \
+        .by(__.inV().valueMap('original_principal_balance', 'unpaid_principal_balance', 'original_interest_rate', 'loan_term').by(__.unfold())) \
+        .by(__.inV().out('has snapshot').order().by('payment_date', Order.desc).limit(1)
+            .valueMap('rem_unpaid_principal_balance', 'rem_mnths_to_maturity', 'payment_date').by(__.unfold()).fold()) \
+        .toList()
+
+def summarize(loans):
+    pool_upb = 0.0
+    pool_original_upb = 0.0
+    rate_weight = 0.0
+    term_weight = 0.0
+    as_of = None
+    for loan in loans:
+        share = number(loan['percentage'], 100.0) / 100.0
+        attributes = loan['loan']
+        upb = number(attributes.get('unpaid_principal_balance'))
+        remaining_months = number(attributes.get('loan_term'))
+        # the latest payment, when there is one, carries the current balance and term
+        if loan['latest']:
+            latest = loan['latest'][0]
+            upb = number(latest.get('rem_unpaid_principal_balance'), upb)
+            remaining_months = number(latest.get('rem_mnths_to_maturity'), remaining_months)
+            payment_date = str(latest.get('payment_date'))[:10]
+            as_of = payment_date if as_of is None or payment_date > as_of else as_of
+        upb *= share
+        pool_upb += upb
+        pool_original_upb += share * number(attributes.get('original_principal_balance'))
+        rate_weight += upb * number(attributes.get('original_interest_rate'))
+        term_weight += upb * remaining_months
+
+    return {
+        'pool_upb': pool_upb,
+        'pool_original_upb': pool_original_upb,
+        'pool_factor': pool_upb / pool_original_upb if pool_original_upb else 0.0,
+        'wac': rate_weight / pool_upb if pool_upb else 0.0,
+        'wam': term_weight / pool_upb if pool_upb else 0.0,
+        'loan_count': len(loans),
+        'summary_as_of': as_of or '',
+    }
+
+def refresh_security(g, cusip):
+    summary = summarize(security_loans(g, cusip))
+    request = g.V(cusip).hasLabel('security')
+    for name in SUMMARY_PROPERTIES:
+        request = request.property(Cardinality.single, name, summary[name])
+    request.iterate()
+    return summary
+
+def securities_holding(g, loan_ids):
+    return g.V(*loan_ids).hasLabel('loan').in_('has securitized loan').hasLabel('security').dedup().id_().toList()
+
+def all_securities(g):
+    last_id = None
+    while True:
+        request = g.V().hasLabel('security')
+        if last_id is not None:
+            request = request.has(T.id, P.gt(last_id))
+        page = request.id_().order().limit(SECURITIES_PER_PAGE).toList()
+        yield from page
+        if len(page) < SECURITIES_PER_PAGE:
+            break
+        last_id = page[-1]
+
+
+def handler(event, context):
+    logger.info(f'request: {json.dumps(event)}')
+    
+    conn = create_remote_connection()
+    try:
+        g = traversal().withRemote(conn)
+        # only the securities affected by new loan activity when loan ids are given
+        if event.get('cusips'):
+            cusips = event['cusips']
+        elif event.get('loan_ids'):
+            cusips = securities_holding(g, [str(loan_id) for loan_id in event['loan_ids']])
+        else:
+            cusips = all_securities(g)
+        
+        refreshed = 0
+        for cusip in cusips:
+            summary = refresh_security(g, cusip)
+            logger.info(f'{cusip}: {json.dumps(summary)}')
+            refreshed += 1
+    finally:
+        conn.close()
+    
+    return {'refreshed': refreshed}
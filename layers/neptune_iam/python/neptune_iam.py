@@ -0,0 +1,69 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+SigV4 signing of Neptune WebSocket handshakes, shared by the Lambdas as a layer
+"""
+
+import os
+import time
+from types import SimpleNamespace
+
+# how long credentials that don't tell their expiry are trusted, such as the ones Lambda
+# puts in the environment
+CREDENTIAL_FALLBACK_TTL = int(os.environ.get('CREDENTIAL_FALLBACK_TTL', '900'))
+
+boto_session = None
+
+
+def credential_expiry(credentials):
+    """
+    When the credentials expire, as a timestamp. botocore has no public accessor, so the
+    refreshable credentials' private _expiry_time is read here and only here, falling back
+    to CREDENTIAL_FALLBACK_TTL from now when it is missing or not a datetime.
+    """
+    expiry = getattr(credentials, '_expiry_time', None)
+    try:
+        return expiry.timestamp()
+    except AttributeError:
+        return time.time() + CREDENTIAL_FALLBACK_TTL
+
+def prepare_iamdb_request(database_url):
+    """
+    The url and signed headers of a connection to database_url, and when the credentials
+    they were signed with expire
+    """
+    # botocore is only needed for signed connections and is the slowest import here
+    from botocore.auth import SigV4Auth
+    from botocore.awsrequest import AWSRequest
+    from botocore.session import get_session
+    global boto_session
+    if boto_session is None:
+        boto_session = get_session()
+
+    service = 'neptune-db'
+    method = 'GET'
+
+    region = os.environ['AWS_REGION']
+    credentials = boto_session.get_credentials()
+    frozen = credentials.get_frozen_credentials()
+
+    creds = SimpleNamespace(
+        access_key=frozen.access_key, secret_key=frozen.secret_key, token=frozen.token, region=region,
+    )
+
+    request = AWSRequest(method=method, url=database_url, data=None)
+    SigV4Auth(creds, service, region).add_auth(request)
+    return (database_url, request.headers.items(), credential_expiry(credentials))
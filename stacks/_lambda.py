@@ -28,6 +28,8 @@ from aws_cdk import (
     aws_ec2 as ec2,
     Duration,
     aws_iam as iam,
+    aws_events as events,
+    aws_events_targets as targets,
 )
 
 from constructs import Construct
@@ -69,13 +71,33 @@ class LambdaStack(Stack):
             code=layer_code_postgres,
         )
 
-        # Define parameters specific to gremlin layer build
-        layer_code_gremlin = cdk.aws_lambda.Code.from_asset(os.path.join(_code_path,'../layers/gremlin'), bundling=layer_bundling)
+        # Define parameters specific to gremlin layer build, trimmed of the test suites and C
+        # sources of the packages since the layer is downloaded on every cold start of the query Lambda
+        _trim_command = (f'find {_pip_output_folder} -type d \\( -name tests -o -name test \\) -prune -exec rm -rf {{}} + && '
+            f'find {_pip_output_folder} -type f \\( -name "*.pyx" -o -name "*.pxd" -o -name "*.c" -o -name "*.h" \\) -delete')
+        layer_bundling_gremlin = cdk.BundlingOptions(image=_runtime.bundling_image, command=['bash', '-c', f'{_pip_command} && {_trim_command}'])
+        layer_code_gremlin = cdk.aws_lambda.Code.from_asset(os.path.join(_code_path,'../layers/gremlin'), bundling=layer_bundling_gremlin)
         layer_gremlin = cdk.aws_lambda.LayerVersion(
             self, 'GremlinLayer',
             compatible_runtimes=[_runtime],
             code=layer_code_gremlin,
         )
+
+        # NumPy gets its own layer, attached only to the functions serving cash flows, so the
+        # other functions do not download it on their cold starts. It is trimmed like the gremlin layer
+        layer_code_numpy = cdk.aws_lambda.Code.from_asset(os.path.join(_code_path,'../layers/numpy'), bundling=layer_bundling_gremlin)
+        layer_numpy = cdk.aws_lambda.LayerVersion(
+            self, 'NumpyLayer',
+            compatible_runtimes=[_runtime],
+            code=layer_code_numpy,
+        )
+
+        # SigV4 signing of the Neptune connections, shared by the functions querying the graph
+        layer_neptune_iam = cdk.aws_lambda.LayerVersion(
+            self, 'NeptuneIamLayer',
+            compatible_runtimes=[_runtime],
+            code=cdk.aws_lambda.Code.from_asset(os.path.join(_code_path,'../layers/neptune_iam')),
+        )
             
 
         # Defines an AWS Lambda resource - DB loader Lambda
@@ -90,7 +112,11 @@ class LambdaStack(Stack):
             environment={
                 'BUCKET_NAME': sqlscripts_s3.bucket_name,
                 'RDS_SECRET': rds_secret.secret_arn,
-                'RDS_DBNAME': str(rds_database_name)
+                'RDS_DBNAME': str(rds_database_name),
+                'LOAD_MODE': 'copy',
+                'COPY_CHUNK_ROWS': '50000',
+                'LOAD_CONCURRENCY': '4',
+                'DEFER_CONSTRAINTS': 'true'
             }
         )
 
@@ -103,15 +129,56 @@ class LambdaStack(Stack):
             handler='mbs_get_api.lambda_handler',
             vpc=vpc,
             vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS),
-            layers=[layer_gremlin],
+            layers=[layer_gremlin, layer_numpy, layer_neptune_iam],
             environment={
                 'CLUSTER_ENDPOINT': neptune_endpoint,
                 'CLUSTER_PORT': '8182',
                 'USE_IAM': 'true',
-                'LOG_LEVEL': 'INFO'
+                'LOG_LEVEL': 'INFO',
+                'SIGNATURE_MAX_AGE': '240',
+                'MESSAGE_SERIALIZER': 'graphsonv2',
+                'POOL_SIZE': '4',
+                'MAX_BATCH_IDS': '1000',
+                'CACHE_MAX_ENTRIES': '256',
+                'CACHE_TTL_SECONDS': '60',
+                'DEFAULT_PAGE_SIZE': '1000',
+                'MAX_PAGE_SIZE': '5000',
+                'EXPOSURE_MAX_LOANS': '5000',
+                'EXPOSURE_MAX_FANOUT': '10',
+                'CONNECT_ON_INIT': 'true',
+                'METRICS_NAMESPACE': 'MBS/GetApi',
+                'METRICS_SAMPLE_RATE': '1.0',
+                'LOG_BODY_MAX_CHARS': '512',
+                'COMPRESSION_MIN_BYTES': '1024',
+                'COMPRESSION_LEVEL': '5'
             }
         )
 
+        # Defines an AWS Lambda resource - security summary job keeping pool UPB, factor, WAC and WAM on each security
+        security_summary_lambda = _lambda.Function(
+            self, 'SecuritySummaryHandler',
+            runtime=_lambda.Runtime.PYTHON_3_9,
+            code=_lambda.Code.from_asset(os.path.join(_code_path,'../lambda/security_summary')),
+            timeout=Duration.minutes(15),
+            handler='security_summary.handler',
+            vpc=vpc,
+            vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS),
+            layers=[layer_gremlin, layer_neptune_iam],
+            environment={
+                'CLUSTER_ENDPOINT': neptune_endpoint,
+                'CLUSTER_PORT': '8182',
+                'USE_IAM': 'true',
+                'LOG_LEVEL': 'INFO',
+                'MESSAGE_SERIALIZER': 'graphsonv2'
+            }
+        )
+
+        # Refresh every security nightly, incremental refreshes are invoked with the changed loan ids
+        events.Rule(self, 'SecuritySummarySchedule',
+            schedule=events.Schedule.rate(Duration.days(1)),
+            targets=[targets.LambdaFunction(security_summary_lambda)]
+        )
+
         #Grant S3 read access to dbloader lambda
         sqlscripts_s3.grant_read(dbloader_lambda)
 
@@ -121,7 +188,9 @@ class LambdaStack(Stack):
         
         #Define MbsApi Api Gateway resource
         mbsapi = apigw.RestApi(self, "Api",
-                      rest_api_name="MbsApi")
+                      rest_api_name="MbsApi",
+                      # MessagePack, Arrow and compressed responses come back base64 encoded
+                      binary_media_types=["*/*"])
         
         #Add resource path for dbloader lambda
         dbloader = mbsapi.root.add_resource("dbloader")
@@ -136,12 +205,46 @@ class LambdaStack(Stack):
             handler=mbs_get_lambda,
             request_parameters={
                 'integration.request.querystring.param': 'method.request.querystring.param',
-                'integration.request.querystring.id': 'method.request.querystring.id'
+                'integration.request.querystring.id': 'method.request.querystring.id',
+                'integration.request.querystring.ids': 'method.request.querystring.ids',
+                'integration.request.querystring.page_size': 'method.request.querystring.page_size',
+                'integration.request.querystring.cursor': 'method.request.querystring.cursor',
+                'integration.request.querystring.label': 'method.request.querystring.label',
+                'integration.request.querystring.fields': 'method.request.querystring.fields',
+                'integration.request.querystring.edge_label': 'method.request.querystring.edge_label',
+                'integration.request.querystring.loan_status': 'method.request.querystring.loan_status',
+                'integration.request.querystring.min_upb': 'method.request.querystring.min_upb',
+                'integration.request.querystring.max_upb': 'method.request.querystring.max_upb',
+                'integration.request.querystring.issued_after': 'method.request.querystring.issued_after',
+                'integration.request.querystring.issued_before': 'method.request.querystring.issued_before',
+                'integration.request.querystring.depth': 'method.request.querystring.depth',
+                'integration.request.querystring.max_loans': 'method.request.querystring.max_loans',
+                'integration.request.querystring.max_fanout': 'method.request.querystring.max_fanout',
+                'integration.request.querystring.format': 'method.request.querystring.format',
+                'integration.request.querystring.start_date': 'method.request.querystring.start_date',
+                'integration.request.querystring.end_date': 'method.request.querystring.end_date'
             }
             ),
             request_parameters={
                 'method.request.querystring.param': True,
-                'method.request.querystring.id': True
+                'method.request.querystring.id': False,
+                'method.request.querystring.ids': False,
+                'method.request.querystring.page_size': False,
+                'method.request.querystring.cursor': False,
+                'method.request.querystring.label': False,
+                'method.request.querystring.fields': False,
+                'method.request.querystring.edge_label': False,
+                'method.request.querystring.loan_status': False,
+                'method.request.querystring.min_upb': False,
+                'method.request.querystring.max_upb': False,
+                'method.request.querystring.issued_after': False,
+                'method.request.querystring.issued_before': False,
+                'method.request.querystring.depth': False,
+                'method.request.querystring.max_loans': False,
+                'method.request.querystring.max_fanout': False,
+                'method.request.querystring.format': False,
+                'method.request.querystring.start_date': False,
+                'method.request.querystring.end_date': False
             },
             api_key_required=True
         )
@@ -172,4 +275,11 @@ class LambdaStack(Stack):
             actions=['neptune-db:ReadDataViaQuery'],
             resources=[neptune_arn],
             effect=iam.Effect.ALLOW,
+            ))
+
+        #Grant neptune read and write via query to security summary lambda
+        security_summary_lambda.add_to_role_policy(iam.PolicyStatement(
+            actions=['neptune-db:ReadDataViaQuery', 'neptune-db:WriteDataViaQuery'],
+            resources=[neptune_arn],
+            effect=iam.Effect.ALLOW,
             ))
\ No newline at end of file
@@ -26,22 +26,121 @@ from aws_cdk import (
 )
 
 import os
+import copy
 import json
 import boto3
 import csv
 
 from constructs import Construct
 
+
+# Performance profiles for the replication task. Each profile picks the replication
+# instance class, overrides the task settings in replication_task_settings.json and
+# splits the largest tables into key ranges that are unloaded in parallel.
+DMS_PERFORMANCE_PROFILES = {
+    'small': {
+        'instance_class': 'dms.t3.micro',
+        'task_settings': {},
+        'parallel_load': {},
+    },
+    'medium': {
+        'instance_class': 'dms.r5.large',
+        'task_settings': {
+            'TargetMetadata': {
+                'ParallelLoadThreads': 8,
+                'ParallelLoadBufferSize': 500,
+                'ParallelLoadQueuesPerThread': 4,
+                'ParallelApplyThreads': 8,
+                'ParallelApplyBufferSize': 500,
+                'ParallelApplyQueuesPerThread': 8,
+            },
+            'FullLoadSettings': {
+                'MaxFullLoadSubTasks': 16,
+                'CommitRate': 30000,
+            },
+            'ChangeProcessingTuning': {
+                'MemoryLimitTotal': 2048,
+            },
+        },
+        'parallel_load': {
+            'loan_activity': {'column': 'activity_id', 'max_value': 50000000, 'segments': 4},
+        },
+    },
+    'large': {
+        'instance_class': 'dms.r5.2xlarge',
+        'task_settings': {
+            'TargetMetadata': {
+                'ParallelLoadThreads': 32,
+                'ParallelLoadBufferSize': 1000,
+                'ParallelLoadQueuesPerThread': 8,
+                'ParallelApplyThreads': 32,
+                'ParallelApplyBufferSize': 1000,
+                'ParallelApplyQueuesPerThread': 16,
+            },
+            'FullLoadSettings': {
+                'MaxFullLoadSubTasks': 49,
+                'CommitRate': 50000,
+            },
+            'ChangeProcessingTuning': {
+                'MemoryLimitTotal': 8192,
+            },
+        },
+        'parallel_load': {
+            'loan_activity': {'column': 'activity_id', 'max_value': 2000000000, 'segments': 16},
+            'loan': {'column': 'loan_id', 'max_value': 20000000, 'segments': 8},
+        },
+    },
+}
+
+
+def tuned_task_settings(task_settings, profile):
+    """
+    Returns a copy of the task settings with the profile's overrides applied
+    """
+    tuned = copy.deepcopy(task_settings)
+    for section, settings in DMS_PERFORMANCE_PROFILES[profile]['task_settings'].items():
+        tuned.setdefault(section, {}).update(settings)
+    return tuned
+
+def segmented_table_mappings(table_mappings, profile, schema='mbs'):
+    """
+    Returns a copy of the table mappings with a parallel-load table-settings rule
+    for every table the profile segments
+    """
+    segmented = copy.deepcopy(table_mappings)
+    for index, (table, segmentation) in enumerate(DMS_PERFORMANCE_PROFILES[profile]['parallel_load'].items()):
+        segments = segmentation['segments']
+        boundaries = [[str(segmentation['max_value'] * segment // segments)] for segment in range(1, segments)]
+        segmented['rules'].append({
+            'rule-type': 'table-settings',
+            'rule-id': str(900000 + index),
+            'rule-name': f'parallel-load-{table}',
+            'object-locator': {
+                'schema-name': schema,
+                'table-name': table,
+            },
+            'parallel-load': {
+                'type': 'ranges',
+                'columns': [segmentation['column']],
+                'boundaries': boundaries,
+            },
+        })
+    return segmented
+
+
 class DMSStack(Stack):
     """
     Creates the DMS stack for our application needs
     """
-    def __init__(self, scope: Construct, id: str, vpc, bucket, rds_secret, rds_database_name, neptune_endpoint, neptune_endpoint_role, **kwargs) -> None:
+    def __init__(self, scope: Construct, id: str, vpc, bucket, rds_secret, rds_database_name, neptune_endpoint, neptune_endpoint_role, migration_type: str = "full-load", performance_profile: str = "small", **kwargs) -> None:
 
         super().__init__(scope, id, **kwargs)
         stack = Stack.of(self)
 
-        dms_instance_class = 'dms.t3.micro'
+        if performance_profile not in DMS_PERFORMANCE_PROFILES:
+            raise ValueError(f"performance_profile must be one of {', '.join(DMS_PERFORMANCE_PROFILES)}")
+
+        dms_instance_class = DMS_PERFORMANCE_PROFILES[performance_profile]['instance_class']
         aurora_engine = "aurora-postgresql"
 
         # boto3 client for Secrets Manager
@@ -150,18 +249,21 @@ class DMSStack(Stack):
         replication_task_settings_location ='resources/config/task_settings/replication_task_settings.json'
         current_dir = os.getcwd()
         with open(os.path.join(current_dir, source_mappings_location.lower()), mode='r') as jsonfile:
-            source_mappings_json = json.load(jsonfile)
+            source_mappings_json = segmented_table_mappings(json.load(jsonfile), performance_profile)
             with open(os.path.join(current_dir, target_mappings_location.lower()), mode='r') as jsonfile:
                 target_mappings_json = json.load(jsonfile)
                 with open(os.path.join(current_dir, replication_task_settings_location.lower()), mode='r') as jsonfile:
-                    replication_task_settings_json = json.load(jsonfile)
+                    replication_task_settings_json = tuned_task_settings(json.load(jsonfile), performance_profile)
+                    # ongoing replication applies changes in batches instead of one by one
+                    if migration_type != "full-load":
+                        replication_task_settings_json['TargetMetadata']['BatchApplyEnabled'] = True
                     # create dms replication task
                     task = dms.CfnReplicationTask(
                             self,
                             replTaskName,
                             replication_task_identifier=replTaskName,
                             replication_instance_arn=instance.ref,
-                            migration_type="full-load",
+                            migration_type=migration_type,
                             source_endpoint_arn=source.ref,
                             target_endpoint_arn=target.ref,
                             table_mappings=json.dumps(source_mappings_json),
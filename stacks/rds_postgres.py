@@ -46,6 +46,7 @@ class RDSPostgresStack(Stack):
                  backup_retention_days:int=14,
                  backup_window:str="00:15-01:15",
                  preferred_maintenance_window:str="Sun:23:45-Mon:00:15",
+                 logical_replication:bool=False,
                  **kwargs) -> None:
         super().__init__(scope, id, **kwargs)
 
@@ -85,11 +86,15 @@ class RDSPostgresStack(Stack):
         
 
         # create Parameter group for RDS postgress instance
+        # logical replication lets DMS and the CDC applier read changes from the WAL
+        parameters = {}
+        if logical_replication:
+            parameters['rds.logical_replication'] = '1'
         parameter_group_db = rds.ParameterGroup(
                 self,
                 "parameter_group_postgres",
                 engine=aurora_engine,
-                parameters={}
+                parameters=parameters
         )
 
         #create kms key and associate to this RDS instance
@@ -0,0 +1,81 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Row changes to the mbs schema as the CDC applier receives them, shared by the unit and
+the graph tests
+"""
+
+import os
+
+from tools.cdc_applier import ChangeBatch
+from tools.mapping_compiler import CompiledMapping
+
+MAPPINGS = os.path.join(os.path.dirname(__file__), '..', 'resources', 'config', 'dms_json_mappings', 'target_mappings.json')
+
+LOAN_COLUMNS = ['original_interest_rate', 'original_principal_balance', 'unpaid_principal_balance', 'loan_term',
+    'maturity_date', 'loan_id', 'loan_status', 'issuance_date']
+
+SELLERS = ['100001', '100002']
+LOANS = ['10000000001', '10000000002', '10000000003', '10000000004']
+CUSIP = '369WAU713'
+
+
+def mapping():
+    return CompiledMapping.load(MAPPINGS)
+
+def loan_row(loan_id, balance):
+    return ['4.5', '200000.00', balance, '360', '2053-01-01', loan_id, 'active', '2023-01-01']
+
+def initial_load(mapping):
+    """
+    2 sellers, 4 loans and a security, every loan linked to a seller and the security
+    """
+    batch = ChangeBatch(mapping)
+    for seller_id in SELLERS:
+        batch.add('seller', 'I', ['seller_id', 'name', 'status'], [seller_id, 'seller ' + seller_id, 'active'], None)
+    batch.add('security', 'I', ['security_value', 'issued_by', 'issued_date', 'cusip'], ['800000.00', 'GNMA', '2023-02-01', CUSIP], None)
+    for (index, loan_id) in enumerate(LOANS):
+        batch.add('loan', 'I', LOAN_COLUMNS, loan_row(loan_id, '200000.00'), None)
+        batch.add('loan_seller', 'I', ['loan_id', 'seller_id'], [loan_id, SELLERS[index % 2]], None)
+        batch.add('loan_security', 'I', ['loan_id', 'cusip', 'percentage'], [loan_id, CUSIP, '100'], None)
+    return batch
+
+def mixed_changes(mapping):
+    """
+    Inserts, updates and deletes of vertices and edges in one batch: an updated loan
+    balance and ownership share, a loan moved to the other seller and a deleted loan
+    """
+    batch = ChangeBatch(mapping)
+    batch.add('loan', 'U', LOAN_COLUMNS, loan_row(LOANS[0], '150000.00'), None)
+    batch.add('loan_security', 'U', ['loan_id', 'cusip', 'percentage'], [LOANS[1], CUSIP, '50'], None)
+    batch.add('loan_seller', 'D', ['loan_id', 'seller_id'], [LOANS[2], SELLERS[0]], None)
+    batch.add('loan_seller', 'I', ['loan_id', 'seller_id'], [LOANS[2], SELLERS[1]], None)
+    batch.add('loan_security', 'D', ['loan_id', 'cusip', 'percentage'], [LOANS[3], CUSIP, '100'], None)
+    batch.add('loan_seller', 'D', ['loan_id', 'seller_id'], [LOANS[3], SELLERS[1]], None)
+    batch.add('loan', 'D', ['loan_id'], [LOANS[3]], None)
+    return batch
+
+def key_and_null_updates(mapping):
+    """
+    An UPDATE moving a loan to the other seller, with the old key in its before-image,
+    and one setting a loan's balance to NULL
+    """
+    batch = ChangeBatch(mapping)
+    batch.add('loan_seller', 'U', ['loan_id', 'seller_id'], [LOANS[2], SELLERS[1]], None,
+        ['loan_id', 'seller_id'], [LOANS[2], SELLERS[0]])
+    batch.add('loan', 'U', LOAN_COLUMNS, loan_row(LOANS[0], None), None)
+    return batch
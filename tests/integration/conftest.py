@@ -0,0 +1,42 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+The graph tests run against the Gremlin Server at GREMLIN_TEST_URL and are skipped
+without it. Every test starts from an empty graph, so point it at a scratch TinkerGraph
+that accepts string ids (gremlin.tinkergraph.vertexIdManager=ANY), never at Neptune.
+"""
+
+import os
+
+import pytest
+
+
+@pytest.fixture
+def g():
+    url = os.environ.get('GREMLIN_TEST_URL')
+    if url is None:
+        pytest.skip('GREMLIN_TEST_URL is not set')
+    from gremlin_python.driver.driver_remote_connection import DriverRemoteConnection
+    from gremlin_python.process.anonymous_traversal import traversal
+    remote = DriverRemoteConnection(url, 'g')
+    g = traversal().withRemote(remote)
+    g.V().drop().iterate()
+    try:
+        yield g
+    finally:
+        g.V().drop().iterate()
+        remote.close()
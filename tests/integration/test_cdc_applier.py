@@ -0,0 +1,60 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from gremlin_python.process.graph_traversal import __
+
+from tests import changes
+from tools.cdc_applier import GraphWriter
+
+SELLER_EDGE = 'originates loan'
+SECURITY_EDGE = 'has securitized loan'
+
+
+def test_initial_load_is_idempotent(g):
+    writer = GraphWriter(g, operations_per_traversal=3)
+    mapping = changes.mapping()
+    for _ in range(2):
+        writer.apply(changes.initial_load(mapping))
+        assert g.V().count().next() == 7
+        assert g.E().hasLabel(SELLER_EDGE).count().next() == 4
+        assert g.E().hasLabel(SECURITY_EDGE).count().next() == 4
+
+def test_mixed_changes(g):
+    writer = GraphWriter(g, operations_per_traversal=3)
+    mapping = changes.mapping()
+    writer.apply(changes.initial_load(mapping))
+    writer.apply(changes.mixed_changes(mapping))
+
+    (loans, sellers) = (changes.LOANS, changes.SELLERS)
+    assert sorted(g.V().hasLabel('loan').id_().toList()) == loans[:3]
+    assert g.V(loans[0]).values('unpaid_principal_balance').next() == 150000.0
+    assert g.V(changes.CUSIP).outE(SECURITY_EDGE).where(__.inV().hasId(loans[1])).values('percentage').toList() == [50]
+    assert g.V(changes.CUSIP).out(SECURITY_EDGE).count().next() == 3
+    assert g.V(sellers[0]).out(SELLER_EDGE).id_().toList() == [loans[0]]
+    assert sorted(g.V(sellers[1]).out(SELLER_EDGE).id_().toList()) == [loans[1], loans[2]]
+    assert g.E().count().next() == 6
+
+def test_key_and_null_updates(g):
+    writer = GraphWriter(g, operations_per_traversal=3)
+    mapping = changes.mapping()
+    writer.apply(changes.initial_load(mapping))
+    writer.apply(changes.key_and_null_updates(mapping))
+
+    (loans, sellers) = (changes.LOANS, changes.SELLERS)
+    assert g.V(loans[0]).values('unpaid_principal_balance').toList() == []
+    assert g.V(loans[0]).values('original_principal_balance').next() == 200000.0
+    assert g.V(loans[2]).in_(SELLER_EDGE).id_().toList() == [sellers[1]]
+    assert g.E().hasLabel(SELLER_EDGE).count().next() == 4
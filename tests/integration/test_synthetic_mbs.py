@@ -0,0 +1,32 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from gremlin_python.process.traversal import T
+
+from tests import changes, synthetic
+from tools.synthetic_mbs import feed_gremlin
+
+
+def test_feed_gremlin_counts(g):
+    mapping = changes.mapping()
+    (vertices, edges) = synthetic.projected_graph(synthetic.small_generator(), mapping)
+    # batches smaller than a table, so every link table takes several chained chunks
+    feed_gremlin(g, mapping, synthetic.small_generator(), batch_rows=25)
+
+    assert g.V().groupCount().by(T.label).next() == {label: len(ids) for (label, ids) in vertices.items()}
+    assert g.E().groupCount().by(T.label).next() == {label: len(ids) for (label, ids) in edges.items()}
+    (edge_id, from_id, to_id) = sorted(edges['has securitized loan'])[0]
+    assert g.V(from_id).outE('has securitized loan').hasId(edge_id).inV().id_().next() == to_id
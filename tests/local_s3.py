@@ -0,0 +1,74 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+A directory standing in for the dbloader's bucket
+"""
+
+import os
+
+
+class LocalBody:
+    """
+    File backed stand-in for the StreamingBody returned by get_object
+    """
+    def __init__(self, path):
+        self.file = open(path, mode='rb')
+
+    def read(self, size=-1):
+        return self.file.read(size)
+
+    def iter_chunks(self, chunk_size):
+        try:
+            while True:
+                chunk = self.file.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            self.file.close()
+
+
+class LocalScriptStore:
+    """
+    Directory backed stand-in for the subset of the S3 client used by the loader,
+    paging listings the same way list_objects_v2 does
+    """
+    page_size = 1000
+
+    def __init__(self, root):
+        self.root = root
+        self.pages = 0
+
+    def get_paginator(self, operation_name):
+        assert operation_name == 'list_objects_v2'
+        return self
+
+    def paginate(self, Bucket, Prefix):
+        keys = []
+        for (dirpath, dirnames, filenames) in os.walk(self.root):
+            for filename in filenames:
+                key = os.path.relpath(os.path.join(dirpath, filename), self.root).replace(os.sep, '/')
+                if key.startswith(Prefix):
+                    keys.append(key)
+        keys.sort()
+        for start in range(0, len(keys), self.page_size):
+            self.pages += 1
+            page = keys[start:start + self.page_size]
+            yield {'Contents': [{'Key': key} for key in page], 'IsTruncated': start + self.page_size < len(keys)}
+
+    def get_object(self, Bucket, Key):
+        return {'Body': LocalBody(os.path.join(self.root, Key))}
@@ -0,0 +1,38 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+The security summary job and its neptune_iam layer configured for tests, no connection
+is opened on import
+"""
+
+import os
+import sys
+
+environment = {
+    'CLUSTER_ENDPOINT': 'localhost',
+    'CLUSTER_PORT': '8182',
+    'CLUSTER_PROTOCOL': 'ws',
+    'USE_IAM': 'false',
+    'AWS_REGION': 'us-east-1',
+    'LOG_LEVEL': 'WARNING',
+}
+for (name, value) in environment.items():
+    os.environ.setdefault(name, value)
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda', 'security_summary'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'layers', 'neptune_iam', 'python'))
+import neptune_iam  # noqa: E402,F401
+import security_summary  # noqa: E402,F401
@@ -0,0 +1,40 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+A small synthetic_mbs dataset and the graph the mapping rules make of it
+"""
+
+from tools import synthetic_mbs
+
+
+def small_generator():
+    # several loan chunks, so ids and offsets cross chunk boundaries
+    return synthetic_mbs.SyntheticMbs(40, securities=3, sellers=4, servicers=4, months=6, chunk_loans=16, seed=3)
+
+def projected_graph(generator, mapping):
+    """
+    Vertex ids per label and (id, from, to) edges per label
+    """
+    (vertices, edges) = ({}, {})
+    for table in synthetic_mbs.columns:
+        (names, rows) = generator.rows(table)
+        for (definition, elements) in mapping.compile(table, names).project(list(rows)):
+            if definition.kind == 'vertices':
+                vertices.setdefault(definition.label, set()).update(element[0] for element in elements)
+            else:
+                edges.setdefault(definition.label, set()).update(element[:3] for element in elements)
+    return (vertices, edges)
@@ -0,0 +1,33 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from tests.mbs_get import mbs_get_api
+
+cashflows = mbs_get_api.cashflows
+
+
+def test_monthly_sums_into_every_month():
+    series = cashflows.monthly(
+        ['2023-01-01', '2023-01-15', '2023-03-01'],
+        {'principal': [100.0, 50.25, None], 'loans': [1, 1, 1]})
+    assert series == {
+        'month': ['2023-01', '2023-02', '2023-03'],
+        'principal': [150.25, 0.0, 0.0],
+        'loans': [2.0, 0.0, 1.0],
+    }
+
+def test_monthly_without_dates():
+    assert cashflows.monthly([], {'upb': []}) == {'month': [], 'upb': []}
@@ -0,0 +1,96 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from gremlin_python.process.anonymous_traversal import traversal
+from gremlin_python.process.graph_traversal import GraphTraversal
+from gremlin_python.structure.graph import Graph
+
+from tests import changes
+from tools.cdc_applier import DROP, UPSERT, ChangeBatch, GraphWriter, add_change
+
+# anything else, E() in 3.5 included, resolves to values(<name>) through __getattr__
+TRAVERSAL_STEPS = set(dir(GraphTraversal))
+
+
+def steps(request):
+    return [instruction[0] for instruction in request.bytecode.step_instructions]
+
+def build(batch, operations_per_traversal):
+    # the traversals are only built, building is where unsupported steps fail
+    writer = GraphWriter(traversal().withGraph(Graph()), operations_per_traversal)
+    return [steps(request) for request in writer.traversals(batch)]
+
+
+def test_chained_upserts_only_use_supported_steps():
+    requests = build(changes.initial_load(changes.mapping()), operations_per_traversal=4)
+    # 7 vertex upserts, then 8 edge upserts, 4 per traversal and each starting with V()
+    assert [request.count('V') for request in requests] == [4, 3, 4, 4]
+    for request in requests:
+        assert request[0] == 'V'
+        assert set(request) <= TRAVERSAL_STEPS
+
+def test_mixed_batch_order():
+    requests = build(changes.mixed_changes(changes.mapping()), operations_per_traversal=50)
+    # loan upsert, then 2 edge upserts chained, then the 3 edge and 1 vertex drops
+    assert [request[:1] for request in requests] == [['V'], ['V'], ['E'], ['V']]
+    assert requests[1].count('coalesce') == 2
+    assert requests[2] == ['E', 'drop']
+    assert requests[3] == ['V', 'drop']
+
+def test_edge_upsert_starts_from_the_out_vertex():
+    writer = GraphWriter(traversal().withGraph(Graph()))
+    batch = changes.mixed_changes(changes.mapping())
+    (edge_id, from_id, to_id, label, *values) = next(op[2] for op in batch.edges.values() if op[0] == 'upsert')
+    bytecode = list(writer.traversals(batch))[1].bytecode.step_instructions
+    assert bytecode[0] == ['V', from_id]
+    (lookup, insert) = bytecode[2][1:]
+    assert lookup.step_instructions == [['unfold'], ['outE', label], ['hasId', edge_id]]
+    assert ['addE', label] in insert.step_instructions
+
+def test_drops_are_grouped_per_chunk():
+    writer = GraphWriter(traversal().withGraph(Graph()), operations_per_traversal=2)
+    batch = changes.mixed_changes(changes.mapping())
+    drops = [request.bytecode.step_instructions for request in writer.traversals(batch) if steps(request)[-1] == 'drop']
+    dropped_edges = [op[2][0] for op in batch.edges.values() if op[0] == 'drop']
+    assert len(dropped_edges) == 3
+    assert drops[0] == [['E'] + dropped_edges[:2], ['drop']]
+    assert drops[1] == [['E'] + dropped_edges[2:], ['drop']]
+    assert drops[2] == [['V', changes.LOANS[3]], ['drop']]
+
+def test_key_update_drops_the_old_edge():
+    batch = changes.key_and_null_updates(changes.mapping())
+    edges = {edge_id: (action, element[1:3]) for (edge_id, (action, definition, element)) in batch.edges.items()}
+    (loan_id, (old_seller, new_seller)) = (changes.LOANS[2], changes.SELLERS)
+    assert sorted(edges.values()) == [(DROP, (old_seller, loan_id)), (UPSERT, (new_seller, loan_id))]
+
+def test_update_to_null_drops_the_property():
+    writer = GraphWriter(traversal().withGraph(Graph()))
+    batch = changes.key_and_null_updates(changes.mapping())
+    loan = list(writer.traversals(batch))[0].bytecode.step_instructions
+    assert loan[0] == ['V', changes.LOANS[0]]
+    cleared = [step[1].step_instructions for step in loan if step[0] == 'sideEffect']
+    assert cleared == [[['properties', 'unpaid_principal_balance'], ['drop']]]
+    assert ['property', 'unpaid_principal_balance'] not in [step[:2] for step in loan]
+
+def test_wal2json_update_with_before_image():
+    batch = ChangeBatch(changes.mapping())
+    add_change(batch, {
+        'action': 'U', 'schema': 'mbs', 'table': 'loan_seller', 'timestamp': '2023-07-19 16:39:00.123456+00',
+        'columns': [{'name': 'loan_id', 'value': int(changes.LOANS[2])}, {'name': 'seller_id', 'value': int(changes.SELLERS[1])}],
+        'identity': [{'name': 'loan_id', 'value': int(changes.LOANS[2])}, {'name': 'seller_id', 'value': int(changes.SELLERS[0])}],
+    }, 'mbs')
+    assert sorted(action for (action, definition, element) in batch.edges.values()) == [DROP, UPSERT]
+    assert batch.loan_ids == {changes.LOANS[2]}
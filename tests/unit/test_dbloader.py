@@ -0,0 +1,151 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+import sys
+import threading
+
+import pytest
+
+from tests.local_s3 import LocalScriptStore
+
+# the loader looks up its RDS secret on import unless it is given a local DSN
+os.environ.setdefault('PG_DSN', 'unused')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'lambda', 'dbloader'))
+import dbloader  # noqa: E402
+
+SCRIPT = (
+    "CREATE TABLE mbs.seller (seller_id int, name varchar(50));\n"
+    "INSERT INTO mbs.seller (seller_id, name) VALUES (1, 'semi;colon'), (2, 'it''s; quoted');\n"
+    ";\n"
+    "INSERT INTO mbs.seller (seller_id, name) VALUES (3, '');\n"
+    "INSERT INTO mbs.seller (seller_id, name) VALUES (4, 'no trailing semicolon')"
+)
+STATEMENTS = [
+    "CREATE TABLE mbs.seller (seller_id int, name varchar(50))",
+    "\nINSERT INTO mbs.seller (seller_id, name) VALUES (1, 'semi;colon'), (2, 'it''s; quoted')",
+    "\nINSERT INTO mbs.seller (seller_id, name) VALUES (3, '')",
+    "\nINSERT INTO mbs.seller (seller_id, name) VALUES (4, 'no trailing semicolon')",
+]
+
+DDL = (
+    "CREATE TABLE IF NOT EXISTS mbs.loan (loan_id int8 NOT NULL, CONSTRAINT loan_pkey PRIMARY KEY (loan_id));\n"
+    "CREATE TABLE IF NOT EXISTS mbs.loan_security (loan_id int8 NULL, cusip varchar NULL);\n"
+)
+
+
+class RecordingPool:
+    """
+    Stand-in for ThreadedConnectionPool whose connections record the committed
+    statements and fail the COPY into one table
+    """
+    def __init__(self, failing_table):
+        self.failing_table = failing_table
+        self.committed = []
+        self.lock = threading.Lock()
+
+    def getconn(self):
+        return RecordingConnection(self)
+
+    def putconn(self, conn):
+        pass
+
+    def closeall(self):
+        pass
+
+
+class RecordingConnection:
+    def __init__(self, pool):
+        self.pool = pool
+        self.pending = []
+
+    def cursor(self):
+        return RecordingCursor(self)
+
+    def commit(self):
+        with self.pool.lock:
+            self.pool.committed.extend(self.pending)
+        self.pending = []
+
+    def rollback(self):
+        self.pending = []
+
+
+class RecordingCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, statement):
+        self.conn.pending.append(statement)
+
+    def copy_expert(self, sql, file):
+        if self.conn.pool.failing_table in sql:
+            raise RuntimeError('COPY into {} failed'.format(self.conn.pool.failing_table))
+        self.rowcount = file.read().count(b'\n') - 1
+        self.conn.pending.append(sql)
+
+
+def split(text, size):
+    return [text[start:start + size] for start in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 16, 64, 1000])
+def test_iter_statements_across_chunks(chunk_size):
+    # every boundary, quote and doubled quote lands on a chunk edge for some size
+    assert list(dbloader.iter_statements(split(SCRIPT, chunk_size))) == STATEMENTS
+
+def test_iter_statements_many_per_chunk():
+    statement = "INSERT INTO mbs.loan (loan_id, loan_status) VALUES (1, 'a;b')"
+    text = ';\n'.join([statement] * 5000) + ';'
+    statements = list(dbloader.iter_statements(split(text, 64 * 1024)))
+    assert len(statements) == 5000
+    assert {statement.strip() for statement in statements} == {statement}
+
+
+def run_handler(tmp_path, monkeypatch, failing_table):
+    os.makedirs(tmp_path / 'ddl')
+    os.makedirs(tmp_path / 'dml')
+    (tmp_path / 'ddl' / 'create_tables.sql').write_text(DDL)
+    (tmp_path / 'dml' / 'loan.csv').write_text('loan_id\n1\n2\n')
+    (tmp_path / 'dml' / 'loan_security.csv').write_text('loan_id,cusip\n1,C1\n2,C1\n')
+    pool = RecordingPool(failing_table)
+    monkeypatch.setattr(dbloader, 'ThreadedConnectionPool', lambda *args, **kwargs: pool)
+    monkeypatch.setattr(dbloader, 'script_store', lambda: LocalScriptStore(str(tmp_path)))
+    monkeypatch.setattr(dbloader, 'defer_constraints', True)
+    return (dbloader.handler({}, None), pool)
+
+def test_handler_loads_tables_in_dependency_order(tmp_path, monkeypatch):
+    (response, pool) = run_handler(tmp_path, monkeypatch, 'no such table')
+    assert response['statusCode'] == 200
+    copies = [statement for statement in pool.committed if statement.startswith('COPY')]
+    assert [copy.split()[1] for copy in copies] == ['mbs.loan', 'mbs.loan_security']
+    assert 'ALTER TABLE mbs.loan ADD CONSTRAINT loan_pkey PRIMARY KEY (loan_id)' in pool.committed
+
+def test_failed_load_empties_committed_tables(tmp_path, monkeypatch):
+    # loan commits in the first level, the COPY into loan_security fails in the second
+    (response, pool) = run_handler(tmp_path, monkeypatch, 'mbs.loan_security')
+    assert response['statusCode'] == 500
+    assert 'COPY into mbs.loan_security failed' in response['body']
+    assert 'successfully' not in response['body']
+    assert pool.committed[-1] == 'TRUNCATE mbs.loan'
+    assert not any('loan_security' in statement for statement in pool.committed if statement.startswith('COPY'))
@@ -0,0 +1,143 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+The dbloader against a bucket of thousands of objects and scripts larger than the memory
+the loader may use. The defaults run in seconds, tracemalloc slows parsing several times
+over. DBLOADER_HARNESS_OBJECTS and DBLOADER_HARNESS_MB scale them up, e.g. to 10000
+objects and 2048 MB scripts.
+"""
+
+import math
+import os
+import tracemalloc
+
+import pytest
+
+from tests.local_s3 import LocalScriptStore
+from tests.unit.test_dbloader import dbloader
+
+OBJECTS = int(os.environ.get('DBLOADER_HARNESS_OBJECTS', '2500'))
+SCRIPT_MB = float(os.environ.get('DBLOADER_HARNESS_MB', '4'))
+# what the loader may hold at once with the chunk sizes below, whatever the script size
+MEMORY_LIMIT_BYTES = 2 * 1024 * 1024
+
+ACTIVITY_COLUMNS = 'loan_id,principal_pymnt,int_pymnt,rem_mnths_to_maturity,rem_unpaid_principal_balance,payment_date,activity_id'
+ROW = "({0},1234.56,789.01,300,150000.00,'2023-07-01',{1})"
+
+
+class CountingCursor:
+    """
+    Cursor that reads COPY input in small pieces like psycopg2 does and keeps only counts
+    """
+    def __init__(self):
+        self.rows = 0
+        self.rowcount = -1
+        self.statements = 0
+
+    def execute(self, statement):
+        self.statements += 1
+
+    def copy_expert(self, sql, file, size=8192):
+        lines = 0
+        while True:
+            data = file.read(size)
+            if not data:
+                break
+            lines += data.count('\n' if isinstance(data, str) else b'\n')
+        self.rowcount = lines - 1 if 'HEADER true' in sql else lines
+        self.rows += self.rowcount
+
+
+def write_script(path, megabytes, rows_per_statement=100):
+    rows = 0
+    with open(path, mode='w') as file:
+        file.write('SET search_path TO mbs;\n')
+        while file.tell() < megabytes * 1024 * 1024:
+            values = ',\n\t'.join(ROW.format(rows + row, rows + row) for row in range(rows_per_statement))
+            file.write(f'INSERT INTO mbs.loan_activity ({ACTIVITY_COLUMNS}) VALUES\n\t{values};\n')
+            rows += rows_per_statement
+    return rows
+
+def write_csv(path, megabytes, rows_per_write=1000):
+    rows = 0
+    with open(path, mode='w') as file:
+        file.write(ACTIVITY_COLUMNS + '\n')
+        while file.tell() < megabytes * 1024 * 1024:
+            file.write(''.join(ROW.format(rows + row, rows + row)[1:-1].replace("'", '') + '\n' for row in range(rows_per_write)))
+            rows += rows_per_write
+    return rows
+
+def peak_memory(run):
+    tracemalloc.start()
+    try:
+        run()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(dbloader, 'read_chunk_bytes', 64 * 1024)
+    monkeypatch.setattr(dbloader, 'copy_chunk_rows', 1000)
+    monkeypatch.setattr(dbloader, 'load_mode', 'copy')
+
+
+def test_listing_follows_every_page(tmp_path):
+    os.makedirs(tmp_path / 'ddl')
+    os.makedirs(tmp_path / 'dml')
+    (tmp_path / 'ddl' / 'create_tables.sql').write_text('')
+    tables = ['loan', 'loan_activity', 'loan_security']
+    for index in range(OBJECTS):
+        (tmp_path / 'dml' / f'{tables[index % len(tables)]}_{index:06d}.csv').write_text('')
+
+    store = LocalScriptStore(str(tmp_path))
+    keys = list(dbloader.list_keys(store, 'dml'))
+    assert len(keys) == OBJECTS
+    assert len(set(keys)) == OBJECTS
+    assert store.pages == math.ceil(OBJECTS / store.page_size) > 1
+    assert list(dbloader.list_keys(store, 'ddl')) == ['ddl/create_tables.sql']
+
+    # the handler loads the keys of one table together, the numeric suffix is dropped
+    by_table = {}
+    for key in keys:
+        by_table.setdefault(dbloader.table_name(dbloader.table_from_key(key)), []).append(key)
+    assert sorted(by_table) == ['mbs.' + table for table in tables]
+    assert sum(len(keys) for keys in by_table.values()) == OBJECTS
+
+def test_sql_script_streams_in_constant_memory(tmp_path, small_chunks):
+    rows = write_script(tmp_path / 'loan_activity.sql', SCRIPT_MB)
+    store = LocalScriptStore(str(tmp_path))
+    cur = CountingCursor()
+    stats = dbloader.TableStats()
+
+    peak = peak_memory(lambda: dbloader.load_object(cur, store, 'loan_activity.sql', stats))
+    assert cur.rows == rows
+    assert cur.statements == 1
+    assert stats.rows == {'mbs.loan_activity': rows}
+    assert peak < MEMORY_LIMIT_BYTES, f'{peak} bytes peak for a {SCRIPT_MB} MB script'
+
+def test_delimited_file_streams_in_constant_memory(tmp_path, small_chunks):
+    rows = write_csv(tmp_path / 'loan_activity_202307191639.csv', SCRIPT_MB)
+    store = LocalScriptStore(str(tmp_path))
+    cur = CountingCursor()
+    stats = dbloader.TableStats()
+
+    peak = peak_memory(lambda: dbloader.load_object(cur, store, 'loan_activity_202307191639.csv', stats))
+    assert cur.rows == rows
+    assert stats.rows == {'mbs.loan_activity': rows}
+    assert peak < MEMORY_LIMIT_BYTES, f'{peak} bytes peak for a {SCRIPT_MB} MB file'
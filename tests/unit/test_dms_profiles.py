@@ -0,0 +1,118 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import json
+import os
+
+import aws_cdk as cdk
+import pytest
+from aws_cdk import aws_ec2 as ec2, aws_iam as iam, aws_secretsmanager as sm
+from aws_cdk.assertions import Template
+
+from stacks.dms import DMS_PERFORMANCE_PROFILES, DMSStack, segmented_table_mappings, tuned_task_settings
+
+ROOT = os.path.join(os.path.dirname(__file__), '..', '..')
+TASK_SETTINGS = os.path.join(ROOT, 'resources', 'config', 'task_settings', 'replication_task_settings.json')
+SOURCE_MAPPINGS = os.path.join(ROOT, 'resources', 'config', 'dms_json_mappings', 'source_mappings.json')
+
+# task settings each profile has to set, the base file leaves them at the DMS defaults
+TUNED_SETTINGS = {
+    'TargetMetadata': ['ParallelLoadThreads', 'ParallelLoadBufferSize', 'ParallelLoadQueuesPerThread'],
+    'FullLoadSettings': ['MaxFullLoadSubTasks', 'CommitRate'],
+}
+
+
+def load(path):
+    with open(path) as jsonfile:
+        return json.load(jsonfile)
+
+def parallel_load_rules(mappings):
+    return [rule for rule in mappings['rules'] if rule['rule-type'] == 'table-settings' and 'parallel-load' in rule]
+
+def synth(profile):
+    app = cdk.App()
+    env = cdk.Environment(account='123456789012', region='us-east-1')
+    shared = cdk.Stack(app, 'Shared', env=env)
+    stack = DMSStack(app, 'DMS',
+        vpc=ec2.Vpc(shared, 'Vpc'),
+        bucket='mbs-dms-test',
+        rds_secret=sm.Secret(shared, 'Secret'),
+        rds_database_name='MBS',
+        neptune_endpoint='neptune.example.com',
+        neptune_endpoint_role=iam.Role(shared, 'Role', assumed_by=iam.ServicePrincipal('dms.amazonaws.com')),
+        performance_profile=profile,
+        env=env)
+    return Template.from_stack(stack)
+
+
+@pytest.mark.parametrize('profile', list(DMS_PERFORMANCE_PROFILES))
+def test_tuned_task_settings(profile):
+    base = load(TASK_SETTINGS)
+    tuned = tuned_task_settings(base, profile)
+    overrides = DMS_PERFORMANCE_PROFILES[profile]['task_settings']
+    for (section, settings) in base.items():
+        for (name, value) in (settings.items() if isinstance(settings, dict) else []):
+            assert tuned[section][name] == overrides.get(section, {}).get(name, value)
+    if profile != 'small':
+        for (section, names) in TUNED_SETTINGS.items():
+            for name in names:
+                assert tuned[section][name] > base[section][name], (section, name)
+        # every parallel load thread gets its own full load sub task
+        assert tuned['FullLoadSettings']['MaxFullLoadSubTasks'] >= len(DMS_PERFORMANCE_PROFILES[profile]['parallel_load'])
+    # the base settings are left alone
+    assert base == load(TASK_SETTINGS)
+
+@pytest.mark.parametrize('profile', list(DMS_PERFORMANCE_PROFILES))
+def test_segmented_table_mappings(profile):
+    base = load(SOURCE_MAPPINGS)
+    segmented = segmented_table_mappings(base, profile)
+    assert segmented['rules'][:len(base['rules'])] == base['rules']
+
+    added = segmented['rules'][len(base['rules']):]
+    assert added == parallel_load_rules(segmented)
+    added_ids = [int(rule['rule-id']) for rule in added]
+    assert all(rule_id >= 900000 for rule_id in added_ids)
+    assert len(set(added_ids)) == len(added_ids)
+    assert not set(added_ids) & {int(rule['rule-id']) for rule in base['rules']}
+
+    segmentation = DMS_PERFORMANCE_PROFILES[profile]['parallel_load']
+    assert sorted(rule['object-locator']['table-name'] for rule in added) == sorted(segmentation)
+    for rule in added:
+        table = segmentation[rule['object-locator']['table-name']]
+        assert rule['parallel-load']['columns'] == [table['column']]
+        boundaries = [int(boundary) for (boundary,) in rule['parallel-load']['boundaries']]
+        # ranges split at the boundaries, below the first one and from the last one up, so
+        # strictly increasing boundaries inside the key space cover it in exactly table['segments'] pieces
+        assert len(boundaries) == table['segments'] - 1
+        edges = [0] + boundaries + [table['max_value']]
+        widths = [high - low for (low, high) in zip(edges, edges[1:])]
+        assert all(width > 0 for width in widths)
+        assert sum(widths) == table['max_value']
+        assert max(widths) - min(widths) <= 1
+
+@pytest.mark.parametrize('profile', list(DMS_PERFORMANCE_PROFILES))
+def test_synthesized_task(profile, monkeypatch):
+    # the stack reads its json files relative to the working directory, like cdk synth
+    monkeypatch.chdir(ROOT)
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    template = synth(profile)
+    template.has_resource_properties('AWS::DMS::ReplicationInstance', {
+        'ReplicationInstanceClass': DMS_PERFORMANCE_PROFILES[profile]['instance_class'],
+    })
+    task = next(iter(template.find_resources('AWS::DMS::ReplicationTask').values()))['Properties']
+    assert task['MigrationType'] == 'full-load'
+    assert json.loads(task['ReplicationTaskSettings']) == tuned_task_settings(load(TASK_SETTINGS), profile)
+    assert json.loads(task['TableMappings']) == segmented_table_mappings(load(SOURCE_MAPPINGS), profile)
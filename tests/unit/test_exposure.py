@@ -0,0 +1,58 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from gremlin_python.process.anonymous_traversal import traversal
+from gremlin_python.structure.graph import Graph
+
+from tests.mbs_get import mbs_get_api
+
+exposure = mbs_get_api.exposure
+
+SELLER = {'id': '100001', 'values': {'name': 'Seller 1'}}
+LOAN = {'id': '10000000001', 'values': {'loan_id': '10000000001', 'unpaid_principal_balance': 1000.0}}
+SECURITY = {'id': '369WAU713', 'values': {'cusip': '369WAU713'}}
+
+
+def projected(depth):
+    g = traversal().withGraph(Graph())
+    request = exposure.entity_exposure(g.V(SELLER['id']), 'seller', 100, 10, depth)
+    return request.bytecode.step_instructions[1][1:]
+
+def test_entity_exposure_depth():
+    assert projected(1) == ['entity', 'loan_count', 'loans']
+    assert projected(2) == ['entity', 'loan_count', 'exposed_loans', 'securities']
+
+def test_entity_exposure_depth_passed_through(monkeypatch):
+    depths = []
+    class NoResults:
+        def toList(self):
+            return []
+    monkeypatch.setattr(exposure, 'entity_exposure', lambda start, label, max_loans, max_fanout, depth: depths.append(depth) or NoResults())
+    monkeypatch.setattr(mbs_get_api, 'g', traversal().withGraph(Graph()))
+    monkeypatch.setattr(mbs_get_api.result_cache, 'get_or_load', lambda key, load: load())
+    for depth in (1, 2):
+        assert mbs_get_api.get_entity_exposure('seller', SELLER['id'], (depth, 100, 10)) is None
+    assert depths == [1, 2]
+
+def test_shape_entity_exposure():
+    decode = lambda rows: [dict(row) for row in rows]
+    loans = exposure.shape_entity_exposure({'entity': SELLER, 'loan_count': 2, 'loans': [LOAN]}, 1, decode)
+    assert loans == {'entity': {'name': 'Seller 1', 'id': '100001'}, 'truncated': True,
+        'loans': [{'loan_id': '10000000001', 'unpaid_principal_balance': 1000.0, 'id': '10000000001'}]}
+    securities = exposure.shape_entity_exposure(
+        {'entity': SELLER, 'loan_count': 1, 'exposed_loans': {SECURITY['id']: 1}, 'securities': [SECURITY]}, 5, decode)
+    assert securities['securities'] == [{'cusip': '369WAU713', 'id': '369WAU713', 'exposed_loans': 1}]
+    assert 'loans' not in securities
@@ -0,0 +1,89 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import re
+
+from tests import changes, synthetic
+from tools import synthetic_mbs
+from tools.mapping_compiler import EdgeProjector, VertexProjector
+
+FIELD = re.compile(r'{(\w+)}')
+
+
+def interpolate(template, row):
+    # the template engine the compiler replaces: one dict lookup per field per row
+    values = {field: row[field] for field in FIELD.findall(template)}
+    if None in values.values():
+        return None
+    return FIELD.sub(lambda match: str(values[match.group(1)]), template)
+
+def naive_project(rules, table, columns, rows):
+    """
+    (kind, rule id, label, elements) per definition, rendering every template row by row
+    """
+    results = []
+    for rule in rules:
+        if rule['table_name'] != table:
+            continue
+        definitions = [(VertexProjector, definition, definition.get('vertex_properties', [])) for definition in rule.get('vertex_definitions', [])]
+        definitions += [(EdgeProjector, definition, definition.get('edge_properties', [])) for definition in rule.get('edge_definitions', [])]
+        for (projector, definition, properties) in definitions:
+            templates = projector.id_templates(definition)
+            if any(field not in columns for template in templates for field in FIELD.findall(template)):
+                continue
+            properties = [prop for prop in properties if set(FIELD.findall(prop['property_value_template'])) <= set(columns)]
+            label = definition['vertex_label'] if projector is VertexProjector else definition['edge_id_template']['label']
+            elements = []
+            for values in rows:
+                row = dict(zip(columns, values))
+                ids = [interpolate(template, row) for template in templates]
+                if None in ids:
+                    continue
+                elements.append((*ids, label, *[interpolate(prop['property_value_template'], row) for prop in properties]))
+            results.append((projector.kind, rule['rule_id'], label, elements))
+    return results
+
+def compiled_project(mapping, table, columns, rows):
+    return [(projector.kind, projector.rule_id, projector.label, elements) for (projector, elements) in mapping.compile(table, columns).project(rows)]
+
+
+def test_matches_naive_interpolation():
+    mapping = changes.mapping()
+    generator = synthetic.small_generator()
+    for table in synthetic_mbs.columns:
+        (columns, rows) = generator.rows(table)
+        rows = list(rows)
+        assert compiled_project(mapping, table, columns, rows) == naive_project(mapping.rules, table, columns, rows), table
+
+def test_null_columns():
+    mapping = changes.mapping()
+    columns = changes.LOAN_COLUMNS
+    rows = [changes.loan_row(changes.LOANS[0], None), changes.loan_row(None, '1000.00')]
+    (vertices,) = [elements for (kind, rule_id, label, elements) in compiled_project(mapping, 'loan', columns, rows)]
+    # NULL properties are kept as None, rows without an id are dropped
+    assert len(vertices) == 1 and vertices[0][columns.index('unpaid_principal_balance') + 2] is None
+    assert compiled_project(mapping, 'loan', columns, rows) == naive_project(mapping.rules, 'loan', columns, rows)
+
+def test_missing_columns():
+    mapping = changes.mapping()
+    # no loan_status, so its property is dropped, and no loan_id, so nothing projects
+    columns = [column for column in changes.LOAN_COLUMNS if column != 'loan_status']
+    rows = [tuple(value for (column, value) in zip(changes.LOAN_COLUMNS, changes.loan_row(loan_id, '1000.00')) if column != 'loan_status') for loan_id in changes.LOANS]
+    ((projector, vertices),) = mapping.compile('loan', columns).project(rows)
+    assert 'loan_status' not in [prop['property_name'] for prop in projector.properties]
+    assert compiled_project(mapping, 'loan', columns, rows) == naive_project(mapping.rules, 'loan', columns, rows)
+    without_id = [column for column in changes.LOAN_COLUMNS if column != 'loan_id']
+    assert mapping.compile('loan', without_id).project([]) == []
@@ -0,0 +1,70 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import json
+import time
+
+from tests.mbs_get import mbs_get_api
+
+import neptune_iam
+
+
+def emitted(capsys):
+    record = json.loads(capsys.readouterr().out.splitlines()[-1])
+    units = {metric['Name']: metric['Unit'] for metric in record['_aws']['CloudWatchMetrics'][0]['Metrics']}
+    return (record, units)
+
+
+def test_cache_hits_and_misses_per_invocation(capsys):
+    cache = mbs_get_api.result_cache
+    cache.put(('loansbycusip', 'earlier'), [])
+    cache.get(('loansbycusip', 'earlier'))
+    cache.get(('loansbycusip', 'unknown'))
+
+    # only this invocation's lookups count, not the container's totals
+    mbs_get_api.reset_timings()
+    cache.put(('loansbycusip', 'cached'), [{'loan_id': 1}])
+    cache.get(('loansbycusip', 'cached'))
+    cache.get(('loansbycusip', 'cached'))
+    cache.get(('loansbycusip', 'missing'))
+    mbs_get_api.record_invocation({'body': '[]'}, 0.01, None)
+
+    (record, units) = emitted(capsys)
+    assert (record['CacheHits'], record['CacheMisses']) == (2, 1)
+    assert units['CacheHits'] == units['CacheMisses'] == 'Count'
+
+def test_connection_age_gauge(capsys, monkeypatch):
+    monkeypatch.setitem(mbs_get_api.connection_state, 'created_at', None)
+    mbs_get_api.reset_timings()
+    mbs_get_api.record_invocation(None, 0.01, None)
+    (record, units) = emitted(capsys)
+    assert 'ConnectionAgeSeconds' not in units
+
+    monkeypatch.setitem(mbs_get_api.connection_state, 'created_at', time.time() - 90)
+    mbs_get_api.reset_timings()
+    mbs_get_api.record_invocation({'body': '[]'}, 0.01, None)
+    (record, units) = emitted(capsys)
+    assert units['ConnectionAgeSeconds'] == 'Seconds'
+    assert 90 <= record['ConnectionAgeSeconds'] < 100
+
+def test_signature_expiry(monkeypatch):
+    # static credentials don't tell their expiry, so the signature age bounds it
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'AKIDEXAMPLE')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'secret')
+    monkeypatch.setattr(neptune_iam, 'boto_session', None)
+    (url, headers, expires_at) = mbs_get_api.prepare_iamdb_request('wss://localhost:8182/gremlin')
+    assert 'Authorization' in dict(headers)
+    assert abs(expires_at - time.time() - mbs_get_api.SIGNATURE_MAX_AGE) < 5
@@ -0,0 +1,43 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import pytest
+
+from tests.mbs_get import mbs_get_api
+
+
+def test_page_size():
+    assert mbs_get_api.parse_page_size(None) == mbs_get_api.DEFAULT_PAGE_SIZE
+    assert mbs_get_api.parse_page_size('10') == 10
+    for page_size in ('ten', '2.5', ''):
+        with pytest.raises(ValueError, match='page_size must be an integer'):
+            mbs_get_api.parse_page_size(page_size)
+    for page_size in ('0', str(mbs_get_api.MAX_PAGE_SIZE + 1)):
+        with pytest.raises(ValueError, match='page_size must be between'):
+            mbs_get_api.parse_page_size(page_size)
+
+def test_invalid_page_size_is_rejected_before_querying(monkeypatch):
+    # no graph is needed, the page size is checked first
+    monkeypatch.setattr(mbs_get_api, 'g', None)
+    with pytest.raises(ValueError, match='page_size must be an integer'):
+        mbs_get_api.get_all_vertices('ten')
+
+def test_cursor_is_bound_to_its_label():
+    cursor = mbs_get_api.encode_cursor('10000000001', 'loan')
+    assert mbs_get_api.decode_cursor(cursor, 'loan') == '10000000001'
+    for label in (None, 'security'):
+        with pytest.raises(ValueError, match='Invalid cursor'):
+            mbs_get_api.decode_cursor(cursor, label)
@@ -0,0 +1,39 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import datetime
+
+from tests.mbs_get import mbs_get_api
+
+
+def test_typed_rows_are_not_copied():
+    row = {'loan_id': '10000000001', 'unpaid_principal_balance': 150000.0, 'loan_term': 360, 'loan_status': '1'}
+    [decoded] = mbs_get_api.transform([row])
+    assert decoded is row
+    assert decoded == {'loan_id': '10000000001', 'unpaid_principal_balance': 150000.0, 'loan_term': 360, 'loan_status': '1'}
+
+def test_strings_and_dates_are_decoded():
+    row = {'loan_id': '10000000001', 'unpaid_principal_balance': '150000.5', 'loan_term': '360',
+        'issuance_date': datetime.datetime(2023, 3, 1), 'payment_date': '2023-04-01', 'int_pymnt': None}
+    [decoded] = mbs_get_api.transform([row])
+    assert decoded == {'loan_id': '10000000001', 'unpaid_principal_balance': 150000.5, 'loan_term': 360,
+        'issuance_date': '2023-03-01', 'payment_date': '2023-04-01', 'int_pymnt': None}
+    # the driver's row is left as it came
+    assert row['issuance_date'] == datetime.datetime(2023, 3, 1)
+
+def test_undecodable_values_are_kept():
+    [decoded] = mbs_get_api.transform([{'loan_term': 'n/a', 'original_interest_rate': 4.5}])
+    assert decoded == {'loan_term': 'n/a', 'original_interest_rate': 4.5}
@@ -0,0 +1,72 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import csv
+import glob
+import gzip
+import os
+
+from tests import changes, synthetic
+from tools import neptune_bulkload, synthetic_mbs
+
+
+def read_shards(output_dir):
+    files = {}
+    for path in sorted(glob.glob(os.path.join(output_dir, '*.csv.gz'))):
+        (prefix, shard) = os.path.basename(path).rsplit('-', 1)
+        with gzip.open(path, mode='rt', newline='') as file:
+            (header, *rows) = list(csv.reader(file))
+        files.setdefault(prefix, {'header': header, 'rows': []})['rows'].extend(rows)
+    return files
+
+def test_export_matches_the_projected_graph(tmp_path):
+    generator = synthetic.small_generator()
+    mapping = changes.mapping()
+    synthetic_mbs.write_copy_files(generator, str(tmp_path / 'source'))
+    # small shards, so rows are split across several files per rule
+    neptune_bulkload.export(neptune_bulkload.CsvSource(str(tmp_path / 'source' / 'dml')), mapping, str(tmp_path / 'out'), shard_rows=7, batch_rows=5)
+
+    (vertices, edges) = synthetic.projected_graph(synthetic.small_generator(), mapping)
+    (exported_vertices, exported_edges) = ({}, {})
+    (types, loan_rows) = (set(), 0)
+    for (prefix, file) in read_shards(str(tmp_path / 'out')).items():
+        (kind, header) = (prefix.split('-', 1)[0], file['header'])
+        types.update(column.rsplit(':', 1)[1] for column in header if ':' in column)
+        if kind == 'vertices':
+            assert header[:2] == ['~id', '~label']
+            label = file['rows'][0][1]
+            exported_vertices.setdefault(label, set()).update(row[0] for row in file['rows'])
+            if label == 'loan':
+                loan_rows += len(file['rows'])
+        else:
+            assert header[:4] == ['~id', '~from', '~to', '~label']
+            label = file['rows'][0][3]
+            exported_edges.setdefault(label, set()).update(tuple(row[:3]) for row in file['rows'])
+    assert {'Double', 'Date'} <= types
+    assert loan_rows == len(vertices['loan']) == 40
+    assert exported_vertices == vertices
+    assert exported_edges == edges
+
+def test_shards_rotate_at_shard_rows(tmp_path):
+    writer = neptune_bulkload.ShardedCsvWriter(str(tmp_path), 'vertices-1-loan', ['~id', '~label'], 3)
+    writer.write_rows([[str(i), 'loan'] for i in range(4)])
+    writer.write_rows([[str(i), 'loan'] for i in range(4, 7)])
+    writer.close()
+    shards = []
+    for path in sorted(glob.glob(str(tmp_path / '*.csv.gz'))):
+        with gzip.open(path, mode='rt', newline='') as file:
+            shards.append(len(list(csv.reader(file))) - 1)
+    assert shards == [3, 3, 1]
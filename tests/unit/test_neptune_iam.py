@@ -0,0 +1,44 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import datetime
+import time
+from types import SimpleNamespace
+
+from tests.security_summary import neptune_iam
+
+
+def test_credential_expiry():
+    expiry = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=30)
+    refreshable = SimpleNamespace(_expiry_time=expiry)
+    assert neptune_iam.credential_expiry(refreshable) == expiry.timestamp()
+    # static credentials, and botocore versions without the private attribute
+    for credentials in (SimpleNamespace(), SimpleNamespace(_expiry_time=None)):
+        fallback = neptune_iam.credential_expiry(credentials) - time.time()
+        assert abs(fallback - neptune_iam.CREDENTIAL_FALLBACK_TTL) < 5
+
+def test_signed_handshake(monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'AKIDEXAMPLE')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'secret')
+    monkeypatch.setenv('AWS_SESSION_TOKEN', 'token')
+    monkeypatch.setattr(neptune_iam, 'boto_session', None)
+    (url, headers, expires_at) = neptune_iam.prepare_iamdb_request('wss://localhost:8182/gremlin')
+    headers = dict(headers)
+    assert url == 'wss://localhost:8182/gremlin'
+    assert headers['Authorization'].startswith('AWS4-HMAC-SHA256 Credential=AKIDEXAMPLE/')
+    assert '/us-east-1/neptune-db/aws4_request' in headers['Authorization']
+    assert headers['X-Amz-Security-Token'] == 'token'
+    assert expires_at > time.time()
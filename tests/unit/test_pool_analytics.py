@@ -0,0 +1,81 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import pytest
+
+from tools.pool_analytics import PoolAnalytics, PoolData, analyze, months_of
+
+AS_OF = '2023-04-01'
+
+
+def pool():
+    """
+    Three zero rate loans issued in January 2023: loan 1 prepays 200 in March, loan 2
+    misses its March payment and catches up in April, loan 3 pays off in February
+    """
+    payments = [
+        (1, '2023-02-01', 100, 1100), (1, '2023-03-01', 300, 800), (1, '2023-04-01', 100, 700),
+        (2, '2023-02-01', 100, 900), (2, '2023-04-01', 200, 700),
+        (3, '2023-02-01', 500, 0),
+    ]
+    (loan_ids, dates, principal, balance) = zip(*payments)
+    return PoolData([1, 2, 3], [1200, 1000, 500], [0, 0, 0], [12, 10, 10], months_of(['2023-01-01'] * 3), [1, 1, 1],
+        loan_ids, months_of(dates), principal, balance)
+
+
+def test_prepayment_and_pool_factor():
+    result = analyze(pool(), AS_OF)
+    assert result['month'] == ['2023-01', '2023-02', '2023-03', '2023-04']
+    assert result['upb'] == [2700, 2000, 1700, 1400]
+    assert result['pool_factor'] == pytest.approx([1, 2000 / 2700, 1700 / 2700, 1400 / 2700])
+    assert result['scheduled_principal'] == [0, 250, 100, 200]
+    assert result['prepaid_principal'] == [0, 450, 200, 100]
+    # prepaid over the balance left after scheduled principal, of the loans paying
+    smm = [0, 450 / 2450, 200 / 1000, 100 / 1500]
+    assert result['smm'] == pytest.approx(smm)
+    assert result['cpr'] == pytest.approx([1 - (1 - value) ** 12 for value in smm])
+
+def test_missed_payment_rolls_and_cures():
+    result = analyze(pool(), AS_OF)
+    assert result['dq30'] == [0, 0, 1, 0]
+    assert result['dq60'] == result['dq90'] == [0, 0, 0, 0]
+    transitions = result['roll_rates']['transitions']
+    # three issuances and loan 1's two on time payments stay current, loan 2 rolls to 30 and back
+    assert transitions[0][:2] == [5, 1]
+    assert transitions[1][0] == 1
+    assert sum(map(sum, transitions)) == 7
+
+def test_paid_off_loan():
+    result = analyze(pool(), AS_OF)
+    assert result['loans'] == 3
+    assert result['outstanding_loans'] == [3, 2, 2, 2]
+
+def test_metrics_are_cached_per_cusip_and_as_of(tmp_path):
+    class CountingLoader:
+        loads = 0
+        def load(self, cusip, as_of):
+            self.loads += 1
+            return pool()
+    loader = CountingLoader()
+    analytics = PoolAnalytics(loader, cache_dir=str(tmp_path))
+    first = analytics.metrics('369WAU713', AS_OF)
+    assert analytics.metrics('369WAU713', AS_OF) is first
+    assert loader.loads == 1
+    # a new instance reads the disk cache instead of loading
+    assert PoolAnalytics(loader, cache_dir=str(tmp_path)).metrics('369WAU713', AS_OF) == first
+    assert loader.loads == 1
+    analytics.metrics('369WAU713', '2023-03-01')
+    assert loader.loads == 2
@@ -0,0 +1,73 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from tests.mbs_get import mbs_get_api
+
+ResultCache = mbs_get_api.ResultCache
+InMemorySharedTier = mbs_get_api.shared_tiers['memory']
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_evicts_least_recently_used():
+    cache = ResultCache(2, 60)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats()['cache_evictions'] == 1
+
+def test_expires_after_ttl():
+    clock = Clock()
+    cache = ResultCache(10, 60, clock=clock)
+    cache.put('a', 1)
+    clock.now = 59.0
+    assert cache.get('a') == 1
+    clock.now = 60.0
+    assert cache.get('a') is None
+    assert cache.stats()['cache_entries'] == 0
+    assert cache.stats()['cache_misses'] == 1
+
+def test_promotes_from_shared_tier():
+    clock = Clock()
+    shared = InMemorySharedTier(clock=clock)
+    shared.set('a', 1, 60)
+    cache = ResultCache(10, 60, shared_tier=shared, clock=clock)
+    assert cache.get('a') == 1
+    assert 'a' in cache.entries
+    shared.values.clear()
+    assert cache.get('a') == 1
+    stats = cache.stats()
+    assert (stats['cache_shared_hits'], stats['cache_hits'], stats['cache_misses']) == (1, 1, 0)
+
+def test_load_only_on_miss():
+    cache = ResultCache(10, 60)
+    loads = []
+    def load():
+        loads.append(1)
+        return 'value'
+    assert cache.get_or_load('a', load) == 'value'
+    assert cache.get_or_load('a', load) == 'value'
+    assert len(loads) == 1
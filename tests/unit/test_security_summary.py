@@ -0,0 +1,55 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import datetime
+
+import pytest
+
+from tests.security_summary import security_summary
+
+
+def loan(percentage, original, upb, rate, term, latest=None):
+    return {
+        'percentage': percentage,
+        'loan': {'original_principal_balance': original, 'unpaid_principal_balance': upb, 'original_interest_rate': rate, 'loan_term': term},
+        'latest': [latest] if latest else [],
+    }
+
+
+def test_summarize():
+    loans = [
+        # the latest payment's balance and remaining term win over the loan's
+        loan(100, 1000.0, 900.0, 4.0, 360, {'rem_unpaid_principal_balance': 800.0, 'rem_mnths_to_maturity': 300, 'payment_date': datetime.datetime(2023, 6, 1)}),
+        # half owned, no payment yet, every property a string as the original mapping wrote them
+        loan('50', '2000', '2000', '6.0', '240'),
+    ]
+    summary = security_summary.summarize(loans)
+    assert summary['pool_upb'] == pytest.approx(800 + 1000)
+    assert summary['pool_original_upb'] == pytest.approx(1000 + 1000)
+    assert summary['pool_factor'] == pytest.approx(0.9)
+    assert summary['wac'] == pytest.approx((800 * 4.0 + 1000 * 6.0) / 1800)
+    assert summary['wam'] == pytest.approx((800 * 300 + 1000 * 240) / 1800)
+    assert summary['loan_count'] == 2
+    assert summary['summary_as_of'] == '2023-06-01'
+    assert set(summary) == set(security_summary.SUMMARY_PROPERTIES)
+
+def test_summarize_zero_balance():
+    paid_off = loan(100, 1000.0, 1000.0, 4.0, 360, {'rem_unpaid_principal_balance': 0.0, 'rem_mnths_to_maturity': 0, 'payment_date': '2023-06-01'})
+    summary = security_summary.summarize([paid_off])
+    assert (summary['pool_upb'], summary['pool_factor'], summary['wac'], summary['wam']) == (0.0, 0.0, 0.0, 0.0)
+    assert summary['pool_original_upb'] == 1000.0
+    empty = security_summary.summarize([])
+    assert (empty['pool_factor'], empty['loan_count'], empty['summary_as_of']) == (0.0, 0, '')
@@ -0,0 +1,29 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from tests import changes, synthetic
+
+
+def test_edges_only_reference_generated_vertices():
+    # feed_gremlin upserts edges with addE() from and to existing vertices
+    (vertices, edges) = synthetic.projected_graph(synthetic.small_generator(), changes.mapping())
+    ids = set().union(*vertices.values())
+    assert len(vertices['loan']) == 40
+    assert len(vertices['security']) <= 3
+    assert len(edges['has securitized loan']) == 40
+    for (label, elements) in edges.items():
+        for (edge_id, from_id, to_id) in elements:
+            assert from_id in ids and to_id in ids, label
@@ -0,0 +1,93 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Times tools.pool_analytics on one synthetic pool, without a database.
+
+All --loans go into a single security of tools.synthetic_mbs. The generator only writes
+scheduled payments, so with the defaults SMM stays at zero, which checks the scheduled
+principal against the generator's amortization. --missed-payments drops that share of
+the activity rows and --curtailments adds a partial prepayment to that share, to exercise
+the delinquency and prepayment paths.
+
+    python -m tools.analytics_benchmark --loans 50000 --months 360
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from tools import synthetic_mbs
+from tools.pool_analytics import PoolData, analyze, months_of
+
+
+def synthetic_pool(args):
+    generator = synthetic_mbs.SyntheticMbs(args.loans, 1, 1, 1, args.months, args.as_of, seed=args.seed)
+    loan_columns = list(synthetic_mbs.columns['loan'])
+    loans = [np.concatenate(columns) for columns in zip(*generator.chunks('loan'))]
+    loan = {name: loans[loan_columns.index(name)] for name in loan_columns}
+    activity_columns = list(synthetic_mbs.columns['loan_activity'])
+    activity = [np.concatenate(columns) for columns in zip(*generator.chunks('loan_activity'))]
+    activity = {name: activity[activity_columns.index(name)] for name in activity_columns}
+
+    rng = np.random.default_rng(args.seed)
+    rows = len(activity['loan_id'])
+    kept = rng.random(rows) >= args.missed_payments
+    principal = activity['principal_pymnt'].copy()
+    curtailed = rng.random(rows) < args.curtailments
+    principal[curtailed] += np.round(activity['rem_unpaid_principal_balance'][curtailed] * 0.05, 2)
+
+    return PoolData(
+        loan['loan_id'], loan['original_principal_balance'], loan['original_interest_rate'], loan['loan_term'],
+        months_of(loan['issuance_date']), np.ones(args.loans),
+        activity['loan_id'][kept], months_of(activity['payment_date'][kept]), principal[kept],
+        activity['rem_unpaid_principal_balance'][kept],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the vectorized pool analytics on a synthetic pool')
+    parser.add_argument('--loans', type=int, default=50000)
+    parser.add_argument('--months', type=int, default=360, help='longest loan history')
+    parser.add_argument('--as-of', default='2023-07-01')
+    parser.add_argument('--missed-payments', type=float, default=0.0)
+    parser.add_argument('--curtailments', type=float, default=0.0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    pool = synthetic_pool(args)
+    print('generated {} loans, {} activity rows in {:.1f}s'.format(pool.loans, len(pool.month), time.perf_counter() - start))
+
+    samples = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        result = analyze(pool, args.as_of)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    print('analyze: best {:.3f}s median {:.3f}s over {} months'.format(samples[0], samples[len(samples) // 2], len(result['month'])))
+    print('last month: pool factor {:.4f}, SMM {:.6f}, CPR {:.4f}, 30/60/90+ days {}/{}/{}'.format(
+        result['pool_factor'][-1], result['smm'][-1], result['cpr'][-1], result['dq30'][-1], result['dq60'][-1], result['dq90'][-1]))
+    print('max SMM {:.6f}'.format(max(result['smm'])))
+    print('roll rates:')
+    for (state, rates) in zip(result['roll_rates']['states'], result['roll_rates']['rates']):
+        print('  {:<8} {}'.format(state, ' '.join('{:8.4f}'.format(rate) for rate in rates)))
+
+
+if __name__ == '__main__':
+    main()
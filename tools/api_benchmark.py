@@ -0,0 +1,288 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Drives mbs_get_api.lambda_handler in process against a local Gremlin Server (TinkerGraph)
+with a mix of query types, and reports latency percentiles, throughput and the time
+split between the traversal, transform() and encoding the response.
+
+The graph is loaded from tools.synthetic_mbs or from the sample scripts in
+sqlscripts/dml. The result cache is off unless --cache is given, so every request
+reaches the graph. --output saves the results and --baseline compares a run with saved
+results, exiting non zero when a p95 regressed by more than --max-regression.
+
+    docker run -d -p 8182:8182 -v $PWD/resources/config/tinkergraph/tinkergraph-empty.properties:/opt/gremlin-server/conf/tinkergraph-empty.properties tinkerpop/gremlin-server:3.5.1
+    python -m tools.api_benchmark --dataset synthetic --loans 50000 --concurrency 4 --requests 2000
+    python -m tools.api_benchmark --dataset sample --mix loansbycusip=1 --skip-load
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tools import synthetic_mbs
+from tools.mapping_compiler import CompiledMapping
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAPPINGS = 'resources/config/dms_json_mappings/target_mappings.json'
+DEFAULT_SAMPLE_DIR = 'sqlscripts/dml'
+DEFAULT_MIX = 'loansbycusip=40,loansbyseller=20,loansbyservicer=20,getallvertices=20'
+LAMBDA_DIR = os.path.join(os.path.dirname(__file__), '..', 'lambda')
+
+
+class SampleScriptSource:
+    """
+    Rows of the INSERT scripts in sqlscripts/dml, parsed with the dbloader's parser
+    """
+    def __init__(self, dml_dir):
+        # the loader looks up its RDS secret on import unless it is given a local DSN
+        os.environ.setdefault('PG_DSN', 'unused')
+        sys.path.insert(0, os.path.join(LAMBDA_DIR, 'dbloader'))
+        import dbloader
+        self.tables = {}
+        for filename in sorted(os.listdir(dml_dir)):
+            with open(os.path.join(dml_dir, filename)) as file:
+                for statement in dbloader.iter_statements([file.read()]):
+                    parsed = dbloader.parse_insert(statement)
+                    if parsed is None:
+                        continue
+                    (table, columns, rows) = parsed
+                    table = dbloader.table_name(table).split('.')[-1]
+                    (_, table_rows) = self.tables.setdefault(table, (columns, []))
+                    table_rows.extend(tuple(None if value is None else value[1] for value in row) for row in rows)
+
+    def rows(self, table):
+        if table not in self.tables:
+            return (None, iter(()))
+        (columns, rows) = self.tables[table]
+        return (list(columns), iter(rows))
+
+    def ids(self, table, column):
+        (columns, rows) = self.tables.get(table, ((column,), []))
+        position = list(columns).index(column)
+        return sorted({row[position] for row in rows})
+
+
+def synthetic_ids(generator):
+    return {
+        'loansbycusip': [synthetic_mbs.cusip(i) for i in range(generator.securities)],
+        'loansbyseller': [str(synthetic_mbs.SELLER_ID_BASE + i) for i in range(generator.sellers)],
+        'loansbyservicer': [str(synthetic_mbs.SERVICER_ID_BASE + i) for i in range(generator.servicers)],
+        'securitycashflows': [synthetic_mbs.cusip(i) for i in range(generator.securities)],
+    }
+
+def sample_ids(source):
+    return {
+        'loansbycusip': source.ids('security', 'cusip'),
+        'loansbyseller': source.ids('seller', 'seller_id'),
+        'loansbyservicer': source.ids('servicer', 'servicer_id'),
+        'securitycashflows': source.ids('security', 'cusip'),
+    }
+
+def load_graph(source, tables, mapping, args):
+    from gremlin_python.driver.driver_remote_connection import DriverRemoteConnection
+    from gremlin_python.process.anonymous_traversal import traversal
+    remote = DriverRemoteConnection('ws://{}:{}/gremlin'.format(args.gremlin_host, args.gremlin_port), 'g')
+    try:
+        start = time.time()
+        g = traversal().withRemote(remote)
+        synthetic_mbs.feed_gremlin(g, mapping, source, args.batch_rows, tables)
+        logger.info('loaded %d vertices and %d edges in %.1fs', g.V().count().next(), g.E().count().next(), time.time() - start)
+    finally:
+        remote.close()
+
+
+def handler_environment(gremlin_host, gremlin_port, serializer='graphsonv2', pool_size=4, cache=False):
+    return {
+        'CLUSTER_ENDPOINT': gremlin_host,
+        'CLUSTER_PORT': str(gremlin_port),
+        'CLUSTER_PROTOCOL': 'ws',
+        'USE_IAM': 'false',
+        'AWS_REGION': os.environ.get('AWS_REGION', 'us-east-1'),
+        'LOG_LEVEL': 'WARNING',
+        'MESSAGE_SERIALIZER': serializer,
+        'POOL_SIZE': str(pool_size),
+        'CACHE_MAX_ENTRIES': '256' if cache else '0',
+        # the benchmark reads timings() itself, keep the metrics records off stdout
+        'METRICS_SAMPLE_RATE': '0',
+    }
+
+def import_handler(args):
+    # the module starts connecting on import, so the environment has to be in place first
+    os.environ.update(handler_environment(args.gremlin_host, args.gremlin_port, args.serializer, max(args.concurrency, 1), args.cache))
+    sys.path.insert(0, os.path.join(LAMBDA_DIR, 'mbs_get'))
+    import mbs_get_api
+    return mbs_get_api
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(','):
+        (query, weight) = part.split('=')
+        weights[query.strip()] = float(weight)
+    return weights
+
+def plan_requests(weights, ids, args, rng):
+    queries = list(weights)
+    requests = []
+    for query in rng.choices(queries, [weights[query] for query in queries], k=args.requests):
+        if query == 'getallvertices':
+            params = {'param': query, 'page_size': str(args.page_size), 'label': args.label}
+        else:
+            params = {'param': query, 'id': rng.choice(ids[query])}
+        requests.append(params)
+    return requests
+
+
+class Recorder:
+    """
+    Latency and phase timings per query type, filled by the worker threads
+    """
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self.lock = threading.Lock()
+
+    def record(self, query, seconds, phases, ok):
+        with self.lock:
+            if not ok:
+                self.errors[query] = self.errors.get(query, 0) + 1
+                return
+            self.samples.setdefault(query, []).append((seconds, phases.get('transform', 0.0), phases.get('serialization', 0.0)))
+
+    def summary(self, elapsed):
+        results = {}
+        for query in sorted(set(self.samples) | set(self.errors)):
+            samples = self.samples.get(query, [])
+            if not samples:
+                results[query] = {'requests': 0, 'errors': self.errors[query]}
+                continue
+            latencies = sorted(sample[0] for sample in samples)
+            pick = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+            total = sum(latencies)
+            transform = sum(sample[1] for sample in samples)
+            serialization = sum(sample[2] for sample in samples)
+            results[query] = {
+                'requests': len(samples),
+                'errors': self.errors.get(query, 0),
+                'p50_ms': round(pick(0.50), 2),
+                'p95_ms': round(pick(0.95), 2),
+                'p99_ms': round(pick(0.99), 2),
+                'traversal_pct': round(100 * (total - transform - serialization) / total, 1),
+                'transform_pct': round(100 * transform / total, 1),
+                'serialization_pct': round(100 * serialization / total, 1),
+            }
+        requests = sum(len(samples) for samples in self.samples.values())
+        return {'queries': results, 'requests': requests, 'throughput_rps': round(requests / elapsed, 1)}
+
+
+def invoke(api, params, recorder):
+    event = {'body': json.dumps({'queryStringParameters': params})}
+    start = time.perf_counter()
+    try:
+        response = api.lambda_handler(event, None)
+        # error responses carry a plain text message instead of a JSON document
+        json.loads(response['body'])
+        ok = True
+    except Exception as e:
+        logger.warning('%s failed: %s', params, e)
+        ok = False
+    recorder.record(params['param'], time.perf_counter() - start, api.timings(), ok)
+
+def run(api, requests, args):
+    recorder = Recorder()
+    # warm up the connection pool and the module level state like a warm Lambda
+    for params in requests[:args.warmup]:
+        invoke(api, params, Recorder())
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        for params in requests:
+            executor.submit(invoke, api, params, recorder)
+    return recorder.summary(time.perf_counter() - start)
+
+def regressions(results, baseline, max_regression):
+    found = []
+    for (query, stats) in results['queries'].items():
+        previous = baseline['queries'].get(query)
+        if previous is not None and 'p95_ms' in stats and 'p95_ms' in previous and stats['p95_ms'] > previous['p95_ms'] * (1 + max_regression):
+            found.append('{}: p95 {}ms, was {}ms'.format(query, stats['p95_ms'], previous['p95_ms']))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark mbs_get_api.lambda_handler against a local Gremlin Server')
+    parser.add_argument('--gremlin-host', default='localhost')
+    parser.add_argument('--gremlin-port', type=int, default=8182)
+    parser.add_argument('--dataset', choices=('synthetic', 'sample'), default='synthetic')
+    parser.add_argument('--sample-dir', default=DEFAULT_SAMPLE_DIR)
+    parser.add_argument('--loans', type=int, default=50000)
+    parser.add_argument('--securities', type=int)
+    parser.add_argument('--sellers', type=int, default=50)
+    parser.add_argument('--servicers', type=int, default=50)
+    parser.add_argument('--months', type=int, default=12, help='loan_activity history per loan of the synthetic graph')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--skip-load', action='store_true', help='reuse a graph loaded by an earlier run')
+    parser.add_argument('--batch-rows', type=int, default=5000)
+    parser.add_argument('--mappings', default=DEFAULT_MAPPINGS)
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='query=weight pairs')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--page-size', type=int, default=1000)
+    parser.add_argument('--label', default='loan', help='vertex label of the getallvertices requests')
+    parser.add_argument('--serializer', default='graphsonv2', choices=('graphbinary', 'graphsonv2', 'graphsonv3'))
+    parser.add_argument('--cache', action='store_true', help='keep the result cache on')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='results of an earlier run to compare with')
+    parser.add_argument('--max-regression', type=float, default=0.2)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+
+    if args.dataset == 'synthetic':
+        source = synthetic_mbs.SyntheticMbs(args.loans, args.securities, args.sellers, args.servicers, args.months, seed=args.seed)
+        ids = synthetic_ids(source)
+    else:
+        source = SampleScriptSource(args.sample_dir)
+        ids = sample_ids(source)
+    if not args.skip_load:
+        load_graph(source, list(synthetic_mbs.columns), CompiledMapping.load(args.mappings), args)
+
+    api = import_handler(args)
+    requests = plan_requests(parse_mix(args.mix), ids, args, random.Random(args.seed))
+    results = run(api, requests, args)
+    print(json.dumps(results, indent=2))
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            found = regressions(results, json.load(file), args.max_regression)
+        for line in found:
+            print('regression: ' + line)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""
+Compares the throughput of the batched loansbycusip, loansbyseller and loansbyservicer
+requests of the MBS get API, at 1, 10, 100 and 1000 ids per request, with sending the
+same ids one request each.
+
+mbs_get_api.lambda_handler is called in process, one request at a time and with the
+result cache off, against a local Gremlin Server loaded from tools.synthetic_mbs (see
+tools.api_benchmark). There are as many securities, sellers and servicers as the largest
+batch, so its ids are distinct.
+
+    python -m tools.batch_benchmark --loans 50000 --sizes 1,10,100,1000
+"""
+
+import argparse
+import json
+import logging
+import random
+import sys
+import time
+
+from tools import synthetic_mbs
+from tools.api_benchmark import import_handler, load_graph, synthetic_ids
+from tools.mapping_compiler import CompiledMapping
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAPPINGS = 'resources/config/dms_json_mappings/target_mappings.json'
+QUERIES = ('loansbycusip', 'loansbyseller', 'loansbyservicer')
+
+# the batched queries don't reach loan_activity, leave it out of the graph
+tables = [table for table in synthetic_mbs.columns if table != 'loan_activity']
+
+
+def call(api, params):
+    response = api.lambda_handler({'body': json.dumps({'queryStringParameters': params})}, None)
+    # error responses carry a plain text message instead of a JSON document
+    try:
+        return json.loads(response['body'])
+    except ValueError:
+        sys.exit('{} failed: {}'.format(params['param'], response['body']))
+
+def batched(api, query, ids):
+    result = call(api, {'param': query, 'ids': ','.join(ids)})
+    if result['missing']:
+        sys.exit('{} found no vertex for {} of {} ids'.format(query, len(result['missing']), len(ids)))
+
+def one_by_one(api, query, ids):
+    for id in ids:
+        call(api, {'param': query, 'id': id})
+
+def throughput(run, api, query, batches):
+    start = time.perf_counter()
+    for ids in batches:
+        run(api, query, ids)
+    elapsed = time.perf_counter() - start
+    ids = sum(map(len, batches))
+    requests = ids if run is one_by_one else len(batches)
+    return {'requests_per_sec': round(requests / elapsed, 1), 'ids_per_sec': round(ids / elapsed, 1)}
+
+def measure(api, query, sizes, ids, args, rng):
+    # the same number of ids for every size, so the larger batches run fewer requests
+    result = {'query': query, 'one_by_one': throughput(one_by_one, api, query, [rng.choices(ids, k=args.ids)]), 'batched': {}}
+    for size in sizes:
+        result['batched'][size] = throughput(batched, api, query, [rng.sample(ids, size) for _ in range(max(1, args.ids // size))])
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark batched multi id requests of the MBS get API')
+    parser.add_argument('--gremlin-host', default='localhost')
+    parser.add_argument('--gremlin-port', type=int, default=8182)
+    parser.add_argument('--mappings', default=DEFAULT_MAPPINGS)
+    parser.add_argument('--loans', type=int, default=50000)
+    parser.add_argument('--sizes', default='1,10,100,1000', help='ids per batched request')
+    parser.add_argument('--ids', type=int, default=2000, help='ids looked up per query type, one by one and at each batch size')
+    parser.add_argument('--batch-rows', type=int, default=5000)
+    parser.add_argument('--serializer', default='graphsonv2', choices=('graphbinary', 'graphsonv2', 'graphsonv3'))
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--skip-load', action='store_true', help='reuse a graph loaded by an earlier run')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+    entities = sizes[-1]
+    generator = synthetic_mbs.SyntheticMbs(args.loans, entities, entities, entities, seed=args.seed)
+    if not args.skip_load:
+        load_graph(generator, tables, CompiledMapping.load(args.mappings), args)
+
+    # one request at a time, without the result cache
+    (args.concurrency, args.cache) = (1, False)
+    api = import_handler(args)
+    ids = synthetic_ids(generator)
+    rng = random.Random(args.seed)
+    results = [measure(api, query, sizes, ids[query], args, rng) for query in QUERIES]
+
+    print('{:<16} {:>6} {:>14} {:>14} {:>8}'.format('query', 'batch', 'requests/s', 'ids/s', 'speedup'))
+    for result in results:
+        single = result['one_by_one']
+        print('{:<16} {:>6} {:>14} {:>14} {:>8}'.format(result['query'], 'single', single['requests_per_sec'], single['ids_per_sec'], ''))
+        for (size, rates) in result['batched'].items():
+            print('{:<16} {:>6} {:>14} {:>14} {:>7.1f}x'.format(result['query'], size, rates['requests_per_sec'], rates['ids_per_sec'],
+                rates['ids_per_sec'] / single['ids_per_sec']))
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'loans': args.loans, 'results': results}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Applies changes to the mbs schema to the graph as batched, idempotent upserts.
+
+Changes are read from a logical replication slot using the wal2json plugin,
+collapsed per graph element within a batch and written with the
+fold().coalesce(unfold(), addV()/addE()) pattern, so replaying a batch is harmless.
+Columns updated to NULL drop their property. Link tables have no primary key and need
+REPLICA IDENTITY FULL for their deletes, and for updates of their key columns, to carry
+the columns the old edge ids are built from.
+
+    python -m tools.cdc_applier --pg-dsn "dbname=postgres host=localhost" --gremlin-url ws://localhost:8182/gremlin
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import re
+import select
+import time
+
+from gremlin_python.driver.driver_remote_connection import DriverRemoteConnection
+from gremlin_python.process.anonymous_traversal import traversal
+from gremlin_python.process.graph_traversal import __
+from gremlin_python.process.traversal import Cardinality, T
+
+from tools.mapping_compiler import CompiledMapping
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAPPINGS = 'resources/config/dms_json_mappings/target_mappings.json'
+DEFAULT_SCHEMA = 'mbs'
+DEFAULT_SLOT = 'mbs_graph_cdc'
+
+UTC_OFFSET_HOURS = re.compile(r'[+-]\d\d$')
+
+UPSERT = 'upsert'
+DROP = 'drop'
+
+
+def parse_date(value):
+    return datetime.datetime.strptime(value[:10], '%Y-%m-%d')
+
+property_converters = {
+    'Double': float,
+    'Float': float,
+    'Int': int,
+    'Long': int,
+    'Date': parse_date,
+}
+
+
+class ChangeBatch:
+    """
+    The latest operation per graph element among a batch of row changes
+    """
+    def __init__(self, mapping):
+        self.mapping = mapping
+        self.vertices = {}
+        self.edges = {}
+        self.changes = 0
+        self.oldest_commit = None
+        self.loan_ids = set()
+
+    def add(self, table, action, columns, values, commit_time, old_columns=None, old_values=None):
+        self.changes += 1
+        if commit_time is not None and (self.oldest_commit is None or commit_time < self.oldest_commit):
+            self.oldest_commit = commit_time
+        if 'loan_id' in columns:
+            self.loan_ids.add(values[columns.index('loan_id')])
+        if action == 'U' and old_columns:
+            # the before-image of an update that changed the key, its elements are dropped
+            # unless the new row projects to the same ids
+            for (definition, elements) in self.mapping.compile(table, old_columns).project([tuple(old_values)]):
+                target = self.vertices if definition.kind == 'vertices' else self.edges
+                for element in elements:
+                    target[element[0]] = (DROP, definition, element)
+        projector = self.mapping.compile(table, columns)
+        for (definition, elements) in projector.project([tuple(values)]):
+            target = self.vertices if definition.kind == 'vertices' else self.edges
+            for element in elements:
+                # a later change to the same element replaces any earlier one in the batch
+                target[element[0]] = (DROP, definition, element) if action == 'D' else (UPSERT, definition, element)
+
+    def __len__(self):
+        return self.changes
+
+
+class GraphWriter:
+    """
+    Writes collapsed change batches with chained, idempotent Gremlin traversals
+    """
+    def __init__(self, g, operations_per_traversal=50):
+        self.g = g
+        self.operations_per_traversal = operations_per_traversal
+
+    def apply(self, batch):
+        for request in self.traversals(batch):
+            request.iterate()
+
+    def traversals(self, batch):
+        # vertices are upserted before the edges that reference them and dropped after them
+        yield from self.chained([op for op in batch.vertices.values() if op[0] == UPSERT], self.upsert_vertex)
+        yield from self.chained([op for op in batch.edges.values() if op[0] == UPSERT], self.upsert_edge)
+        yield from self.dropped([op for op in batch.edges.values() if op[0] == DROP], self.g.E)
+        yield from self.dropped([op for op in batch.vertices.values() if op[0] == DROP], self.g.V)
+
+    def chunks(self, operations):
+        for start in range(0, len(operations), self.operations_per_traversal):
+            yield operations[start:start + self.operations_per_traversal]
+
+    def chained(self, operations, step):
+        # every step starts with V() and ends with one traverser, the start of the next step
+        for chunk in self.chunks(operations):
+            request = self.g
+            for (action, definition, element) in chunk:
+                request = step(request, definition, element)
+            yield request
+
+    def dropped(self, operations, start):
+        # drop() ends a traversal, so the ids of a chunk are dropped together from g.V() or g.E()
+        for chunk in self.chunks(operations):
+            yield start(*[element[0] for (action, definition, element) in chunk]).drop()
+
+    def set_properties(self, traversal, definition, values):
+        for (prop, value) in zip(definition.properties, values):
+            if value is None:
+                # a column updated to NULL must not leave the old value behind
+                traversal = traversal.sideEffect(__.properties(prop['property_name']).drop())
+                continue
+            convert = property_converters.get(prop['property_value_type'])
+            value = convert(value) if convert else value
+            if definition.kind == 'vertices':
+                traversal = traversal.property(Cardinality.single, prop['property_name'], value)
+            else:
+                traversal = traversal.property(prop['property_name'], value)
+        return traversal
+
+    def upsert_vertex(self, traversal, definition, element):
+        (vertex_id, label, *values) = element
+        traversal = traversal.V(vertex_id).fold().coalesce(__.unfold(), __.addV(label).property(T.id, vertex_id))
+        return self.set_properties(traversal, definition, values)
+
+    def upsert_edge(self, traversal, definition, element):
+        # there is no E() step inside a traversal, the edge is looked up from its out-vertex.
+        # fold() keeps the chain going when that vertex is missing, addE() then fails loudly
+        (edge_id, from_id, to_id, label, *values) = element
+        traversal = traversal.V(from_id).fold().coalesce(
+            __.unfold().outE(label).hasId(edge_id),
+            __.addE(label).from_(__.V(from_id)).to(__.V(to_id)).property(T.id, edge_id))
+        return self.set_properties(traversal, definition, values)
+
+
+class ApplierStats:
+    """
+    Throughput and replication lag of the applied batches
+    """
+    def __init__(self):
+        self.started = time.time()
+        self.changes = 0
+        self.batches = 0
+
+    def record(self, batch, seconds):
+        self.changes += len(batch)
+        self.batches += 1
+        lag = time.time() - batch.oldest_commit if batch.oldest_commit is not None else 0.0
+        elapsed = time.time() - self.started
+        logger.info('applied %d changes (%d vertices, %d edges) in %.2fs, lag %.1fs, %.0f changes/sec overall',
+            len(batch), len(batch.vertices), len(batch.edges), seconds, lag, self.changes / max(elapsed, 1e-9))
+
+
+def parse_commit_time(message):
+    timestamp = message.get('timestamp')
+    if timestamp is None:
+        return None
+    # wal2json timestamps look like 2023-07-19 16:39:00.123456+00
+    if UTC_OFFSET_HOURS.search(timestamp):
+        timestamp += ':00'
+    return datetime.datetime.fromisoformat(timestamp).timestamp()
+
+def add_change(batch, message, schema):
+    if message.get('action') not in ('I', 'U', 'D') or message.get('schema') != schema:
+        return
+    # deletes only carry the replica identity columns, updates carry them as their
+    # before-image when the key changed or the table has REPLICA IDENTITY FULL
+    columns = message.get('identity') if message['action'] == 'D' else message.get('columns')
+    if not columns:
+        return
+    old_columns = message.get('identity') if message['action'] == 'U' else None
+    names = lambda columns: [column['name'] for column in columns] if columns else None
+    values = lambda columns: [None if column['value'] is None else str(column['value']) for column in columns] if columns else None
+    batch.add(message['table'], message['action'], names(columns), values(columns), parse_commit_time(message),
+        names(old_columns), values(old_columns))
+
+
+def refresh_summaries(summary_function, batch):
+    # the security summary job recomputes only the securities holding these loans
+    if summary_function is None or not batch.loan_ids:
+        return
+    import boto3
+    boto3.client('lambda').invoke(FunctionName=summary_function, InvocationType='Event',
+        Payload=json.dumps({'loan_ids': sorted(batch.loan_ids)}).encode())
+
+def stream_changes(conn, slot, schema, mapping, writer, batch_changes, batch_seconds, summary_function=None):
+    cur = conn.cursor()
+    try:
+        cur.create_replication_slot(slot, output_plugin='wal2json')
+    except Exception:
+        logger.info('using existing replication slot %s', slot)
+    cur.start_replication(slot_name=slot, decode=True, options={
+        'format-version': '2',
+        'include-timestamp': '1',
+        'add-tables': f'{schema}.*',
+    })
+
+    stats = ApplierStats()
+    batch = ChangeBatch(mapping)
+    batch_started = time.time()
+    last_lsn = None
+    while True:
+        message = cur.read_message()
+        if message is not None:
+            if len(batch) == 0:
+                batch_started = time.time()
+            add_change(batch, json.loads(message.payload), schema)
+            last_lsn = message.data_start
+        else:
+            remaining = batch_seconds if len(batch) == 0 else batch_seconds - (time.time() - batch_started)
+            if remaining > 0:
+                select.select([cur], [], [], remaining)
+
+        if len(batch) >= batch_changes or (len(batch) > 0 and time.time() - batch_started >= batch_seconds):
+            start = time.time()
+            writer.apply(batch)
+            stats.record(batch, time.time() - start)
+            refresh_summaries(summary_function, batch)
+            # the slot may release WAL only once the changes are in the graph
+            cur.send_feedback(flush_lsn=last_lsn)
+            batch = ChangeBatch(mapping)
+        elif message is None and len(batch) == 0 and last_lsn is not None:
+            # acknowledge transactions that carried no mapped changes
+            cur.send_feedback(flush_lsn=last_lsn)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply mbs schema changes to the graph as batched upserts')
+    parser.add_argument('--mappings', default=DEFAULT_MAPPINGS)
+    parser.add_argument('--pg-dsn', required=True)
+    parser.add_argument('--schema', default=DEFAULT_SCHEMA)
+    parser.add_argument('--slot', default=DEFAULT_SLOT)
+    parser.add_argument('--gremlin-url', required=True)
+    parser.add_argument('--batch-changes', type=int, default=5000)
+    parser.add_argument('--batch-seconds', type=float, default=5.0)
+    parser.add_argument('--summary-function', help='security summary Lambda to invoke with the loan ids of each batch')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+
+    # only the replication stream needs psycopg2, GraphWriter is also used by tools.synthetic_mbs
+    import psycopg2
+    from psycopg2.extras import LogicalReplicationConnection
+    conn = psycopg2.connect(args.pg_dsn, connection_factory=LogicalReplicationConnection)
+    remote = DriverRemoteConnection(args.gremlin_url, 'g')
+    try:
+        writer = GraphWriter(traversal().withRemote(remote))
+        stream_changes(conn, args.slot, args.schema, CompiledMapping.load(args.mappings), writer, args.batch_changes, args.batch_seconds, args.summary_function)
+    finally:
+        remote.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
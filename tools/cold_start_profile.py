@@ -0,0 +1,115 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Measures the cold start of the MBS get Lambda locally.
+
+--imports breaks the import of mbs_get_api down by package with python -X importtime,
+without connecting. --runs starts that many fresh interpreters against a local Gremlin
+Server and reports the import, the first (cold) request and a second (warm) request. The
+graph has to hold --id, load it with tools.api_benchmark first.
+
+    python -m tools.cold_start_profile --imports
+    python -m tools.cold_start_profile --runs 20 --gremlin-host localhost
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from tools.api_benchmark import LAMBDA_DIR, handler_environment
+
+# run in each fresh interpreter, prints the timings as JSON on its last line
+COLD_START = '''
+import json, time
+start = time.perf_counter()
+import mbs_get_api
+imported = time.perf_counter()
+event = {"body": json.dumps({"queryStringParameters": %s})}
+response = mbs_get_api.lambda_handler(event, None)
+first = time.perf_counter()
+results = mbs_get_api.invocation_timings.results
+mbs_get_api.lambda_handler(event, None)
+second = time.perf_counter()
+print(json.dumps({"import": imported - start, "first_request": first - imported, "warm_request": second - first,
+    "status": response["statusCode"], "results": results}))
+'''
+
+
+def handler_process(args, env, *command):
+    env = dict(os.environ, **env, PYTHONPATH=os.path.join(LAMBDA_DIR, 'mbs_get'))
+    return subprocess.run([sys.executable, *command], env=env, capture_output=True, text=True, check=True)
+
+def import_breakdown(args):
+    env = dict(handler_environment(args.gremlin_host, args.gremlin_port), CONNECT_ON_INIT='false')
+    output = handler_process(args, env, '-X', 'importtime', '-c', 'import mbs_get_api').stderr
+    # "import time: self [us] | cumulative | imported package", nesting shown by indentation
+    packages = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        (own, _, name) = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + int(own)
+    total = sum(packages.values())
+    print('import of mbs_get_api: {:.1f}ms'.format(total / 1000))
+    for (package, micros) in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print('  {:<32} {:8.1f}ms {:5.1f}%'.format(package, micros / 1000, 100 * micros / total))
+
+def cold_start(args, env, params):
+    try:
+        process = handler_process(args, env, '-c', COLD_START % params)
+    except subprocess.CalledProcessError as error:
+        sys.exit('a cold start run failed, is the Gremlin Server at {}:{} up?\n{}'.format(args.gremlin_host, args.gremlin_port, '\n'.join(error.stderr.splitlines()[-3:])))
+    return json.loads(process.stdout.splitlines()[-1])
+
+def cold_starts(args):
+    env = handler_environment(args.gremlin_host, args.gremlin_port)
+    params = json.dumps({'param': args.param, 'id': args.id})
+    runs = [cold_start(args, env, params) for _ in range(args.runs)]
+    # an empty graph answers fast, which would pass for a good cold start
+    if any(run['status'] != 200 or run['results'] == 0 for run in runs):
+        sys.exit('{}={} returned status {} with {} results, load the graph with tools.api_benchmark first'.format(
+            args.param, args.id, runs[0]['status'], runs[0]['results']))
+    for phase in ('import', 'first_request', 'warm_request'):
+        samples = sorted(run[phase] for run in runs)
+        pick = lambda p: samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+        print('{:<14} p50 {:7.1f}ms p95 {:7.1f}ms'.format(phase, pick(0.5), pick(0.95)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Profile the cold start of the MBS get Lambda')
+    parser.add_argument('--imports', action='store_true', help='import time per package')
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--runs', type=int, default=0, help='fresh interpreters to time against a Gremlin Server')
+    parser.add_argument('--gremlin-host', default='localhost')
+    parser.add_argument('--gremlin-port', type=int, default=8182)
+    parser.add_argument('--param', default='loansbycusip')
+    parser.add_argument('--id', default='369WAU713')
+    args = parser.parse_args()
+
+    if not args.imports and args.runs == 0:
+        parser.error('nothing to do, pass --imports and/or --runs')
+    if args.imports:
+        import_breakdown(args)
+    if args.runs:
+        cold_starts(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""
+Times transform(), the schema driven result decoder of the MBS get API, on loan and
+loan_activity result sets of 10000 and 100000 rows, against float parsing every value
+as the API did while every property was mapped as a String.
+
+The rows come from tools.synthetic_mbs. The typed rows hold what the graph returns for
+the property types of target_mappings.json, the string rows what it returned when all of
+them were strings. No graph is needed.
+
+    python -m tools.decode_benchmark --rows 10000,100000
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from tools import synthetic_mbs
+from tools.api_benchmark import LAMBDA_DIR, handler_environment
+
+TABLES = ('loan', 'loan_activity')
+
+
+def import_api():
+    # transform() needs no connection
+    os.environ.update(handler_environment('localhost', 8182))
+    os.environ['CONNECT_ON_INIT'] = 'false'
+    sys.path.insert(0, os.path.join(LAMBDA_DIR, 'mbs_get'))
+    import mbs_get_api
+    return mbs_get_api
+
+def python_values(column):
+    # dates come back from the graph as datetime, numbers as float or int
+    if column is None:
+        return itertools.repeat(None)
+    if column.dtype.kind == 'M':
+        return column.astype('datetime64[ms]').tolist()
+    return column.tolist()
+
+def result_rows(table, rows, typed, seed):
+    # twelve months of history per loan gives loan_activity about as many rows as loans
+    generator = synthetic_mbs.SyntheticMbs(rows, 1, 1, 1, months=12, seed=seed, chunk_loans=min(rows, 10000))
+    names = list(synthetic_mbs.columns[table])
+    result = []
+    for values in generator.chunks(table):
+        count = len(values[0])
+        columns = [python_values(column) if typed.get(name) else synthetic_mbs.to_strings(column, count) for (name, column) in zip(names, values)]
+        result.extend(dict(zip(names, row)) for row in zip(*columns))
+        if len(result) >= rows:
+            break
+    return result[:rows]
+
+def float_everything(items):
+    # the decoder before the mapping carried property types
+    def whole(v):
+        try:
+            return float(v)
+        except ValueError:
+            return v
+    return [{k: whole(v) for (k, v) in item.items()} for item in items]
+
+def best_of(repeat, run):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return (best, result)
+
+def measure(api, table, rows, args):
+    typed = {name: True for name in api.property_decoders}
+    typed_rows = result_rows(table, rows, typed, args.seed)
+    string_rows = result_rows(table, rows, {}, args.seed)
+    (schema_seconds, decoded) = best_of(args.repeat, lambda: api.transform(typed_rows))
+    (legacy_seconds, legacy) = best_of(args.repeat, lambda: float_everything(string_rows))
+    # ids, zip codes and other string properties the old decoder turned into floats
+    mangled = sum(isinstance(value, float) and not isinstance(decoded_row[name], float)
+        for (row, decoded_row) in zip(legacy, decoded) for (name, value) in row.items())
+    return {
+        'table': table,
+        'rows': rows,
+        'schema_ms': round(schema_seconds * 1000, 2),
+        'float_everything_ms': round(legacy_seconds * 1000, 2),
+        'mangled_values': mangled,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark decoding of query results by property type')
+    parser.add_argument('--rows', default='10000,100000', help='result set sizes')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args()
+
+    api = import_api()
+    results = [measure(api, table, int(rows), args) for table in TABLES for rows in args.rows.split(',')]
+
+    print('{:<14} {:>8} {:>12} {:>16} {:>8} {:>10}'.format('table', 'rows', 'schema', 'float everything', 'speedup', 'mangled'))
+    for result in results:
+        print('{:<14} {:>8} {:>10.1f}ms {:>14.1f}ms {:>7.1f}x {:>10}'.format(result['table'], result['rows'], result['schema_ms'],
+            result['float_everything_ms'], result['float_everything_ms'] / result['schema_ms'], result['mangled_values']))
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'results': results}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
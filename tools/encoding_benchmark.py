@@ -0,0 +1,124 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Compares the response formats and content codings of the MBS get API on a pool sized
+loansbycusip response: body bytes, server side encode time and client side decode time.
+
+The loan rows come from tools.synthetic_mbs with the property types the API returns.
+Formats whose package isn't installed are skipped.
+
+    python -m tools.encoding_benchmark --loans 20000
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+import zlib
+
+from tools import synthetic_mbs
+
+# the encoders are shared with the Lambda, which is packaged from its own directory
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda', 'mbs_get'))
+import encoding  # noqa: E402
+
+
+def loan_rows(loans, seed):
+    generator = synthetic_mbs.SyntheticMbs(loans, 1, 1, 1, seed=seed, chunk_loans=loans)
+    values = next(generator.chunks('loan'))
+    # dates as the API returns them, everything else as the Python type of its property
+    columns = [column.astype(str).tolist() if column.dtype.kind == 'M' else column.tolist() for column in values]
+    return [dict(zip(synthetic_mbs.columns['loan'], row)) for row in zip(*columns)]
+
+def decode_arrow(data):
+    import pyarrow as pa
+    return pa.ipc.open_stream(data).read_all()
+
+def decode_msgpack(data):
+    import msgpack
+    return msgpack.unpackb(data, raw=False)
+
+decoders = {
+    'json': json.loads,
+    'columnar': json.loads,
+    'msgpack': decode_msgpack,
+    'arrow': decode_arrow,
+}
+
+decompressors = {
+    None: lambda data: data,
+    'gzip': gzip.decompress,
+    'deflate': zlib.decompress,
+}
+
+def best_of(repeat, run):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return (best, result)
+
+def measure(rows, format, coding, args):
+    def server():
+        body = encoding.encode(rows, format)
+        return encoding.compress(body, coding, args.level) if coding else body
+    (encode_seconds, body) = best_of(args.repeat, server)
+    (decode_seconds, _) = best_of(args.repeat, lambda: decoders[format](decompressors[coding](body)))
+    return {
+        'format': format,
+        'coding': coding or 'identity',
+        'bytes': len(body),
+        'encode_ms': round(encode_seconds * 1000, 2),
+        'decode_ms': round(decode_seconds * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the response encodings of the MBS get API')
+    parser.add_argument('--loans', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--level', type=int, default=5, help='gzip and deflate compression level')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args()
+
+    rows = loan_rows(args.loans, args.seed)
+    results = []
+    for format in encoding.content_types:
+        if not encoding.available(format):
+            print('{}: skipped, {} is not installed'.format(format, encoding.format_packages[format]))
+            continue
+        for coding in [None] + encoding.content_codings:
+            results.append(measure(rows, format, coding, args))
+
+    baseline = results[0]['bytes']
+    print('{} loans'.format(args.loans))
+    print('{:<10} {:<9} {:>12} {:>7} {:>10} {:>10}'.format('format', 'coding', 'bytes', 'ratio', 'encode', 'decode'))
+    for result in results:
+        print('{:<10} {:<9} {:>12} {:>6.1f}% {:>8.1f}ms {:>8.1f}ms'.format(result['format'], result['coding'], result['bytes'],
+            100 * result['bytes'] / baseline, result['encode_ms'], result['decode_ms']))
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'loans': args.loans, 'results': results}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Compares the one traversal exposure queries of the MBS get API with the per loan
+round trips a client needs without them, on a synthetic graph.
+
+The graph comes from tools.synthetic_mbs, with Zipf distributed pool sizes, written
+through the mapping rules and the CDC upsert writer, so vertex ids and edge labels match
+a DMS load. Use --skip-load to rerun against a graph loaded earlier with the same sizes
+and seed. The Gremlin Server needs a TinkerGraph that takes string ids, see
+resources/config/tinkergraph/tinkergraph-empty.properties.
+
+    python -m tools.exposure_benchmark --gremlin-url ws://localhost:8182/gremlin --loans 200000 --securities 100
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+from gremlin_python.driver import serializer
+from gremlin_python.driver.driver_remote_connection import DriverRemoteConnection
+from gremlin_python.process.anonymous_traversal import traversal
+
+from tools import synthetic_mbs
+from tools.mapping_compiler import CompiledMapping
+
+# the traversals are shared with the Lambda, which is packaged from its own directory
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda', 'mbs_get'))
+import exposure  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAPPINGS = 'resources/config/dms_json_mappings/target_mappings.json'
+
+# the exposure traversals don't reach loan_activity, leave it out of the graph
+tables = [table for table in synthetic_mbs.columns if table != 'loan_activity']
+
+
+def load(g, mapping, generator, args):
+    start = time.time()
+    synthetic_mbs.feed_gremlin(g, mapping, generator, args.batch_rows, tables)
+    logger.info('loaded {} vertices and {} edges in {:.1f}s'.format(g.V().count().next(), g.E().count().next(), time.time() - start))
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    pick = lambda p: ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+    return 'p50 {:.0f}ms p95 {:.0f}ms p99 {:.0f}ms'.format(pick(0.5) * 1000, pick(0.95) * 1000, pick(0.99) * 1000)
+
+def timed(run, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        samples.append(time.perf_counter() - start)
+    return (samples, result)
+
+def one_traversal(g, security_id, args):
+    return exposure.security_exposure(g.V(security_id), args.max_loans, args.max_fanout, 2).toList()
+
+def per_loan_round_trips(g, security_id, args):
+    # loans by cusip, then one request per loan and neighbour kind
+    loans = g.V(security_id).out(exposure.SECURITY_LOAN_EDGE).limit(args.max_loans).id().toList()
+    return [[g.V(loan_id).flatMap(neighbours().limit(args.max_fanout)).id().toList() for neighbours in exposure.loan_neighbours.values()]
+        for loan_id in loans]
+
+def run(g, args, rng):
+    cusip = synthetic_mbs.cusip
+    securities = [cusip(rng.randrange(args.securities)) for _ in range(args.repeat)]
+
+    (samples, result) = timed(lambda: one_traversal(g, securities.pop(), args), args.repeat)
+    size = len(json.dumps(result, default=str))
+    print('one traversal: {} ({} response bytes)'.format(percentiles(samples), size))
+
+    securities = [cusip(rng.randrange(args.securities)) for _ in range(args.baseline_repeat)]
+    (samples, _) = timed(lambda: per_loan_round_trips(g, securities.pop(), args), args.baseline_repeat)
+    print('per loan round trips: {}'.format(percentiles(samples)))
+
+    entity_ids = {
+        'seller': lambda: str(synthetic_mbs.SELLER_ID_BASE + rng.randrange(args.sellers)),
+        'servicer': lambda: str(synthetic_mbs.SERVICER_ID_BASE + rng.randrange(args.servicers)),
+    }
+    for label in exposure.entity_loan_edges:
+        entity_id = entity_ids[label]()
+        (samples, _) = timed(lambda: exposure.entity_exposure(g.V(entity_id), label, args.max_loans, args.max_fanout, 2).toList(), args.repeat)
+        print('{} exposure: {}'.format(label, percentiles(samples)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the exposure traversals on a synthetic graph')
+    parser.add_argument('--mappings', default=DEFAULT_MAPPINGS)
+    parser.add_argument('--gremlin-url', required=True)
+    parser.add_argument('--loans', type=int, default=200000)
+    parser.add_argument('--securities', type=int, default=100)
+    parser.add_argument('--sellers', type=int, default=50)
+    parser.add_argument('--servicers', type=int, default=50)
+    parser.add_argument('--batch-rows', type=int, default=5000)
+    parser.add_argument('--max-loans', type=int, default=5000)
+    parser.add_argument('--max-fanout', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--baseline-repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--skip-load', action='store_true')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+
+    remote = DriverRemoteConnection(args.gremlin_url, 'g', message_serializer=serializer.GraphBinarySerializersV1())
+    try:
+        g = traversal().withRemote(remote)
+        if not args.skip_load:
+            generator = synthetic_mbs.SyntheticMbs(args.loans, args.securities, args.sellers, args.servicers, seed=args.seed)
+            load(g, CompiledMapping.load(args.mappings), generator, args)
+        run(g, args, random.Random(args.seed))
+    finally:
+        remote.close()
+
+
+if __name__ == '__main__':
+    main()
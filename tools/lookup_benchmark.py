@@ -0,0 +1,136 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""
+Times the seller or servicer lookup of the MBS get API as the number of those vertices
+in the graph grows, resolving the key to a vertex id against the property scan that is
+left as the fallback for labels without a known id scheme.
+
+The vertices come from tools.synthetic_mbs, written through the mapping rules, so their
+ids follow the vertex_id_template conventions of a DMS load. The graph grows in --sizes
+steps, each step only writes the vertices the previous one did not. Past 100000 the
+synthetic seller ids run into the servicer ids, so a run grows one --label in an empty
+graph. The Gremlin Server needs a TinkerGraph that takes string ids, see
+resources/config/tinkergraph/tinkergraph-empty.properties.
+
+    python -m tools.lookup_benchmark --label seller --sizes 1000,10000,100000,200000
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import random
+import time
+
+from tools import synthetic_mbs
+from tools.api_benchmark import import_handler
+from tools.mapping_compiler import CompiledMapping
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAPPINGS = 'resources/config/dms_json_mappings/target_mappings.json'
+
+key_bases = {
+    'seller': synthetic_mbs.SELLER_ID_BASE,
+    'servicer': synthetic_mbs.SERVICER_ID_BASE,
+}
+
+
+class NewEntities:
+    """
+    The seller or servicer rows of a generator after the first `loaded` ones, which an
+    earlier, smaller step already wrote
+    """
+    def __init__(self, entities, loaded):
+        self.generator = synthetic_mbs.SyntheticMbs(1, 1, entities, entities)
+        self.loaded = loaded
+
+    def rows(self, table):
+        (table_columns, rows) = self.generator.rows(table)
+        return (table_columns, itertools.islice(rows, self.loaded, None))
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    pick = lambda p: ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+    return {'p50_ms': round(pick(0.5) * 1000, 2), 'p95_ms': round(pick(0.95) * 1000, 2), 'p99_ms': round(pick(0.99) * 1000, 2)}
+
+def timed(lookup, keys):
+    samples = []
+    for key in keys:
+        start = time.perf_counter()
+        found = lookup(key)
+        samples.append(time.perf_counter() - start)
+        if len(found) != 1:
+            raise RuntimeError('lookup of {} found {} vertices'.format(key, len(found)))
+    return percentiles(samples)
+
+def measure(api, label, entities, args, rng):
+    keys = lambda count: [str(key_bases[label] + rng.randrange(entities)) for _ in range(count)]
+    # the API's own lookup, g.V(id) from the rendered vertex_id_template
+    by_id = timed(lambda key: api.lookup_vertex(label, key).id().toList(), keys(args.repeat))
+    # the fallback when the id scheme is unknown, every vertex with the label is filtered
+    scan = lambda key: api.g.V().hasLabel(label).has(api.vertex_key_properties[label], key).id().toList()
+    by_scan = timed(scan, keys(args.scan_repeat))
+    return {'label': label, 'entities': entities, 'id': by_id, 'scan': by_scan}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark seller or servicer lookups as their number grows')
+    parser.add_argument('--gremlin-host', default='localhost')
+    parser.add_argument('--gremlin-port', type=int, default=8182)
+    parser.add_argument('--mappings', default=DEFAULT_MAPPINGS)
+    parser.add_argument('--label', default='seller', choices=list(key_bases))
+    parser.add_argument('--sizes', default='1000,10000,100000', help='vertices with the label in the graph at each step')
+    parser.add_argument('--repeat', type=int, default=200, help='id lookups per step')
+    parser.add_argument('--scan-repeat', type=int, default=20, help='property scans per step')
+    parser.add_argument('--batch-rows', type=int, default=5000)
+    parser.add_argument('--serializer', default='graphsonv2', choices=('graphbinary', 'graphsonv2', 'graphsonv3'))
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+
+    # one connection, lookups run one at a time and without the result cache
+    (args.concurrency, args.cache) = (1, False)
+    api = import_handler(args)
+    api.ensure_connection()
+    mapping = CompiledMapping.load(args.mappings)
+    rng = random.Random(args.seed)
+
+    results = []
+    loaded = 0
+    for entities in sorted(int(size) for size in args.sizes.split(',')):
+        start = time.time()
+        synthetic_mbs.feed_gremlin(api.g, mapping, NewEntities(entities, loaded), args.batch_rows, [args.label])
+        logger.info('grew to %d %s vertices in %.1fs', entities, args.label, time.time() - start)
+        loaded = entities
+        results.append(measure(api, args.label, entities, args, rng))
+
+    print('{:<9} {:>9} {:>28} {:>28}'.format('label', 'entities', 'id p50/p95/p99 ms', 'scan p50/p95/p99 ms'))
+    for result in results:
+        print('{:<9} {:>9} {:>28} {:>28}'.format(result['label'], result['entities'],
+            *['{p50_ms}/{p95_ms}/{p99_ms}'.format(**result[kind]) for kind in ('id', 'scan')]))
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'results': results}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
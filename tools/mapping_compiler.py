@@ -0,0 +1,244 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Compiles the rules in target_mappings.json into projectors over column positions,
+so applying them to a batch of rows does no template parsing and no per row dicts.
+
+    mapping = CompiledMapping.load('resources/config/dms_json_mappings/target_mappings.json')
+    projector = mapping.compile('loan_activity', columns)
+    for (definition, output_rows) in projector.project(rows):
+        ...
+
+    python -m tools.mapping_compiler --rows 1000000
+"""
+
+import argparse
+import json
+import logging
+import re
+import time
+from itertools import repeat
+from operator import itemgetter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAPPINGS = 'resources/config/dms_json_mappings/target_mappings.json'
+TEMPLATE_FIELD = re.compile(r'{(\w+)}')
+
+
+def template_fields(template):
+    return TEMPLATE_FIELD.findall(template)
+
+def compile_template(template, column_positions):
+    """
+    Returns a function rendering the template for a batch of row tuples into a
+    list of strings, with None where any column the template uses is NULL
+    """
+    literals = TEMPLATE_FIELD.split(template)[0::2]
+    positions = [column_positions[field] for field in template_fields(template)]
+
+    if len(positions) == 0:
+        return lambda rows: [template] * len(rows)
+
+    if len(positions) == 1 and literals == ['', '']:
+        get_value = itemgetter(positions[0])
+        def render_column(rows):
+            return [None if value is None else str(value) for value in map(get_value, rows)]
+        return render_column
+
+    # positional format string, parsed by str.format in C rather than per row here
+    format_string = '{}'.join(literal.replace('{', '{{').replace('}', '}}') for literal in literals)
+    get_values = itemgetter(*positions)
+    def render(rows):
+        return [None if None in values else format_string.format(*values) for values in map(get_values, rows)]
+    return render
+
+
+class VertexProjector:
+    """
+    Projects rows to (id, label, *property values) vertex tuples
+    """
+    __slots__ = ('rule_id', 'label', 'properties', 'render_id', 'render_properties')
+
+    kind = 'vertices'
+    header = ('~id', '~label')
+
+    def __init__(self, rule_id, definition, properties, column_positions):
+        self.rule_id = rule_id
+        self.label = definition['vertex_label']
+        self.properties = properties
+        self.render_id = compile_template(definition['vertex_id_template'], column_positions)
+        self.render_properties = [compile_template(prop['property_value_template'], column_positions) for prop in properties]
+
+    @staticmethod
+    def id_templates(definition):
+        return [definition['vertex_id_template']]
+
+    def project(self, rows):
+        # render column by column, then zip the columns into vertex tuples
+        ids = self.render_id(rows)
+        columns = [render(rows) for render in self.render_properties]
+        return [vertex for vertex in zip(ids, repeat(self.label), *columns) if vertex[0] is not None]
+
+
+class EdgeProjector:
+    """
+    Projects rows to (id, from, to, label, *property values) edge tuples
+    """
+    __slots__ = ('rule_id', 'label', 'properties', 'render_id', 'render_from', 'render_to', 'render_properties')
+
+    kind = 'edges'
+    header = ('~id', '~from', '~to', '~label')
+
+    def __init__(self, rule_id, definition, properties, column_positions):
+        self.rule_id = rule_id
+        self.label = definition['edge_id_template']['label']
+        self.properties = properties
+        (self.render_id, self.render_from, self.render_to) = [compile_template(template, column_positions) for template in self.id_templates(definition)]
+        self.render_properties = [compile_template(prop['property_value_template'], column_positions) for prop in properties]
+
+    @staticmethod
+    def id_templates(definition):
+        return [
+            definition['edge_id_template']['template'],
+            definition['from_vertex']['vertex_id_template'],
+            definition['to_vertex']['vertex_id_template'],
+        ]
+
+    def project(self, rows):
+        # render column by column, then zip the columns into edge tuples
+        ids = self.render_id(rows)
+        from_ids = self.render_from(rows)
+        to_ids = self.render_to(rows)
+        columns = [render(rows) for render in self.render_properties]
+        return [edge for edge in zip(ids, from_ids, to_ids, repeat(self.label), *columns) if None not in edge[:3]]
+
+
+class TableProjector:
+    """
+    Every vertex and edge projector compiled for one table layout
+    """
+    __slots__ = ('table', 'columns', 'projectors')
+
+    def __init__(self, table, columns, projectors):
+        self.table = table
+        self.columns = columns
+        self.projectors = projectors
+
+    def project(self, rows):
+        if not isinstance(rows, list):
+            rows = list(rows)
+        return [(projector, projector.project(rows)) for projector in self.projectors]
+
+
+class CompiledMapping:
+    """
+    The mapping rules grouped by table, compiled once per table column layout
+    """
+    def __init__(self, rules):
+        self.rules = rules
+        self.compiled = {}
+
+    @classmethod
+    def load(cls, mappings_file):
+        with open(mappings_file, mode='r') as jsonfile:
+            return cls(json.load(jsonfile)['rules'])
+
+    def tables(self):
+        return list(dict.fromkeys(rule['table_name'] for rule in self.rules))
+
+    def compile(self, table, columns):
+        key = (table, tuple(columns))
+        if key not in self.compiled:
+            self.compiled[key] = TableProjector(table, tuple(columns), self.projectors(table, columns))
+        return self.compiled[key]
+
+    def projectors(self, table, columns):
+        column_positions = {column: position for position, column in enumerate(columns)}
+        projectors = []
+        for rule in self.rules:
+            if rule['table_name'] != table:
+                continue
+            definitions = [(VertexProjector, definition, definition.get('vertex_properties', [])) for definition in rule.get('vertex_definitions', [])]
+            definitions += [(EdgeProjector, definition, definition.get('edge_properties', [])) for definition in rule.get('edge_definitions', [])]
+            for (projector, definition, properties) in definitions:
+                # templates naming a column the table doesn't have can't be rendered
+                missing = {field for template in projector.id_templates(definition) for field in template_fields(template)} - set(columns)
+                if missing:
+                    logger.warning('skipping a %s mapping, columns %s are not in the table', table, sorted(missing))
+                    continue
+                usable = []
+                for prop in properties:
+                    missing = set(template_fields(prop['property_value_template'])) - set(columns)
+                    if missing:
+                        logger.warning('dropping %s.%s, columns %s are not in the table', table, prop['property_name'], sorted(missing))
+                    else:
+                        usable.append(prop)
+                projectors.append(projector(rule['rule_id'], definition, usable, column_positions))
+        return projectors
+
+
+def rows_from_columns(columns, names):
+    """
+    Turns columnar input (lists, NumPy arrays or Arrow arrays keyed by column name)
+    into the row tuples projectors consume
+    """
+    arrays = []
+    for name in names:
+        array = columns[name]
+        if hasattr(array, 'to_pylist'):
+            array = array.to_pylist()
+        elif hasattr(array, 'tolist'):
+            array = array.tolist()
+        arrays.append(array)
+    return list(zip(*arrays))
+
+
+def benchmark(mapping, rows):
+    samples = {
+        'loan': ('original_interest_rate', 'original_principal_balance', 'unpaid_principal_balance', 'loan_term', 'maturity_date', 'loan_id', 'loan_status', 'issuance_date'),
+        'loan_activity': ('loan_id', 'principal_pymnt', 'int_pymnt', 'rem_mnths_to_maturity', 'rem_unpaid_principal_balance', 'payment_date', 'activity_id'),
+        'loan_security': ('loan_id', 'cusip', 'percentage'),
+        'loan_seller': ('loan_id', 'seller_id'),
+    }
+    values = {
+        'loan': lambda i: (3.5, 3905232.0, 3905232.0, 360, '20530601', 9876151 + i, '1', '2023-06-01'),
+        'loan_activity': lambda i: (9876151 + i // 360, 6145.98, 11390.26, 359, 3899086.02, '2023-07-01', i),
+        'loan_security': lambda i: (9876151 + i, '369WAU713', 100),
+        'loan_seller': lambda i: (9876151 + i, 9000),
+    }
+    for table, columns in samples.items():
+        batch = [values[table](i) for i in range(rows)]
+        projector = mapping.compile(table, columns)
+        start = time.time()
+        projector.project(batch)
+        elapsed = time.time() - start
+        print(f'{table}: {rows} rows in {elapsed:.2f}s ({rows / elapsed:.0f} rows/sec)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure rows/sec of the compiled mapping rules')
+    parser.add_argument('--mappings', default=DEFAULT_MAPPINGS)
+    parser.add_argument('--rows', type=int, default=1000000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    benchmark(CompiledMapping.load(args.mappings), args.rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Generates Neptune bulk loader CSV files (Gremlin format) from the relational
+source using the DMS graph mapping rules in target_mappings.json, without DMS.
+
+    python -m tools.neptune_bulkload --csv-dir exports/ --output bulkload/
+    python -m tools.neptune_bulkload --pg-dsn "dbname=postgres host=localhost" --output bulkload/
+"""
+
+import argparse
+import csv
+import gzip
+import logging
+import os
+import re
+import time
+
+from tools.mapping_compiler import CompiledMapping
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAPPINGS = 'resources/config/dms_json_mappings/target_mappings.json'
+DEFAULT_SCHEMA = 'mbs'
+
+
+class ShardedCsvWriter:
+    """
+    Writes rows to gzip compressed CSV files, starting a new shard every shard_rows rows
+    """
+    def __init__(self, output_dir, prefix, header, shard_rows):
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.header = header
+        self.shard_rows = shard_rows
+        self.shard = 0
+        self.rows = 0
+        self.file = None
+        self.writer = None
+
+    def write_rows(self, rows):
+        start = 0
+        while start < len(rows):
+            if self.file is None or self.rows == self.shard_rows:
+                self.rotate()
+            end = start + self.shard_rows - self.rows
+            self.writer.writerows(rows[start:end])
+            self.rows += len(rows[start:end])
+            start = end
+
+    def rotate(self):
+        self.close()
+        path = os.path.join(self.output_dir, f'{self.prefix}-{self.shard:05d}.csv.gz')
+        self.file = gzip.open(path, mode='wt', newline='', compresslevel=6)
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(self.header)
+        self.shard += 1
+        self.rows = 0
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def file_prefix(projector):
+    return '{}-{}-{}'.format(projector.kind, projector.rule_id, re.sub(r'\W+', '_', projector.label))
+
+def projector_header(projector):
+    return list(projector.header) + ['{}:{}'.format(prop['property_name'], prop['property_value_type']) for prop in projector.properties]
+
+def batches(rows, batch_rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_rows:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class CsvSource:
+    """
+    Reads <table>.csv exports with a header row, treating empty fields as NULL
+    """
+    def __init__(self, csv_dir):
+        self.csv_dir = csv_dir
+
+    def rows(self, table):
+        path = os.path.join(self.csv_dir, f'{table}.csv')
+        if not os.path.exists(path):
+            return (None, iter(()))
+        file = open(path, mode='r', newline='')
+        reader = csv.reader(file)
+        columns = next(reader)
+
+        def generate():
+            with file:
+                for values in reader:
+                    yield tuple(value if value != '' else None for value in values)
+        return (columns, generate())
+
+
+class PostgresSource:
+    """
+    Streams tables from Postgres with a server side cursor
+    """
+    def __init__(self, dsn, schema, fetch_size=50000):
+        import psycopg2
+        self.conn = psycopg2.connect(dsn)
+        self.schema = schema
+        self.fetch_size = fetch_size
+
+    def rows(self, table):
+        cur = self.conn.cursor(name=f'export_{table}')
+        cur.itersize = self.fetch_size
+        cur.execute(f'SELECT * FROM {self.schema}."{table}"')
+        first = cur.fetchone()
+        columns = [column.name for column in cur.description]
+
+        def generate():
+            try:
+                if first is not None:
+                    yield first
+                yield from cur
+            finally:
+                cur.close()
+        return (columns, generate())
+
+
+def export(source, mapping, output_dir, shard_rows, batch_rows=10000):
+    os.makedirs(output_dir, exist_ok=True)
+    writers = {}
+    stats = {}
+    try:
+        # each table is read once and fed through every rule mapping it
+        for table in mapping.tables():
+            start = time.time()
+            (columns, rows) = source.rows(table)
+            if columns is None:
+                logger.warning('no source rows for table %s', table)
+                continue
+            projector = mapping.compile(table, columns)
+            count = 0
+            for batch in batches(rows, batch_rows):
+                for (definition, output_rows) in projector.project(batch):
+                    if definition not in writers:
+                        writers[definition] = ShardedCsvWriter(output_dir, file_prefix(definition), projector_header(definition), shard_rows)
+                    writers[definition].write_rows(output_rows)
+                count += len(batch)
+            stats[table] = (count, time.time() - start)
+            logger.info('%s: %d rows in %.2fs (%.0f rows/sec)', table, count, stats[table][1], count / max(stats[table][1], 1e-9))
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate Neptune bulk load CSV from the DMS target mappings')
+    parser.add_argument('--mappings', default=DEFAULT_MAPPINGS)
+    parser.add_argument('--csv-dir', help='directory of <table>.csv exports')
+    parser.add_argument('--pg-dsn', help='read the tables from Postgres instead')
+    parser.add_argument('--schema', default=DEFAULT_SCHEMA)
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--shard-rows', type=int, default=1000000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    if (args.csv_dir is None) == (args.pg_dsn is None):
+        parser.error('exactly one of --csv-dir or --pg-dsn is required')
+
+    source = CsvSource(args.csv_dir) if args.csv_dir else PostgresSource(args.pg_dsn, args.schema)
+    export(source, CompiledMapping.load(args.mappings), args.output, args.shard_rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,372 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Prepayment, pool factor and delinquency analytics of a security, computed on NumPy
+columns across every loan and month of the pool at once.
+
+A security's loans and their loan_activity history up to the as-of date are read from
+Postgres (--pg-dsn) or from the graph (--gremlin-url). Per month of the pool's life it
+reports UPB, pool factor, scheduled and prepaid principal, SMM, CPR and loans 30, 60 and
+90+ days delinquent, plus the delinquency roll rate matrix. Results are cached per
+(cusip, as-of date), in memory and with --cache-dir on disk.
+
+The mbs schema carries no monthly delinquency status, so it is derived from the payment
+history: a loan is one month delinquent for every month since its last payment (or its
+issuance), and back to current when a payment arrives.
+
+    python -m tools.pool_analytics --pg-dsn <dsn> --cusip 369WAU713 --as-of 2023-12-01
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# roll rate states, the last one collects 90 days and more
+STATES = ['current', '30', '60', '90+']
+
+
+def months_of(dates):
+    # months since 1970-01 as int64, from dates, datetime64 or YYYY-MM-DD strings
+    return np.asarray(dates, dtype='datetime64[D]').astype('datetime64[M]').astype(np.int64)
+
+
+class PoolData:
+    """
+    Columns of a security's loans and of their activity rows, activity_loan holding the
+    position of each row's loan in the loan columns
+    """
+    def __init__(self, loan_ids, original_balance, rate, term, issued, share,
+            activity_loan_ids, month, principal, balance):
+        order = np.argsort(loan_ids, kind='stable')
+        self.loan_ids = np.asarray(loan_ids, dtype=np.int64)[order]
+        self.original_balance = np.asarray(original_balance, dtype=np.float64)[order]
+        self.rate = np.asarray(rate, dtype=np.float64)[order]
+        self.term = np.asarray(term, dtype=np.int64)[order]
+        self.issued = np.asarray(issued, dtype=np.int64)[order]
+        self.share = np.asarray(share, dtype=np.float64)[order]
+
+        activity_loan_ids = np.asarray(activity_loan_ids, dtype=np.int64)
+        position = np.minimum(np.searchsorted(self.loan_ids, activity_loan_ids), max(len(self.loan_ids) - 1, 0))
+        known = self.loan_ids[position] == activity_loan_ids if len(self.loan_ids) else np.zeros(len(activity_loan_ids), dtype=bool)
+        columns = [position, np.asarray(month, dtype=np.int64), np.asarray(principal, dtype=np.float64),
+            np.asarray(balance, dtype=np.float64)]
+        columns = [column[known] for column in columns]
+        # rows ordered by loan, then month, the loaders usually return them that way already
+        key = columns[0] * (1 << 32) + columns[1]
+        if len(key) > 1 and np.any(key[1:] < key[:-1]):
+            order = np.argsort(key, kind='stable')
+            columns = [column[order] for column in columns]
+        (self.activity_loan, self.month, self.principal, self.balance) = columns
+
+    @property
+    def loans(self):
+        return len(self.loan_ids)
+
+
+def level_payment(balance, rate, term):
+    """
+    Monthly payment of a level payment loan, per loan. It stays the same after partial
+    prepayments, which shorten the term instead.
+    """
+    r = rate / 1200
+    term = np.maximum(term, 1)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        return np.where(r > 0, balance * r / (1 - (1 + r) ** -term), balance / term)
+
+def monthly_sum(offsets, weights, months):
+    return np.bincount(offsets, weights=weights, minlength=months)[:months]
+
+def spans(starts, ends, weights, months):
+    # sum of weights over [start, end) month ranges, through a running sum of +/- steps,
+    # starts and ends from 0 to months
+    steps = np.bincount(starts, weights=weights, minlength=months + 1)
+    steps -= np.bincount(ends, weights=weights, minlength=months + 1)
+    return np.cumsum(steps)[:months]
+
+def delinquency(starts, ends, cured, months):
+    """
+    30, 60 and 90+ day counts per month and month to month state transitions of the
+    gaps between payment events. A gap of g months walks current -> 30 -> 60 -> 90+
+    for g - 1 month ends and, when cured by a payment, returns to current from there.
+    """
+    gap = ends - starts
+    rolls = np.zeros((len(STATES), len(STATES)))
+    rolls[0, 0] = np.count_nonzero(cured & (gap == 1))
+    # only gaps with a missed month move the counts, usually a small share of the rows
+    missed = np.flatnonzero(gap >= 2)
+    (starts, ends, cured, walked) = (starts[missed], ends[missed], cured[missed], gap[missed] - 1)
+    for state in range(len(STATES) - 1):
+        rolls[state, state + 1] = np.count_nonzero(walked > state)
+    rolls[3, 3] = np.maximum(walked - 3, 0).sum()
+    rolls[1:, 0] = np.bincount(np.minimum(walked[cured], 3), minlength=len(STATES))[1:]
+    counts = [
+        monthly_sum(starts + 1, None, months),
+        monthly_sum(starts[walked >= 2] + 2, None, months),
+        spans(np.minimum(starts[walked >= 3] + 3, months), ends[walked >= 3], None, months),
+    ]
+    return (counts, rolls)
+
+def analyze(pool, as_of):
+    """
+    Per month series and roll rates of the pool as of the month of as_of
+    """
+    end = int(months_of(as_of))
+    issued = pool.issued
+    live = issued <= end
+    start = int(min(issued[live].min() if live.any() else end, pool.month.min() if len(pool.month) else end))
+    months = end - start + 1
+
+    (loan, month, principal, balance) = (pool.activity_loan, pool.month, pool.principal, pool.balance)
+    rows = month <= end
+    if not rows.all():
+        (loan, month, principal, balance) = (loan[rows], month[rows], principal[rows], balance[rows])
+    offset = month - start
+    # ownership shares are usually 100%, which saves a multiplication per row
+    share = None if np.all(pool.share == 1) else pool.share[loan]
+    weigh = (lambda values: values) if share is None else (lambda values: values * share)
+
+    first = np.ones(len(loan), dtype=bool)
+    first[1:] = loan[1:] != loan[:-1]
+    last = np.ones(len(loan), dtype=bool)
+    last[:-1] = first[1:]
+    if np.isnan(balance).any():
+        balance = np.nan_to_num(balance)
+    original_balance = np.nan_to_num(pool.original_balance)
+
+    # balance before each payment, the original balance for a loan's first one
+    begin = np.empty(len(loan))
+    begin[1:] = balance[:-1]
+    begin[first] = original_balance[loan[first]]
+    interest_due = begin * pool.rate[loan] / 1200
+    scheduled = np.clip(level_payment(original_balance, pool.rate, pool.term)[loan] - interest_due, 0, begin)
+    prepaid = np.clip(principal - scheduled, 0, None)
+
+    scheduled_total = monthly_sum(offset, weigh(scheduled), months)
+    prepaid_total = monthly_sum(offset, weigh(prepaid), months)
+    # SMM over the loans paying in the month, prepaid over what was left after the schedule
+    reporting = monthly_sum(offset, weigh(begin), months) - scheduled_total
+    with np.errstate(divide='ignore', invalid='ignore'):
+        smm = np.where(reporting > 0, prepaid_total / reporting, 0.0)
+    cpr = 1 - (1 - smm) ** 12
+
+    # each balance holds from its payment month until the loan's next payment, the
+    # original balance from issuance until the first payment
+    next_month = np.empty(len(loan), dtype=np.int64)
+    next_month[:-1] = offset[1:]
+    next_month[last] = months
+    # a paid off loan's gap ends with its last payment, its zero balance adds nothing to the spans
+    paid_off = last & (balance <= 0)
+    next_month[paid_off] = offset[paid_off] + 1
+    has_activity = np.zeros(pool.loans, dtype=bool)
+    has_activity[loan] = True
+    first_payment = np.full(pool.loans, months, dtype=np.int64)
+    first_payment[loan[first]] = offset[first]
+    issued_offset = (issued - start)[live]
+    original = (original_balance * pool.share)[live]
+    upb = spans(offset, next_month, weigh(balance), months) \
+        + spans(issued_offset, first_payment[live], original, months)
+    # loans issued so far less the ones paid off
+    outstanding = np.cumsum(monthly_sum(issued_offset, None, months) - monthly_sum(offset[paid_off], None, months))
+
+    # payment events, issuance counts as one, each followed by a gap until the next
+    # payment (cured) or, for the last one of a loan still owing, until the as-of month
+    (issuance_counts, issuance_rolls) = delinquency(issued_offset, first_payment[live], has_activity[live], months)
+    (payment_counts, payment_rolls) = delinquency(offset, next_month, ~last, months)
+    (dq30, dq60, dq90) = [a + b for (a, b) in zip(issuance_counts, payment_counts)]
+    rolls = issuance_rolls + payment_rolls
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates = np.nan_to_num(rolls / rolls.sum(axis=1, keepdims=True))
+    original = original.sum()
+
+    axis = np.arange(start, end + 1).astype('datetime64[M]')
+    return {
+        'loans': int(live.sum()),
+        'month': axis.astype(str).tolist(),
+        'upb': upb.round(2).tolist(),
+        'pool_factor': (upb / original if original > 0 else np.zeros(months)).round(8).tolist(),
+        'outstanding_loans': outstanding.round().astype(np.int64).tolist(),
+        'scheduled_principal': scheduled_total.round(2).tolist(),
+        'prepaid_principal': prepaid_total.round(2).tolist(),
+        'smm': smm.round(8).tolist(),
+        'cpr': cpr.round(8).tolist(),
+        'dq30': dq30.round().astype(np.int64).tolist(),
+        'dq60': dq60.round().astype(np.int64).tolist(),
+        'dq90': dq90.round().astype(np.int64).tolist(),
+        'roll_rates': {
+            'states': STATES,
+            'transitions': rolls.astype(np.int64).tolist(),
+            'rates': rates.round(6).tolist(),
+        },
+    }
+
+
+class PostgresLoader:
+    """
+    Reads the pool with two COPY queries parsed by np.loadtxt, dates as month numbers
+    and NULLs as NaN so every column parses as a number
+    """
+    def __init__(self, dsn, schema='mbs'):
+        import psycopg2
+        self.conn = psycopg2.connect(dsn)
+        self.schema = schema
+
+    def copy_columns(self, query, params, dtypes):
+        import io
+        with self.conn.cursor() as cur:
+            buffer = io.StringIO()
+            cur.copy_expert('COPY ({}) TO STDOUT WITH (FORMAT csv)'.format(cur.mogrify(query, params).decode()), buffer)
+        buffer.seek(0)
+        table = np.loadtxt(buffer, delimiter=',', dtype=[('c{}'.format(i), dtype) for (i, dtype) in enumerate(dtypes)], ndmin=1)
+        return [table['c{}'.format(i)] for i in range(len(dtypes))]
+
+    def load(self, cusip, as_of):
+        month = "(extract(year from {0})::int - 1970) * 12 + extract(month from {0})::int - 1"
+        loans = self.copy_columns(
+            'SELECT l.loan_id, coalesce(l.original_principal_balance, \'NaN\'), coalesce(l.original_interest_rate, 0), '
+            'coalesce(l.loan_term, 360), ' + month.format('l.issuance_date') + ', s.percentage '
+            'FROM {0}.loan_security s JOIN {0}.loan l ON l.loan_id = s.loan_id '
+            'WHERE s.cusip = %s AND l.issuance_date <= %s'.format(self.schema),
+            (cusip, as_of), [np.int64, np.float64, np.float64, np.int64, np.int64, np.float64])
+        activity = self.copy_columns(
+            'SELECT a.loan_id, ' + month.format('a.payment_date') + ', a.principal_pymnt, '
+            'coalesce(a.rem_unpaid_principal_balance, \'NaN\') '
+            'FROM {0}.loan_security s JOIN {0}.loan_activity a ON a.loan_id = s.loan_id '
+            'WHERE s.cusip = %s AND a.payment_date <= %s ORDER BY a.loan_id, a.payment_date'.format(self.schema),
+            (cusip, as_of), [np.int64, np.int64, np.float64, np.float64])
+        (loan_ids, original, rate, term, issued, percentage) = loans
+        return PoolData(loan_ids, original, rate, term, issued, percentage / 100, *activity)
+
+
+class GraphLoader:
+    """
+    Reads the pool through Gremlin, the loans with the ownership percentage of their
+    'has securitized loan' edge, the activity through 'has snapshot' up to the as-of date
+    """
+    def __init__(self, g):
+        self.g = g
+
+    def load(self, cusip, as_of):
+        from datetime import datetime
+        from gremlin_python.process.graph_traversal import __
+        from gremlin_python.process.traversal import P
+        as_of = datetime.strptime(as_of, '%Y-%m-%d')
+        loans = self.g.V(cusip).outE('has securitized loan').project('share', 'loan') \
+            .by(__.coalesce(__.values('percentage'), __.constant(100))) \
+            .by(__.inV().valueMap('loan_id', 'original_principal_balance', 'original_interest_rate', 'loan_term', 'issuance_date').by(__.unfold())) \
+            .toList()
+        loans = [item for item in loans if 'issuance_date' in item['loan'] and item['loan']['issuance_date'] <= as_of]
+        activity = self.g.V(cusip).out('has securitized loan').outE('has snapshot').has('payment_date', P.lte(as_of)).inV() \
+            .valueMap('loan_id', 'payment_date', 'principal_pymnt', 'rem_unpaid_principal_balance').by(__.unfold()) \
+            .toList()
+        column = lambda rows, name, missing: [row.get(name, missing) for row in rows]
+        rows = [item['loan'] for item in loans]
+        return PoolData(
+            np.array(column(rows, 'loan_id', 0), dtype=np.int64),
+            np.array(column(rows, 'original_principal_balance', np.nan), dtype=np.float64),
+            np.array(column(rows, 'original_interest_rate', 0), dtype=np.float64),
+            np.array(column(rows, 'loan_term', 360), dtype=np.int64),
+            months_of(column(rows, 'issuance_date', None)),
+            np.array([item['share'] for item in loans], dtype=np.float64) / 100,
+            np.array(column(activity, 'loan_id', 0), dtype=np.int64),
+            months_of(column(activity, 'payment_date', None)),
+            np.array(column(activity, 'principal_pymnt', 0), dtype=np.float64),
+            np.array(column(activity, 'rem_unpaid_principal_balance', np.nan), dtype=np.float64),
+        )
+
+
+class PoolAnalytics:
+    """
+    analyze() of a loader's pools, cached by (cusip, as-of date). Loan activity up to a
+    past as-of date doesn't change, so the cache has no expiry.
+    """
+    def __init__(self, loader, cache_dir=None):
+        self.loader = loader
+        self.cache_dir = cache_dir
+        self.results = {}
+
+    def cache_path(self, cusip, as_of):
+        return os.path.join(self.cache_dir, '{}_{}.json'.format(cusip, as_of))
+
+    def metrics(self, cusip, as_of):
+        key = (cusip, as_of)
+        if key in self.results:
+            return self.results[key]
+        if self.cache_dir is not None and os.path.exists(self.cache_path(cusip, as_of)):
+            with open(self.cache_path(cusip, as_of)) as file:
+                self.results[key] = json.load(file)
+            return self.results[key]
+
+        start = time.perf_counter()
+        pool = self.loader.load(cusip, as_of)
+        loaded = time.perf_counter()
+        result = dict(analyze(pool, as_of), cusip=cusip, as_of=as_of)
+        logger.info('{} as of {}: {} loans, {} activity rows, loaded in {:.2f}s, analyzed in {:.3f}s'.format(
+            cusip, as_of, pool.loans, len(pool.month), loaded - start, time.perf_counter() - loaded))
+
+        self.results[key] = result
+        if self.cache_dir is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self.cache_path(cusip, as_of), 'w') as file:
+                json.dump(result, file)
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SMM/CPR, pool factor and delinquency roll rates of a security')
+    parser.add_argument('--cusip', required=True)
+    parser.add_argument('--as-of', required=True, help='YYYY-MM-DD')
+    parser.add_argument('--pg-dsn')
+    parser.add_argument('--schema', default='mbs')
+    parser.add_argument('--gremlin-url')
+    parser.add_argument('--cache-dir')
+    parser.add_argument('--output', help='write the result to this JSON file instead of stdout')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+
+    remote = None
+    if args.pg_dsn:
+        loader = PostgresLoader(args.pg_dsn, args.schema)
+    elif args.gremlin_url:
+        from gremlin_python.driver import serializer
+        from gremlin_python.driver.driver_remote_connection import DriverRemoteConnection
+        from gremlin_python.process.anonymous_traversal import traversal
+        remote = DriverRemoteConnection(args.gremlin_url, 'g', message_serializer=serializer.GraphBinarySerializersV1())
+        loader = GraphLoader(traversal().withRemote(remote))
+    else:
+        parser.error('one of --pg-dsn or --gremlin-url is required')
+
+    try:
+        result = PoolAnalytics(loader, args.cache_dir).metrics(args.cusip, args.as_of)
+    finally:
+        if remote is not None:
+            remote.close()
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(result, file, indent=2)
+    else:
+        print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
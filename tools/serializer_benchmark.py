@@ -0,0 +1,110 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""
+Compares the Gremlin message serializers the query Lambda can use (MESSAGE_SERIALIZER)
+on loan and loan_activity valueMap() results: bytes on the wire and the time
+gremlinpython takes to decode the response messages.
+
+The rows come from tools.synthetic_mbs with the property types of target_mappings.json
+and are split into response messages of --batch-size results, as Gremlin Server streams
+them. The messages are written with gremlinpython's own writers, so the value types
+are the ones it picks, close to but not exactly what the server sends. No graph is needed.
+
+    python -m tools.serializer_benchmark --rows 10000
+"""
+
+import argparse
+import json
+import struct
+import time
+import uuid
+
+from gremlin_python.driver import serializer
+from gremlin_python.structure.io import graphbinaryV1, graphsonV2d0, graphsonV3d0
+
+from tools.decode_benchmark import TABLES, best_of, import_api, result_rows
+
+
+def graphbinary_message(request_id, data):
+    # version, request id, status code, no status message, empty status and meta maps
+    message = bytearray([0x81])
+    message += b'\x00' + request_id.bytes + struct.pack('>i', 200) + b'\x01' + struct.pack('>ii', 0, 0)
+    message += graphbinaryV1.GraphBinaryWriter().writeObject(data)
+    return bytes(message)
+
+def graphson_message(writer):
+    def write(request_id, data):
+        return json.dumps({
+            'requestId': str(request_id),
+            'status': {'code': 200, 'message': '', 'attributes': {}},
+            'result': {'data': writer.toDict(data), 'meta': {}},
+        }, separators=(',', ':')).encode()
+    return write
+
+message_writers = {
+    'graphbinary': graphbinary_message,
+    'graphsonv2': graphson_message(graphsonV2d0.GraphSONWriter()),
+    'graphsonv3': graphson_message(graphsonV3d0.GraphSONWriter()),
+}
+
+
+def measure(api, name, table, rows, args):
+    request_id = uuid.uuid4()
+    messages = [message_writers[name](request_id, rows[start:start + args.batch_size]) for start in range(0, len(rows), args.batch_size)]
+    reader = getattr(serializer, api.message_serializers[name])()
+    (seconds, decoded) = best_of(args.repeat, lambda: [reader.deserialize_message(message)['result']['data'] for message in messages])
+    if [row for batch in decoded for row in batch] != rows:
+        raise RuntimeError('{} did not round trip the {} rows'.format(name, table))
+    return {
+        'serializer': name,
+        'table': table,
+        'rows': len(rows),
+        'messages': len(messages),
+        'bytes': sum(map(len, messages)),
+        'decode_ms': round(seconds * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the Gremlin message serializers on loan result sets')
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--batch-size', type=int, default=64, help='results per response message, resultIterationBatchSize of Gremlin Server')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args()
+
+    api = import_api()
+    typed = {name: True for name in api.property_decoders}
+    results = []
+    for table in TABLES:
+        rows = result_rows(table, args.rows, typed, args.seed)
+        results.extend(measure(api, name, table, rows, args) for name in api.message_serializers)
+
+    print('{:<14} {:<12} {:>12} {:>7} {:>10}'.format('table', 'serializer', 'bytes', 'ratio', 'decode'))
+    for result in results:
+        baseline = next(other for other in results if other['table'] == result['table'])
+        print('{:<14} {:<12} {:>12} {:>6.1f}% {:>8.1f}ms'.format(result['table'], result['serializer'], result['bytes'],
+            100 * result['bytes'] / baseline['bytes'], result['decode_ms']))
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'rows': args.rows, 'results': results}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
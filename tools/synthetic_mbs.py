@@ -0,0 +1,408 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Generates a synthetic mbs schema (sqlscripts/ddl/create_tables.sql) at any scale.
+
+Loans are generated in chunks with NumPy, each chunk from its own seeded generator, so
+the output depends only on the sizes, --chunk-loans and the seed. Pool (security),
+seller and servicer sizes are Zipf distributed and loan_activity holds the amortization
+schedule of each loan up to --as-of.
+
+    python -m tools.synthetic_mbs --loans 1000000 --format copy --output synthetic/
+    python -m tools.synthetic_mbs --loans 1000000 --format bulkload --output bulkload/
+    python -m tools.synthetic_mbs --loans 100000 --format gremlin --gremlin-url ws://localhost:8182/gremlin
+
+The copy format writes dml/<table>.csv with a header next to a copy of the ddl, so the
+output directory can be uploaded to the dbloader's bucket or read by neptune_bulkload
+--csv-dir.
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import time
+
+import numpy as np
+
+from tools.mapping_compiler import CompiledMapping
+from tools.neptune_bulkload import export
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAPPINGS = 'resources/config/dms_json_mappings/target_mappings.json'
+DEFAULT_DDL = 'sqlscripts/ddl'
+
+# vertex ids are rendered from the bare key columns, so every label gets its own id range
+SELLER_ID_BASE = 100000
+SERVICER_ID_BASE = 200000
+BORROWER_ID_BASE = 1000000
+PROPERTY_ID_BASE = 300000000
+ACTIVITY_ID_BASE = 500000000
+LOAN_ID_BASE = 10000000000
+INT4_MAX = 2147483647
+# seed stream of the seller, servicer and security rows, apart from the loan chunk streams
+ENTITY_STREAM = 2 ** 31
+
+# vertex tables before the link tables, so edges never reference a missing vertex
+columns = {
+    'seller': ('seller_id', 'name', 'status'),
+    'servicer': ('servicer_id', 'name', 'status'),
+    'security': ('security_value', 'issued_by', 'issued_date', 'cusip'),
+    'loan': ('original_interest_rate', 'original_principal_balance', 'unpaid_principal_balance', 'loan_term', 'maturity_date', 'loan_id', 'loan_status', 'issuance_date'),
+    'borrower': ('borrower_id', 'first_name', 'middle_name', 'last_name', 'age', 'address_type', 'address_1', 'adderss_2', 'city', 'state', 'zipcode', 'country', 'status'),
+    'property': ('property_id', 'address_type', 'address_1', 'adderss_2', 'city', 'state', 'zipcode', 'country'),
+    'loan_activity': ('loan_id', 'principal_pymnt', 'int_pymnt', 'rem_mnths_to_maturity', 'rem_unpaid_principal_balance', 'payment_date', 'activity_id'),
+    'loan_seller': ('loan_id', 'seller_id'),
+    'loan_servicer': ('loan_id', 'servicer_id'),
+    'loan_security': ('loan_id', 'cusip', 'percentage'),
+    'loan_borrower': ('loan_id', 'borrower_id'),
+    'loan_property': ('loan_id', 'property_id'),
+}
+
+# decimal places of float columns in the copy files, money is in cents
+column_decimals = {
+    'original_interest_rate': 3,
+}
+
+first_names = np.array(['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David', 'Elizabeth', 'Maria', 'Wei', 'Ahmed', 'Priya', 'Carlos', 'Yuki'])
+last_names = np.array(['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez', 'Nguyen', 'Patel', 'Kim', 'Chen', 'Lopez', 'Wilson'])
+streets = np.array(['Main St', 'Oak Ave', 'Maple Dr', 'Cedar Ln', 'Park Rd', 'Elm St', 'Lake View Dr', 'Hill Rd'])
+cities = np.array(['Springfield', 'Riverside', 'Fairview', 'Franklin', 'Greenville', 'Madison', 'Georgetown', 'Salem'])
+states = np.array(['CA', 'TX', 'FL', 'NY', 'PA', 'IL', 'OH', 'GA', 'NC', 'VA', 'WA', 'AZ'])
+issuers = np.array(['FNMA', 'FHLMC', 'GNMA'])
+terms = np.array([180, 240, 360])
+term_weights = np.array([0.15, 0.05, 0.80])
+
+
+def cusip(index):
+    return 'SYN{:06d}'.format(index)
+
+def cusips(index):
+    return np.char.add('SYN', np.char.zfill(index.astype(str), 6))
+
+def zipf_weights(count, exponent):
+    weights = 1.0 / np.arange(1, count + 1) ** exponent
+    return weights / weights.sum()
+
+def to_strings(column, rows):
+    # None for a column that is NULL throughout, matching what the CSV and Postgres sources yield
+    if column is None:
+        return [None] * rows
+    return column.astype(str).tolist()
+
+def digit_matrix(values, width=None):
+    # non negative integers as right aligned ASCII digits, with a mask dropping the leading zeros
+    fixed = width is not None
+    if not fixed:
+        width = len(str(int(values.max()))) if len(values) else 1
+    digits = (values[:, None] // 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)) % 10
+    keep = np.ones(digits.shape, dtype=bool) if fixed else np.cumsum(digits != 0, axis=1) > 0
+    keep[:, -1] = True
+    return (digits + ord('0')).astype(np.uint8), keep
+
+def constant_matrix(text, rows):
+    matrix = np.tile(np.frombuffer(text.encode(), dtype=np.uint8), (rows, 1))
+    return matrix, np.ones(matrix.shape, dtype=bool)
+
+def encode_column(values, rows, decimals):
+    if values is None:
+        return np.empty((rows, 0), dtype=np.uint8), np.empty((rows, 0), dtype=bool)
+    if values.dtype.kind in 'US':
+        # fixed width bytes, the padding is masked out
+        matrix = values.astype('S').view(np.uint8).reshape(rows, -1)
+        return matrix, matrix != 0
+    if values.dtype.kind == 'M':
+        # first of the month dates as YYYY-MM-01
+        months = values.astype('datetime64[M]').astype(np.int64)
+        (year, year_keep) = digit_matrix(months // 12 + 1970, 4)
+        (month, month_keep) = digit_matrix(months % 12 + 1, 2)
+        (dash, dash_keep) = constant_matrix('-', rows)
+        (day, day_keep) = constant_matrix('-01', rows)
+        return np.hstack([year, dash, month, day]), np.hstack([year_keep, dash_keep, month_keep, day_keep])
+    if values.dtype.kind == 'f':
+        scaled = np.rint(values * 10 ** decimals).astype(np.int64)
+        (whole, whole_keep) = digit_matrix(scaled // 10 ** decimals)
+        (fraction, fraction_keep) = digit_matrix(scaled % 10 ** decimals, decimals)
+        (point, point_keep) = constant_matrix('.', rows)
+        return np.hstack([whole, point, fraction]), np.hstack([whole_keep, point_keep, fraction_keep])
+    return digit_matrix(values.astype(np.int64))
+
+def encode_csv(values, rows, decimals):
+    """
+    Formats a chunk of columns as CSV lines without a Python level loop over the rows:
+    every row is laid out in a fixed width byte matrix and the padding is masked out.
+    Numbers must not be negative and text must not need quoting, which holds for the
+    generated values.
+    """
+    parts = []
+    for (position, column) in enumerate(values):
+        parts.append(encode_column(column, rows, decimals[position]))
+        parts.append(constant_matrix(',' if position < len(values) - 1 else '\n', rows))
+    matrix = np.hstack([part[0] for part in parts])
+    keep = np.hstack([part[1] for part in parts])
+    return matrix[keep].tobytes()
+
+def month_strings(months):
+    return months.astype('datetime64[D]').astype(str)
+
+def month_dates(months):
+    return months.astype('datetime64[D]')
+
+
+class SyntheticMbs:
+    """
+    Deterministic generator of the mbs tables, one loan chunk at a time
+    """
+    def __init__(self, loans, securities=None, sellers=50, servicers=50, months=360, as_of='2023-07-01',
+            zipf_exponent=1.1, chunk_loans=10000, seed=7):
+        self.loans = loans
+        self.securities = securities or max(1, loans // 500)
+        self.sellers = sellers
+        self.servicers = servicers
+        self.months = months
+        self.as_of = np.datetime64(as_of[:7], 'M')
+        self.chunk_loans = chunk_loans
+        self.seed = seed
+        self.pool_weights = zipf_weights(self.securities, zipf_exponent)
+        self.seller_weights = zipf_weights(sellers, zipf_exponent)
+        self.servicer_weights = zipf_weights(servicers, zipf_exponent)
+        self.offsets = None
+
+    def chunk_count(self):
+        return (self.loans + self.chunk_loans - 1) // self.chunk_loans
+
+    def loan_chunk(self, chunk):
+        rng = np.random.default_rng([self.seed, chunk])
+        start = chunk * self.chunk_loans
+        size = min(self.chunk_loans, self.loans - start)
+        loan = {
+            'index': np.arange(start, start + size),
+            'pool': rng.choice(self.securities, size, p=self.pool_weights),
+            'seller': rng.choice(self.sellers, size, p=self.seller_weights),
+            'servicer': rng.choice(self.servicers, size, p=self.servicer_weights),
+            'rate': np.round(np.clip(rng.normal(5.0, 1.2, size), 2.0, 9.0), 3),
+            'balance': np.round(np.clip(rng.lognormal(np.log(300000), 0.5, size), 30000, 3000000), 2),
+            'term': rng.choice(terms, size, p=term_weights),
+            'elapsed': rng.integers(0, self.months + 1, size),
+            'borrowers': rng.choice([1, 2], size, p=[0.6, 0.4]),
+        }
+        loan['id'] = LOAN_ID_BASE + loan['index']
+        loan['issued'] = self.as_of - loan['elapsed']
+        loan['payments'] = np.minimum(loan['elapsed'], loan['term'])
+        return loan
+
+    def plan(self):
+        # one pass over the loans for the per chunk id offsets and the pool balances
+        if self.offsets is not None:
+            return self.offsets
+        borrowers = [0]
+        activity = [0]
+        self.pool_balances = np.zeros(self.securities)
+        for chunk in range(self.chunk_count()):
+            loan = self.loan_chunk(chunk)
+            borrowers.append(borrowers[-1] + int(loan['borrowers'].sum()))
+            activity.append(activity[-1] + int(loan['payments'].sum()))
+            self.pool_balances += np.bincount(loan['pool'], weights=loan['balance'], minlength=self.securities)
+        if ACTIVITY_ID_BASE + activity[-1] > INT4_MAX:
+            raise ValueError('{} activity rows do not fit the int4 activity_id of create_tables.sql, use fewer loans or months'.format(activity[-1]))
+        if BORROWER_ID_BASE + borrowers[-1] > PROPERTY_ID_BASE:
+            raise ValueError('{} borrowers do not fit their id range, use fewer loans'.format(borrowers[-1]))
+        self.offsets = {'borrowers': borrowers, 'activity': activity}
+        return self.offsets
+
+    def schedule(self, loan):
+        # level payment amortization, balance after k payments is P(1+r)^k - pmt((1+r)^k - 1)/r
+        payments = loan['payments']
+        rows = np.repeat(np.arange(len(payments)), payments)
+        k = np.arange(len(rows)) - np.repeat(np.cumsum(payments) - payments, payments) + 1
+        r = loan['rate'][rows] / 1200
+        principal = loan['balance'][rows]
+        n = loan['term'][rows]
+        payment = principal * r / (1 - (1 + r) ** -n)
+        growth = (1 + r) ** k
+        balance = np.maximum(principal * growth - payment * (growth - 1) / r, 0)
+        previous = np.maximum(principal * growth / (1 + r) - payment * (growth / (1 + r) - 1) / r, 0)
+        return {
+            'rows': rows,
+            'k': k,
+            'principal': np.round(previous - balance, 2),
+            'interest': np.round(previous * r, 2),
+            'balance': np.round(balance, 2),
+            'remaining': n - k,
+        }
+
+    def unpaid_balance(self, loan):
+        r = loan['rate'] / 1200
+        payment = loan['balance'] * r / (1 - (1 + r) ** -loan['term'])
+        growth = (1 + r) ** loan['payments']
+        return np.round(np.maximum(loan['balance'] * growth - payment * (growth - 1) / r, 0), 2)
+
+    def addresses(self, rng, size):
+        return {
+            'address_type': np.full(size, 'HOME'),
+            'address_1': np.char.add(np.char.add(rng.integers(1, 9999, size).astype(str), ' '), rng.choice(streets, size)),
+            'city': rng.choice(cities, size),
+            'state': rng.choice(states, size),
+            'zipcode': np.char.zfill(rng.integers(501, 99950, size).astype(str), 5),
+            'country': np.full(size, 'US'),
+        }
+
+    def entity_chunk(self, table):
+        rng = np.random.default_rng([self.seed, ENTITY_STREAM])
+        if table == 'security':
+            self.plan()
+            index = np.arange(self.securities)
+            issued = self.as_of - rng.integers(0, self.months + 1, self.securities)
+            return [np.round(self.pool_balances, 2), rng.choice(issuers, self.securities), month_dates(issued), cusips(index)]
+        (count, base) = (self.sellers, SELLER_ID_BASE) if table == 'seller' else (self.servicers, SERVICER_ID_BASE)
+        index = np.arange(count)
+        return [base + index, np.char.add(table.title() + ' ', index.astype(str)), np.full(count, '1')]
+
+    def table_chunk(self, table, chunk):
+        loan = self.loan_chunk(chunk)
+        size = len(loan['id'])
+        # per table generators so a table's values don't depend on which tables were generated before it
+        rng = np.random.default_rng([self.seed, chunk, list(columns).index(table)])
+        if table == 'loan':
+            maturity = np.char.replace(month_strings(loan['issued'] + loan['term']), '-', '')
+            return [loan['rate'], loan['balance'], self.unpaid_balance(loan), loan['term'], maturity, loan['id'], np.full(size, '1'), month_dates(loan['issued'])]
+        if table == 'loan_activity':
+            schedule = self.schedule(loan)
+            activity_ids = ACTIVITY_ID_BASE + self.plan()['activity'][chunk] + np.arange(len(schedule['rows']))
+            payment_dates = month_dates(loan['issued'][schedule['rows']] + schedule['k'])
+            return [loan['id'][schedule['rows']], schedule['principal'], schedule['interest'], schedule['remaining'], schedule['balance'], payment_dates, activity_ids]
+        if table in ('borrower', 'loan_borrower'):
+            owners = np.repeat(np.arange(size), loan['borrowers'])
+            borrower_ids = BORROWER_ID_BASE + self.plan()['borrowers'][chunk] + np.arange(len(owners))
+            if table == 'loan_borrower':
+                return [loan['id'][owners], borrower_ids]
+            count = len(owners)
+            address = self.addresses(rng, count)
+            return [borrower_ids, rng.choice(first_names, count), None, rng.choice(last_names, count), rng.integers(25, 80, count),
+                address['address_type'], address['address_1'], None, address['city'], address['state'], address['zipcode'], address['country'], np.full(count, '1')]
+        property_ids = PROPERTY_ID_BASE + loan['index']
+        if table == 'property':
+            address = self.addresses(rng, size)
+            return [property_ids, address['address_type'], address['address_1'], None, address['city'], address['state'], address['zipcode'], address['country']]
+        if table == 'loan_property':
+            return [loan['id'], property_ids]
+        if table == 'loan_seller':
+            return [loan['id'], SELLER_ID_BASE + loan['seller']]
+        if table == 'loan_servicer':
+            return [loan['id'], SERVICER_ID_BASE + loan['servicer']]
+        if table == 'loan_security':
+            return [loan['id'], cusips(loan['pool']), np.full(size, 100)]
+        raise ValueError('unknown table {}'.format(table))
+
+    def chunks(self, table):
+        """
+        Yields the table in chunks of NumPy columns, None for a column that is all NULL
+        """
+        if table in ('seller', 'servicer', 'security'):
+            yield self.entity_chunk(table)
+            return
+        for chunk in range(self.chunk_count()):
+            yield self.table_chunk(table, chunk)
+
+    def rows(self, table):
+        # same interface as the neptune_bulkload sources
+        if table not in columns:
+            return (None, iter(()))
+        def generate():
+            for values in self.chunks(table):
+                rows = len(values[0])
+                yield from zip(*[to_strings(column, rows) for column in values])
+        return (list(columns[table]), generate())
+
+
+def write_copy_files(generator, output_dir, ddl_dir=DEFAULT_DDL, tables=columns):
+    os.makedirs(os.path.join(output_dir, 'dml'), exist_ok=True)
+    shutil.copytree(ddl_dir, os.path.join(output_dir, 'ddl'), dirs_exist_ok=True)
+    for table in tables:
+        start = time.time()
+        count = 0
+        decimals = [column_decimals.get(column, 2) for column in columns[table]]
+        with open(os.path.join(output_dir, 'dml', f'{table}.csv'), mode='wb') as file:
+            file.write((','.join(columns[table]) + '\n').encode())
+            for values in generator.chunks(table):
+                # NULL columns are written as empty unquoted fields, which COPY reads as NULL
+                rows = len(values[0])
+                file.write(encode_csv(values, rows, decimals))
+                count += rows
+        elapsed = time.time() - start
+        logger.info('%s: %d rows in %.2fs (%.0f rows/sec)', table, count, elapsed, count / max(elapsed, 1e-9))
+
+def feed_gremlin(g, mapping, generator, batch_rows=5000, tables=columns):
+    from tools.cdc_applier import ChangeBatch, GraphWriter
+    writer = GraphWriter(g)
+    for table in tables:
+        start = time.time()
+        (table_columns, rows) = generator.rows(table)
+        batch = ChangeBatch(mapping)
+        count = 0
+        for values in rows:
+            batch.add(table, 'I', table_columns, values, None)
+            if len(batch) == batch_rows:
+                writer.apply(batch)
+                count += len(batch)
+                batch = ChangeBatch(mapping)
+        writer.apply(batch)
+        count += len(batch)
+        logger.info('%s: %d rows in %.2fs', table, count, time.time() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic mbs dataset')
+    parser.add_argument('--loans', type=int, required=True)
+    parser.add_argument('--securities', type=int, help='number of pools, loans / 500 by default')
+    parser.add_argument('--sellers', type=int, default=50)
+    parser.add_argument('--servicers', type=int, default=50)
+    parser.add_argument('--months', type=int, default=360, help='longest loan_activity history per loan')
+    parser.add_argument('--as-of', default='2023-07-01')
+    parser.add_argument('--zipf-exponent', type=float, default=1.1)
+    parser.add_argument('--chunk-loans', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--format', choices=('copy', 'bulkload', 'gremlin'), default='copy')
+    parser.add_argument('--output', help='output directory for the copy and bulkload formats')
+    parser.add_argument('--shard-rows', type=int, default=1000000)
+    parser.add_argument('--mappings', default=DEFAULT_MAPPINGS)
+    parser.add_argument('--gremlin-url')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    if (args.format == 'gremlin') != (args.gremlin_url is not None) or (args.format != 'gremlin' and args.output is None):
+        parser.error('--format gremlin needs --gremlin-url, the other formats need --output')
+
+    generator = SyntheticMbs(args.loans, args.securities, args.sellers, args.servicers, args.months, args.as_of,
+        args.zipf_exponent, args.chunk_loans, args.seed)
+    if args.format == 'copy':
+        write_copy_files(generator, args.output)
+    elif args.format == 'bulkload':
+        export(generator, CompiledMapping.load(args.mappings), args.output, args.shard_rows)
+    else:
+        from gremlin_python.driver.driver_remote_connection import DriverRemoteConnection
+        from gremlin_python.process.anonymous_traversal import traversal
+        remote = DriverRemoteConnection(args.gremlin_url, 'g')
+        try:
+            feed_gremlin(traversal().withRemote(remote), CompiledMapping.load(args.mappings), generator)
+        finally:
+            remote.close()
+
+
+if __name__ == '__main__':
+    main()